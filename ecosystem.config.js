@@ -60,6 +60,14 @@ module.exports = {
 			name 	: "kanye_backend",
 			script  : "./kanye_realtime/src/server/app.js",
 			args    : "--serverPort=8080 --dbname=kanye",
+		},{
+			// Retrains the classifiers daily. The python server picks up the new version.
+			name 	: "kanye_train",
+			script  : "train.py",
+			cwd     : "./nlp",
+			interpreter  : "python3",
+			cron_restart : "0 4 * * *",
+			autorestart  : false,
 		}]
 };
 		
@@ -40,6 +40,24 @@ function get_estimate(comment, callback) {
     });
 };
 
+// Classifies a list of comments with a single request. Classifications are returned in the same order.
+function get_estimates(comments, callback) {
+    request({
+        url: 'http://localhost:5000/classify_batch',
+        method: "POST",
+        json: comments
+    }, function(error, response, body) {
+        console.log('Getting estimates for', comments.length, 'comments');
+
+        if(error) { console.error('error:', error); }
+        console.log('Status code:', response && response.statusCode);
+        if (!Array.isArray(body)) {
+            body = [];
+        }
+        callback(body);
+    });
+};
+
 function get_statistics(callback) {
     if (Date.now() < lastStatisticsTime + 6*60*60*1000 && !_.isEmpty(cachedStats)) {
         console.log("Returning cached stats");
@@ -77,32 +95,20 @@ mongoHandler(dbname).then(function(export_fns) {
     
             // Send five most recent (oldest first).
             export_fns.retrieveRecent(5).then(function(docsArray) {
-                let commentsArray = [];
-    
-                // Need this as a callback to ensure order.
-                // npm requests module does not handle promises.
-                var estimate_last_value = function(arr) {
-                    let comment = arr.pop();
-    
-                    get_estimate(comment, (classification) => {
+                get_estimates(docsArray, (classifications) => {
+                    for (var i = 0; i < docsArray.length; i++) {
+                        let classification = classifications[i];
                         if(classification) {
-                            comment['is_wavy'] = classification['is_wavy'];
-                            comment['category'] = classification['category'];
+                            docsArray[i]['is_wavy'] = classification['is_wavy'];
+                            docsArray[i]['category'] = classification['category'];
                         }
-                        commentsArray.push(comment);
-                        if(arr.length > 0) {
-                            estimate_last_value(arr);
-                        } else {
-                            (async () => {
-                                for (var i = 0; i < commentsArray.length; i++) {
-                                    await socket.emit('comment', JSON.stringify(commentsArray[i]));
-                                }
-                            })();
+                    }
+                    (async () => {
+                        for (var i = docsArray.length - 1; i >= 0; i--) {
+                            await socket.emit('comment', JSON.stringify(docsArray[i]));
                         }
-                    });
-                };
-    
-                estimate_last_value(docsArray);
+                    })();
+                });
             }).catch(err => {
                 console.error(err);
                 throw err;
@@ -138,16 +144,17 @@ mongoHandler(dbname).then(function(export_fns) {
             export_fns.retrieveRandom(5).then(function(docsArray) {
 
                 // We don't explicitly need them in order.
-                for (i = 0; i < docsArray.length; i++) {
-                    let comment = docsArray[i];
-                    get_estimate(comment, (classification) => {
+                get_estimates(docsArray, (classifications) => {
+                    for (var i = 0; i < docsArray.length; i++) {
+                        let comment = docsArray[i];
+                        let classification = classifications[i];
                         if(classification) {
                             comment['is_wavy'] = classification['is_wavy'];
                             comment['category'] = classification['category'];
                         }
                         socket.emit('comment', JSON.stringify(comment));
-                    });
-                }
+                    }
+                });
 
             }).catch(err => {
                 console.error(err); 
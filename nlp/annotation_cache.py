@@ -0,0 +1,260 @@
+"""Persistent cache for the nltk annotations of comment text.
+
+Tokenizing, pos tagging and ne chunking are the most expensive part of feature
+extraction, and the text of a comment almost never changes. Annotations are
+stored in a local SQLite file, keyed by the comment name and a hash of the
+annotated text, so retraining only pays the nltk cost for new or edited comments.
+
+Usage:
+    annotation = annotation_cache.annotate(comment['name'], comment['body'])
+    len(annotation['tagged']), annotation['n_entities']
+"""
+
+import concurrent.futures
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import nltk
+
+import constants
+import metrics
+
+# SQLite (before 3.32) allows at most 999 host parameters in a single
+# statement, and each key binds two.
+_LOOKUP_CHUNK_SIZE = 999 // 2
+
+# Hits only update last_used in memory. They are written with the next store,
+# or once this many are pending or this many seconds have passed, so most
+# lookups do not commit.
+_TOUCH_FLUSH_SIZE = 1000
+_TOUCH_FLUSH_INTERVAL = 60
+
+# Number of texts each worker process annotates at a time, see compute_parallel.
+PARALLEL_CHUNK_SIZE = 250
+
+_connection = None
+_lock = threading.Lock()
+
+# Rows in the cache, kept up to date by _store & _evict rather than counted each time.
+_count = 0
+
+# Maps keys to the time they were last looked up, until written by _flush_touched.
+_touched = {}
+_touched_flushed_at = 0.0
+
+# Only set in worker processes, where the pos tagger is loaded once up front.
+_tagger = None
+
+def _get_connection():
+    global _connection
+    global _count
+    global _touched_flushed_at
+    if _connection is None:
+        _connection = sqlite3.connect(
+                constants.ANNOTATION_CACHE_PATH, check_same_thread=False)
+        _connection.execute('''CREATE TABLE IF NOT EXISTS annotations (
+                name TEXT NOT NULL,
+                text_hash TEXT NOT NULL,
+                tagged TEXT NOT NULL,
+                n_entities INTEGER NOT NULL,
+                last_used REAL NOT NULL,
+                PRIMARY KEY (name, text_hash))''')
+        _connection.execute('''CREATE INDEX IF NOT EXISTS annotations_last_used
+                ON annotations (last_used)''')
+        _connection.commit()
+        _count = _connection.execute('SELECT COUNT(*) FROM annotations').fetchone()[0]
+        _touched.clear()
+        _touched_flushed_at = time.time()
+    return _connection
+
+def _hash(text):
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def _key(name, text):
+    # Comments sent to /classify may not have a name. They are still cached by content.
+    return (name or '', _hash(text))
+
+def _annotation(tagged, entities):
+    n_entities = 0
+    for chunk in entities:
+        if hasattr(chunk, 'label'):
+            n_entities += 1
+    return {'tagged': [list(pair) for pair in tagged], 'n_entities': n_entities}
+
+def compute(text):
+    """Run the nltk pipeline on a single text, skipping the cache."""
+    with metrics.timer('word_tokenize'):
+        tokens = nltk.word_tokenize(text)
+    with metrics.timer('pos_tag'):
+        tagged = nltk.pos_tag(tokens)
+    # https://stackoverflow.com/questions/48660547
+    with metrics.timer('ne_chunk'):
+        entities = nltk.chunk.ne_chunk(tagged)
+    return _annotation(tagged, entities)
+
+def compute_many(texts):
+    """Run the nltk pipeline on a list of texts, skipping the cache.
+
+    The tagger and chunker are only loaded once for the whole list.
+    """
+    with metrics.timer('word_tokenize'):
+        tokenized = [nltk.word_tokenize(text) for text in texts]
+    with metrics.timer('pos_tag'):
+        if _tagger is None:
+            tagged = nltk.pos_tag_sents(tokenized)
+        else:
+            tagged = _tagger.tag_sents(tokenized)
+    with metrics.timer('ne_chunk'):
+        # ne_chunk_sents is lazy.
+        entities = list(nltk.chunk.ne_chunk_sents(tagged))
+    return [_annotation(t, e) for t, e in zip(tagged, entities)]
+
+def _init_worker():
+    """Load the nltk models once for each worker process."""
+    global _tagger
+    _tagger = nltk.tag.PerceptronTagger()
+    # The chunker is cached by nltk.data once it has been loaded.
+    compute_many(['Preload the chunker.'])
+
+def compute_parallel(texts, processes=None, chunk_size=PARALLEL_CHUNK_SIZE):
+    """Run the nltk pipeline on a list of texts across worker processes.
+
+    nltk is pure python, so the texts are split into chunks that are annotated
+    on separate cores. Too few texts to fill two chunks are annotated here.
+
+    # Arguments
+        texts: list of strings.
+        processes: int, number of worker processes. Defaults to the cpu count.
+        chunk_size: int, number of texts sent to a worker at a time.
+
+    # Returns
+        list of annotations, in the same order as texts.
+    """
+    processes = processes or os.cpu_count() or 1
+    if processes <= 1 or len(texts) < 2 * chunk_size:
+        return compute_many(texts)
+
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=min(processes, len(chunks)), initializer=_init_worker) as executor:
+        # map yields the chunks back in order, whichever worker finishes first.
+        return [a for annotations in executor.map(compute_many, chunks) for a in annotations]
+
+def annotate(name, text):
+    """Annotation for a single text. See annotate_many."""
+    return annotate_many([(name, text)])[0]
+
+def annotate_many(named_texts, processes=1):
+    """Annotations for a list of (name, text) pairs, in the same order.
+
+    # Arguments
+        named_texts: list of (comment name, text) tuples
+        processes: int, number of processes to annotate uncached texts with,
+            or None for the cpu count. See compute_parallel.
+
+    # Returns
+        list of dicts with the pos 'tagged' tokens and the number of named
+        entities ('n_entities') in each text.
+    """
+    keys = [_key(name, text) for name, text in named_texts]
+    with metrics.timer('annotation_cache_lookup'):
+        cached = _lookup(keys)
+
+    missing = {}
+    for key, (name, text) in zip(keys, named_texts):
+        if key not in cached and key not in missing:
+            missing[key] = text
+    n_hits = sum(1 for key in keys if key in cached)
+    metrics.count('annotation_cache_hit', n_hits)
+    metrics.count('annotation_cache_miss', len(keys) - n_hits)
+    if missing:
+        texts = list(missing.values())
+        if processes == 1:
+            annotations = compute_many(texts)
+        else:
+            annotations = compute_parallel(texts, processes)
+        computed = dict(zip(missing.keys(), annotations))
+        with metrics.timer('annotation_cache_store'):
+            _store(computed)
+        cached.update(computed)
+
+    return [cached[key] for key in keys]
+
+def _lookup(keys):
+    found = {}
+    unique_keys = list(set(keys))
+    with _lock:
+        connection = _get_connection()
+        for i in range(0, len(unique_keys), _LOOKUP_CHUNK_SIZE):
+            chunk = unique_keys[i:i + _LOOKUP_CHUNK_SIZE]
+            condition = ' OR '.join(['(name = ? AND text_hash = ?)'] * len(chunk))
+            params = [value for key in chunk for value in key]
+            rows = connection.execute(
+                    'SELECT name, text_hash, tagged, n_entities FROM annotations WHERE '
+                    + condition, params)
+            for name, text_hash, tagged, n_entities in rows:
+                found[(name, text_hash)] = {
+                        'tagged': json.loads(tagged), 'n_entities': n_entities}
+
+        if found:
+            now = time.time()
+            _touched.update((key, now) for key in found)
+            if len(_touched) >= _TOUCH_FLUSH_SIZE or now - _touched_flushed_at >= _TOUCH_FLUSH_INTERVAL:
+                _flush_touched(connection)
+                connection.commit()
+    return found
+
+def _flush_touched(connection):
+    """Write the pending last_used times of cache hits. The caller commits."""
+    global _touched_flushed_at
+    if _touched:
+        connection.executemany(
+                'UPDATE annotations SET last_used = ? WHERE name = ? AND text_hash = ?',
+                [(last_used, name, text_hash) for (name, text_hash), last_used in _touched.items()])
+        _touched.clear()
+    _touched_flushed_at = time.time()
+
+def _store(annotations):
+    global _count
+    now = time.time()
+    rows = [(name, text_hash, json.dumps(a['tagged']), a['n_entities'], now)
+            for (name, text_hash), a in annotations.items()]
+    with _lock:
+        connection = _get_connection()
+        # The same key always has the same annotation, so a row stored meanwhile
+        # by another thread is kept, and only new rows are counted.
+        _count += connection.executemany(
+                'INSERT OR IGNORE INTO annotations VALUES (?, ?, ?, ?, ?)', rows).rowcount
+        _flush_touched(connection)
+        _evict(connection)
+        connection.commit()
+
+def _evict(connection):
+    """Drop the least recently used annotations once the cache is over its size limit."""
+    global _count
+    if _count <= constants.ANNOTATION_CACHE_MAX_ENTRIES:
+        return
+    # Another process may share the file, so count exactly before deleting.
+    _count = connection.execute('SELECT COUNT(*) FROM annotations').fetchone()[0]
+    excess = _count - constants.ANNOTATION_CACHE_MAX_ENTRIES
+    if excess > 0:
+        _count -= connection.execute('''DELETE FROM annotations WHERE rowid IN (
+                SELECT rowid FROM annotations ORDER BY last_used LIMIT ?)''', (excess,)).rowcount
+
+def size():
+    with _lock:
+        _get_connection()
+        return _count
+
+def clear():
+    global _count
+    with _lock:
+        connection = _get_connection()
+        connection.execute('DELETE FROM annotations')
+        connection.commit()
+        _count = 0
+        _touched.clear()
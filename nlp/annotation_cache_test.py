@@ -0,0 +1,90 @@
+import unittest
+from unittest import mock
+
+import annotation_cache
+import constants
+
+class AnnotationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path, self.max_entries = constants.ANNOTATION_CACHE_PATH, constants.ANNOTATION_CACHE_MAX_ENTRIES
+        constants.ANNOTATION_CACHE_PATH = ':memory:'
+        annotation_cache._connection = None
+
+    def tearDown(self):
+        constants.ANNOTATION_CACHE_PATH, constants.ANNOTATION_CACHE_MAX_ENTRIES = self.path, self.max_entries
+        annotation_cache._connection = None
+
+    def testMatchesNltk(self):
+        text = 'Kanye West is so wavy 🌊'
+        self.assertDictEqual(annotation_cache.annotate('t1_a', text), annotation_cache.compute(text))
+
+    def testComputedOnce(self):
+        with mock.patch('annotation_cache.compute_many', wraps=annotation_cache.compute_many) as compute_many:
+            annotation_cache.annotate_many([('t1_a', 'wavy'), ('t1_b', 'not wavy'), ('t1_a', 'wavy')])
+            annotation_cache.annotate('t1_a', 'wavy')
+            self.assertEqual(compute_many.call_count, 1)
+            self.assertEqual(annotation_cache.size(), 2)
+
+            # Edited comments are annotated again.
+            annotation_cache.annotate('t1_a', 'wavy, edited')
+            self.assertEqual(compute_many.call_count, 2)
+
+    def testOrder(self):
+        texts = [('t1_a', 'one'), ('t1_b', 'two words'), ('t1_c', 'and three words')]
+        annotation_cache.annotate('t1_b', 'two words')
+        annotations = annotation_cache.annotate_many(texts)
+        self.assertEqual([len(a['tagged']) for a in annotations], [1, 2, 3])
+
+    def testParallelOrder(self):
+        texts = ['text number {}'.format(' word' * i) for i in range(20)]
+        annotations = annotation_cache.compute_parallel(texts, processes=2, chunk_size=3)
+        self.assertEqual(annotations, annotation_cache.compute_many(texts))
+
+    def testParallelOnlyUncached(self):
+        annotation_cache.annotate('t1_a', 'cached')
+        with mock.patch('annotation_cache.compute_parallel', wraps=annotation_cache.compute_parallel) as compute_parallel:
+            annotations = annotation_cache.annotate_many(
+                    [('t1_a', 'cached'), ('t1_b', 'not cached yet')], processes=2)
+            compute_parallel.assert_called_once_with(['not cached yet'], 2)
+            self.assertEqual([len(a['tagged']) for a in annotations], [1, 3])
+
+    def testEviction(self):
+        constants.ANNOTATION_CACHE_MAX_ENTRIES = 2
+        annotation_cache.annotate('t1_a', 'first')
+        annotation_cache.annotate('t1_b', 'second')
+        annotation_cache.annotate('t1_c', 'third')
+        self.assertEqual(annotation_cache.size(), 2)
+
+    def testEvictsLeastRecentlyUsed(self):
+        constants.ANNOTATION_CACHE_MAX_ENTRIES = 2
+        annotation_cache.annotate('t1_a', 'first')
+        annotation_cache.annotate('t1_b', 'second')
+        # The hit is only written to the cache with the next store.
+        annotation_cache.annotate('t1_a', 'first')
+        annotation_cache.annotate('t1_c', 'third')
+        with mock.patch('annotation_cache.compute_many', wraps=annotation_cache.compute_many) as compute_many:
+            annotation_cache.annotate_many([('t1_a', 'first'), ('t1_c', 'third')])
+            self.assertEqual(compute_many.call_count, 0)
+        self.assertEqual(annotation_cache.size(), 2)
+
+    def testHitsDoNotCommit(self):
+        annotation_cache.annotate('t1_a', 'wavy')
+        connection = annotation_cache._get_connection()
+        changes = connection.total_changes
+        annotation_cache.annotate('t1_a', 'wavy')
+        self.assertEqual(connection.total_changes, changes)
+
+    def testManyKeys(self):
+        # More keys than fit in one statement, on SQLite builds limited to 999 parameters.
+        self.assertLessEqual(2 * annotation_cache._LOOKUP_CHUNK_SIZE, 999)
+        named_texts = [('t1_{}'.format(i), 'wavy') for i in range(2 * annotation_cache._LOOKUP_CHUNK_SIZE + 1)]
+        annotation_cache._store({annotation_cache._key(name, text): {'tagged': [], 'n_entities': 0}
+                                 for name, text in named_texts})
+        self.assertEqual(annotation_cache.size(), len(named_texts))
+        with mock.patch('annotation_cache.compute_many') as compute_many:
+            annotation_cache.annotate_many(named_texts)
+            compute_many.assert_not_called()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,148 @@
+"""Seeded generator of synthetic r/kanye style comments, labels and votes.
+
+The same seed and size always give the same corpus, so benchmark runs are
+comparable. Comments have the fields the feature extractors read: short to
+long bodies, emoji (often several in a row), user mentions, replies and top
+level comments across many threads, and some comments by the OP.
+
+Usage:
+    comments = corpus.generate_comments(10000)
+    corpus.seed_backend(storage.MemoryStorage(), comments)
+"""
+
+import random
+
+import constants
+import matcher
+import mongo_handler
+
+DEFAULT_SEED = 1738
+
+PHRASES = [
+    'this is so wavy', 'not wavy at all', 'you are not wavy', 'op is unwavy',
+    'wavy baby', 'ye is the goat', 'this beat goes crazy', 'mbdtf is his best album',
+    'yeezus was ahead of its time', 'ok but have you heard the new album',
+    'the sunday service choir is amazing', 'who else was at the show last night',
+    'i miss the old kanye', 'this thread is a mess', 'we need more posts like this',
+    'copypasta incoming', 'this sub never changes', 'link is dead for me',
+    'the production on this is insane', 'can someone explain the lyrics',
+    'so wavy it hurts', 'least wavy thing i have seen today', 'poster is wavy',
+    'jesus is king is underrated', 'the college dropout still holds up',
+]
+NAMES = [
+    'Kanye', 'Kim', 'Drake', 'Pusha T', 'Kid Cudi', 'Travis Scott', 'Jay-Z',
+    'Chicago', 'Yeezy', 'Donda', 'Mike Dean', 'Tyler',
+]
+EXTRA_EMOJI = ['😂', '💯', '🐐', '🙏', '👀', '😤', '🎵', '👑']
+EMOJI = matcher.USEFUL_EMOJI + EXTRA_EMOJI
+
+def _base36(n):
+    digits = '0123456789abcdefghijklmnopqrstuvwxyz'
+    s = ''
+    while True:
+        n, r = divmod(n, 36)
+        s = digits[r] + s
+        if not n:
+            return s
+
+def _sentence(rng):
+    words = rng.choice(PHRASES)
+    if rng.random() < 0.3:
+        words = rng.choice(NAMES) + ' ' + words
+    if rng.random() < 0.2:
+        words += ' ' + rng.choice(NAMES)
+    if rng.random() < 0.5:
+        words = words[0].upper() + words[1:]
+    return words
+
+def _body(rng):
+    length = rng.random()
+    n_sentences = 1 if length < 0.5 else rng.randint(2, 4) if length < 0.85 else rng.randint(5, 12)
+    sentences = [_sentence(rng) for _ in range(n_sentences)]
+    body = '. '.join(sentences)
+
+    if rng.random() < 0.5:
+        # Emoji are often repeated, or strung together without spaces.
+        run = ''.join(rng.choice(EMOJI) * rng.randint(1, 3) for _ in range(rng.randint(1, 3)))
+        body = body + ' ' + run if rng.random() < 0.8 else run + ' ' + body
+    if rng.random() < 0.05:
+        body += ' u/' + rng.choice(NAMES).replace(' ', '_').lower()
+    if rng.random() < 0.03:
+        body += ' /s'
+    return body
+
+def generate_comments(n, seed=DEFAULT_SEED):
+    """n synthetic comments, oldest first."""
+    rng = random.Random(seed)
+    n_threads = max(1, n // 25)
+    thread_comments = {} # link_id -> names of its comments so far
+    thread_op = {} # link_id -> author of the post
+    authors = ['user_' + _base36(i) for i in range(max(10, n // 5))]
+    created_utc = 1538000000
+
+    comments = []
+    for i in range(n):
+        link_id = 't3_' + _base36(rng.randrange(n_threads))
+        siblings = thread_comments.setdefault(link_id, [])
+        op = thread_op.setdefault(link_id, rng.choice(authors))
+
+        name = 't1_' + _base36(36 ** 6 + i)
+        parent_id = link_id if not siblings or rng.random() < 0.4 else rng.choice(siblings)
+        author = op if rng.random() < 0.1 else rng.choice(authors)
+        created_utc += rng.randint(1, 600)
+
+        comments.append({
+            'name': name,
+            'id': name[3:],
+            'author': author,
+            'body': _body(rng),
+            'created_utc': created_utc,
+            'link_id': link_id,
+            'parent_id': parent_id,
+            'is_submitter': author == op,
+            'score': rng.randint(-5, 200),
+        })
+        siblings.append(name)
+    return comments
+
+def generate_labels(comments, seed=DEFAULT_SEED, curated=0.3, voted=0.1):
+    """Curated labels and user votes for some of the comments.
+
+    # Arguments
+        curated: float, fraction of the comments with a curated label.
+        voted: float, fraction of the comments with user votes (1 to 5 each).
+
+    # Returns
+        (name, category, is_wavy) tuples for mongo_handler.import_curated_labels,
+        and a dict of name to summed vote increments for mongo_handler.add_user_votes.
+    """
+    rng = random.Random(seed)
+    categories = list(constants.CATEGORIES_TEXT)
+    positivities = list(constants.POSITIVITY_TEXT)
+
+    labels = []
+    votes = {}
+    for comment in comments:
+        if rng.random() < curated:
+            category = rng.choice(categories) if rng.random() < 0.95 else None
+            is_wavy = rng.choice(positivities) if rng.random() < 0.7 or not category else None
+            labels.append((comment['name'], category, is_wavy))
+        if rng.random() < voted:
+            increments = {}
+            for _ in range(rng.randint(1, 5)):
+                classification = {constants.CATEGORY: rng.choice(categories)}
+                if rng.random() < 0.7:
+                    classification[constants.POSITIVITY] = rng.choice(positivities)
+                for key, n in mongo_handler.user_vote_increments(classification).items():
+                    increments[key] = increments.get(key, 0) + n
+            votes[comment['name']] = increments
+    return labels, votes
+
+def seed_backend(backend, comments, seed=DEFAULT_SEED):
+    """Makes backend the storage backend, and fills it with the comments and their labels."""
+    mongo_handler.use_backend(backend)
+    backend.insert_comments(comments)
+    labels, votes = generate_labels(comments, seed)
+    mongo_handler.import_curated_labels(labels)
+    mongo_handler.add_user_votes(votes)
+    return labels, votes
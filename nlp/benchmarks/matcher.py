@@ -0,0 +1,63 @@
+"""Emoji & keyword matching over a real comment dump, before and after matcher.py.
+
+Reads the wavy-comments collection from a mongodump tarball, by default the one
+served with the frontend.
+
+Usage (from the nlp directory):
+    python -m benchmarks.matcher [path/to/wavy-data.tar.gz]
+"""
+
+import sys
+import tarfile
+import time
+import warnings
+
+import bson
+import emoji
+
+import constants
+import matcher
+
+DEFAULT_DUMP = '../kanye_realtime/src/client/static/wavy-data.tar.gz'
+
+def load_bodies(path):
+    with tarfile.open(path) as dump:
+        member = next(m for m in dump.getmembers() if m.name.endswith(constants.COMMENTS + '.bson'))
+        return [comment['body'] for comment in bson.decode_all(dump.extractfile(member).read())]
+
+def per_pattern_scan(body):
+    """The feature matching in nlp.get_features before matcher.py, kept for comparison."""
+    body_lowercase = body.lower()
+    hits = ['u/' in body]
+    for e in constants.USEFUL_EMOJI:
+        hits.append(emoji.emojize(e, use_aliases=True) in body)
+    for w in constants.USEFUL_WORDS:
+        hits.append(w in body_lowercase)
+    return hits
+
+def per_pattern_demojize(body):
+    """The feature matching and demojizing for nlp and mlp before matcher.py."""
+    return per_pattern_scan(body), emoji.demojize(body, delimiters=matcher.DEMOJIZE_DELIMITERS)
+
+def timed(function, bodies):
+    start = time.perf_counter()
+    for body in bodies:
+        function(body)
+    return time.perf_counter() - start
+
+def main(path=DEFAULT_DUMP):
+    warnings.simplefilter('ignore', DeprecationWarning)
+    bodies = load_bodies(path)
+    print('{} comments, {} characters'.format(len(bodies), sum(len(b) for b in bodies)))
+
+    rows = [
+        ('features, per pattern', timed(per_pattern_scan, bodies)),
+        ('features, matcher.scan', timed(matcher.scan, bodies)),
+        ('features + demojize, per pattern', timed(per_pattern_demojize, bodies)),
+        ('features + demojize, matcher.scan', timed(lambda b: matcher.scan(b, demojize=True), bodies)),
+    ]
+    for name, seconds in rows:
+        print('{:<36} {:>8.3f}s {:>10.1f}us/comment'.format(name, seconds, 1e6 * seconds / len(bodies)))
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,121 @@
+"""Latency & throughput of /classify's classification, by micro batch size.
+
+Concurrent clients each classify comments one at a time through a
+micro_batcher.MicroBatcher, like concurrent /classify requests. A max batch
+size of 1 classifies each comment on its own, as without batching. Each run
+classifies comments the others have not, so none are in the annotation cache.
+
+By default the Naive Bayes classifiers are trained on a synthetic corpus (see
+corpus.py). With --mlp, an n-gram MLP is used instead: untrained, as only the
+cost of predicting is measured.
+
+Usage (from the nlp directory):
+    python -m benchmarks.micro_batching --batch-sizes 1 8 32 --max-wait-ms 5 --clients 32
+"""
+
+import argparse
+import contextlib
+import sys
+import threading
+import time
+
+import numpy
+
+import constants
+import micro_batcher
+import nlp
+import storage
+import train
+
+from benchmarks import corpus
+
+def nb_classify_many():
+    classifiers = train.train_classifiers()
+    category, positivity = classifiers[constants.CATEGORY], classifiers[constants.POSITIVITY]
+    def classify_many(comments):
+        featuresets = nlp.get_features_batch(comments)
+        return list(zip(category.classify_many(featuresets), positivity.classify_many(featuresets)))
+    return classify_many
+
+def mlp_classify_many(comments):
+    import mlp
+
+    texts = mlp.extract_relevant_metadata_as_strings(comments, processes=1)
+    labels = [i % len(mlp.POSITIVITY_VECTORIZATION) for i in range(len(texts))]
+    vectorizer, selector, x = mlp.fit_ngram_vectorizer(texts, labels)
+    bundles = [mlp.NgramBundle(vectorizer, selector,
+                               mlp.mlp_model(layers=2, units=64, dropout_rate=0.2,
+                                             input_shape=x.shape[1:], num_classes=len(names)),
+                               list(names))
+               for names in [mlp.CATEGORY_VECTORIZATION, mlp.POSITIVITY_VECTORIZATION]]
+    def classify_many(comments):
+        texts = mlp.extract_relevant_metadata_as_strings(comments, processes=1)
+        return list(zip(*[bundle.classify_many(texts) for bundle in bundles]))
+    return classify_many
+
+def run(classify_many, comments, max_batch_size, max_wait, n_clients):
+    """Each client classifies its share of the comments, one at a time.
+
+    # Returns
+        latencies in seconds, the size of each batch, and the total time.
+    """
+    batch_sizes = []
+    def counted_classify_many(batch):
+        batch_sizes.append(len(batch))
+        return classify_many(batch)
+
+    batcher = micro_batcher.MicroBatcher(counted_classify_many, max_batch_size, max_wait)
+    shares = [comments[i::n_clients] for i in range(n_clients)]
+    latencies = [[] for _ in range(n_clients)]
+
+    def client(i):
+        for comment in shares[i]:
+            start = time.perf_counter()
+            batcher.submit(comment).result()
+            latencies[i].append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    batcher.close()
+    return [l for client_latencies in latencies for l in client_latencies], batch_sizes, elapsed
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark micro batched classification.')
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=[1, 4, 16, 64])
+    parser.add_argument('--max-wait-ms', type=float, default=1e3 * constants.CLASSIFY_BATCH_MAX_WAIT)
+    parser.add_argument('--clients', type=int, default=32)
+    parser.add_argument('--requests', type=int, default=1000, help='comments classified per batch size')
+    parser.add_argument('--corpus-size', type=int, default=2000)
+    parser.add_argument('--seed', type=int, default=corpus.DEFAULT_SEED)
+    parser.add_argument('--mlp', action='store_true')
+    args = parser.parse_args(argv)
+
+    constants.ANNOTATION_CACHE_PATH = ':memory:'
+    # Training & batching print as they go, keep stdout for the results.
+    with contextlib.redirect_stdout(sys.stderr):
+        comments = corpus.generate_comments(args.corpus_size, args.seed)
+        corpus.seed_backend(storage.MemoryStorage(), comments, args.seed)
+        classify_many = mlp_classify_many(comments) if args.mlp else nb_classify_many()
+        unseen = corpus.generate_comments(args.requests * len(args.batch_sizes), args.seed + 1)
+
+    print('{} clients, max wait {}ms'.format(args.clients, args.max_wait_ms))
+    print('{:>10} {:>12} {:>10} {:>10} {:>10} {:>12}'.format(
+        'max batch', 'comments/s', 'p50 (ms)', 'p95 (ms)', 'max (ms)', 'mean batch'))
+    for i, max_batch_size in enumerate(args.batch_sizes):
+        comments = unseen[i * args.requests:(i + 1) * args.requests]
+        with contextlib.redirect_stdout(sys.stderr):
+            latencies, batch_sizes, elapsed = run(classify_many, comments, max_batch_size,
+                                                  args.max_wait_ms / 1e3, args.clients)
+        latencies_ms = 1e3 * numpy.array(latencies)
+        print('{:>10} {:>12.0f} {:>10.2f} {:>10.2f} {:>10.2f} {:>12.1f}'.format(
+            max_batch_size, len(comments) / elapsed,
+            numpy.percentile(latencies_ms, 50), numpy.percentile(latencies_ms, 95), latencies_ms.max(),
+            numpy.mean(batch_sizes)))
+
+if __name__ == '__main__':
+    main()
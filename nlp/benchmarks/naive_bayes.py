@@ -0,0 +1,67 @@
+"""Classification latency and batch throughput, nltk vs numpy Naive Bayes.
+
+Uses random featuresets over the fixed feature schema, so it measures only the
+classifiers (no feature extraction or database).
+
+Usage (from the nlp directory):
+    python -m benchmarks.naive_bayes
+"""
+
+import random
+import time
+
+import nltk
+import numpy
+
+import constants
+import feature_matrix
+import numpy_nb
+
+def random_featureset(rng):
+    features = {rng.choice(feature_matrix.LENGTH_FEATURES): True,
+                rng.choice(feature_matrix.NE_FEATURES): True}
+    for fname in feature_matrix.FEATURE_NAMES:
+        if fname not in feature_matrix.BINNED_FEATURES:
+            features[fname] = rng.random() < 0.2
+    return features
+
+def per_second(function, n, repeat=3):
+    best = min(_time(function) for _ in range(repeat))
+    return n / best, best
+
+def _time(function):
+    start = time.perf_counter()
+    function()
+    return time.perf_counter() - start
+
+def main(n_train=1000, batch_sizes=(1, 10, 100, 1000, 10000), seed=1738):
+    rng = random.Random(seed)
+    labels = list(constants.CATEGORIES_TEXT)
+    train = [(random_featureset(rng), rng.choice(labels)) for _ in range(n_train)]
+    matrix = feature_matrix.FeatureMatrix.from_featuresets(
+            list(range(n_train)), [f for f, l in train], {constants.CATEGORY: [l for f, l in train]})
+
+    nltk_train_s = _time(lambda: nltk.NaiveBayesClassifier.train(train))
+    numpy_train_s = _time(lambda: numpy_nb.NumpyNaiveBayesClassifier.train(matrix.X, matrix.labels[constants.CATEGORY]))
+    nltk_classifier = nltk.NaiveBayesClassifier.train(train)
+    numpy_classifier = numpy_nb.NumpyNaiveBayesClassifier.train(matrix.X, matrix.labels[constants.CATEGORY])
+    print('train on {} comments: nltk {:.4f}s, numpy {:.4f}s'.format(n_train, nltk_train_s, numpy_train_s))
+
+    single = random_featureset(rng)
+    n_single = 1000
+    _, nltk_s = per_second(lambda: [nltk_classifier.classify(single) for _ in range(n_single)], n_single)
+    _, numpy_s = per_second(lambda: [numpy_classifier.classify(single) for _ in range(n_single)], n_single)
+    print('single /classify latency: nltk {:.1f}us, numpy {:.1f}us'.format(
+        1e6 * nltk_s / n_single, 1e6 * numpy_s / n_single))
+
+    print('{:>10} {:>16} {:>16} {:>20}'.format('batch', 'nltk (/s)', 'numpy (/s)', 'numpy matrix (/s)'))
+    for batch_size in batch_sizes:
+        batch = [random_featureset(rng) for _ in range(batch_size)]
+        X = numpy.array([feature_matrix.to_row(f) for f in batch])
+        nltk_rate, _ = per_second(lambda: nltk_classifier.classify_many(batch), batch_size)
+        numpy_rate, _ = per_second(lambda: numpy_classifier.classify_many(batch), batch_size)
+        matrix_rate, _ = per_second(lambda: numpy_classifier.classify_matrix(X), batch_size)
+        print('{:>10} {:>16.0f} {:>16.0f} {:>20.0f}'.format(batch_size, nltk_rate, numpy_rate, matrix_rate))
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,239 @@
+"""Times the whole classification path on synthetic corpora of several sizes.
+
+For each size, a seeded corpus (see corpus.py) is loaded into a fresh storage
+backend with an empty annotation cache, then these are timed:
+    training_set_builders: mongo_handler's labeled comment queries
+    get_features: uncached, one comment at a time, on a sample
+    get_features_batch: the whole corpus, uncached, across processes
+    nb_training: nltk, online & numpy Naive Bayes on the labeled comments
+    classify / classify_batch: the server routes, through Flask's test client
+    mlp_ngram_vectorize: mlp.ngram_vectorize (skipped without tensorflow)
+
+Results are written as JSON, and two result files can be compared.
+
+Usage (from the nlp directory):
+    python -m benchmarks.suite --sizes 1000 10000 100000 --output results.json
+    python -m benchmarks.suite --compare old.json new.json
+"""
+
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import nltk
+import numpy
+
+import annotation_cache
+import constants
+import mongo_handler
+import nlp
+import numpy_nb
+import online_nb
+import storage
+
+from benchmarks import corpus
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+# Requests timed for each latency measurement.
+N_REQUESTS = 200
+BATCH_SIZES = [10, 100]
+# Comments featurized one at a time, at most.
+FEATURES_SAMPLE = 1000
+
+def _timed(function):
+    start = time.perf_counter()
+    result = function()
+    return result, time.perf_counter() - start
+
+def _result(name, size, n, seconds, **extra):
+    result = {
+        'name': name,
+        'size': size,
+        'n': n,
+        'seconds': seconds,
+        'per_item_ms': 1e3 * seconds / n if n else None,
+    }
+    result.update(extra)
+    return result
+
+def _latencies(name, size, function, inputs):
+    latencies = []
+    for value in inputs:
+        _, seconds = _timed(lambda: function(value))
+        latencies.append(seconds)
+    latencies_ms = 1e3 * numpy.array(latencies)
+    return _result(name, size, len(inputs), float(sum(latencies)),
+                   p50_ms=float(numpy.percentile(latencies_ms, 50)),
+                   p95_ms=float(numpy.percentile(latencies_ms, 95)),
+                   max_ms=float(latencies_ms.max()))
+
+def _reset_annotation_cache():
+    constants.ANNOTATION_CACHE_PATH = ':memory:'
+    annotation_cache._connection = None
+
+def _backend(name):
+    if name == 'memory':
+        return storage.MemoryStorage()
+    # Never write the synthetic corpus into the real database.
+    constants.DB_KANYE = 'kanye-benchmark'
+    backend = storage.MongoStorage()
+    backend.client.drop_database(constants.DB_KANYE)
+    return backend
+
+def bench_training_set_builders(size):
+    results = []
+    for name, builder in [
+            ('classified_comments_with_labels', mongo_handler.classified_comments_with_labels),
+            ('classified_comments_with_category', mongo_handler.classified_comments_with_category),
+            ('classified_comments_with_positivity', mongo_handler.classified_comments_with_positivity)]:
+        pairs, seconds = _timed(builder)
+        results.append(_result(name, size, len(pairs), seconds))
+    return results
+
+def bench_features(size, comments):
+    sample = comments[:FEATURES_SAMPLE]
+    _, single_s = _timed(lambda: [nlp.get_features(c) for c in sample])
+    # get_features cached the sample, so the batch starts from a cold cache again.
+    _reset_annotation_cache()
+    _, batch_s = _timed(lambda: nlp.get_features_batch(comments, processes=None))
+    return [
+        _result('get_features', size, len(sample), single_s),
+        _result('get_features_batch', size, len(comments), batch_s, processes=os.cpu_count()),
+    ]
+
+def bench_nb_training(size):
+    dataset, dataset_s = _timed(nlp.get_labeled_dataset)
+    results = [_result('get_labeled_dataset', size, len(dataset), dataset_s)]
+    for field in [constants.POSITIVITY, constants.CATEGORY]:
+        rows = dataset.rows_with(field)
+        train = dataset.subset(rows)
+        labeled = train.labeled_featuresets(field)
+        _, nltk_s = _timed(lambda: nltk.NaiveBayesClassifier.train(labeled))
+        _, online_s = _timed(lambda: online_nb.OnlineNaiveBayesClassifier.train(labeled))
+        _, numpy_s = _timed(lambda: numpy_nb.NumpyNaiveBayesClassifier.train(train.X, train.labels[field]))
+        results += [
+            _result('nb_training_nltk', size, len(rows), nltk_s, field=field),
+            _result('nb_training_online', size, len(rows), online_s, field=field),
+            _result('nb_training_numpy', size, len(rows), numpy_s, field=field),
+        ]
+    return results
+
+def bench_classify(size, seed):
+    import server
+    import train
+
+    classifiers = train.train_classifiers()
+    server.positivity_classifier = classifiers[constants.POSITIVITY]
+    server.category_classifier = classifiers[constants.CATEGORY]
+    client = server.app.test_client()
+
+    # Comments the server has not seen, so their annotations are not cached.
+    unseen = corpus.generate_comments(N_REQUESTS * (1 + sum(BATCH_SIZES)), seed=seed + 1)
+    single, rest = unseen[:N_REQUESTS], unseen[N_REQUESTS:]
+    results = [_latencies('classify', size, lambda c: client.post('/classify', json=c), single)]
+    for batch_size in BATCH_SIZES:
+        batches = [rest[i:i + batch_size] for i in range(0, N_REQUESTS * batch_size, batch_size)]
+        rest = rest[N_REQUESTS * batch_size:]
+        results.append(_latencies('classify_batch', size,
+                                  lambda b: client.post('/classify_batch', json=b), batches))
+        results[-1]['batch_size'] = batch_size
+    return results
+
+def bench_mlp(size):
+    try:
+        import mlp
+    except ImportError as e:
+        return [{'name': 'mlp_ngram_vectorize', 'size': size, 'skipped': str(e)}]
+
+    (train_texts, train_labels), (val_texts, _) = mlp.comments_with_classification(constants.POSITIVITY)
+    _, seconds = _timed(lambda: mlp.ngram_vectorize(train_texts, train_labels, val_texts))
+    return [_result('mlp_ngram_vectorize', size, len(train_texts) + len(val_texts), seconds)]
+
+def run(sizes, seed=corpus.DEFAULT_SEED, backend_name='memory'):
+    results = []
+    for size in sizes:
+        print('Generating', size, 'comments', file=sys.stderr)
+        comments = corpus.generate_comments(size, seed)
+        corpus.seed_backend(_backend(backend_name), comments, seed)
+        _reset_annotation_cache()
+
+        for bench in [lambda: bench_training_set_builders(size),
+                      lambda: bench_features(size, comments),
+                      lambda: bench_nb_training(size),
+                      lambda: bench_classify(size, seed),
+                      lambda: bench_mlp(size)]:
+            for result in bench():
+                print(json.dumps(result), file=sys.stderr)
+                results.append(result)
+    return results
+
+def _commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], universal_newlines=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _key(result):
+    return (result['name'], result['size'], result.get('field'), result.get('batch_size'))
+
+def compare(old, new):
+    """Prints the ratio of new to old seconds, for the benchmarks in both result files."""
+    old_results = {_key(r): r for r in old['results'] if 'seconds' in r}
+    print('{:<40} {:>8} {:>12} {:>12} {:>8}'.format('benchmark', 'size', 'old (s)', 'new (s)', 'ratio'))
+    for result in new['results']:
+        key = _key(result)
+        if 'seconds' not in result or key not in old_results:
+            continue
+        name = ' '.join(str(part) for part in [key[0], key[2], key[3]] if part is not None)
+        old_s, new_s = old_results[key]['seconds'], result['seconds']
+        print('{:<40} {:>8} {:>12.4f} {:>12.4f} {:>8.2f}'.format(
+            name, key[1], old_s, new_s, new_s / old_s if old_s else float('inf')))
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the classification path.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES)
+    parser.add_argument('--seed', type=int, default=corpus.DEFAULT_SEED)
+    parser.add_argument('--backend', choices=['memory', 'mongo'], default='memory')
+    parser.add_argument('--output', help='JSON results file (default: stdout)')
+    parser.add_argument('--compare', nargs=2, metavar=('OLD', 'NEW'))
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        with open(args.compare[0]) as old, open(args.compare[1]) as new:
+            compare(json.load(old), json.load(new))
+        return
+
+    # Train & save into a scratch directory, not the server's models.
+    constants.MODEL_DIR = tempfile.mkdtemp(prefix='kanye-benchmark-models-')
+    report = {
+        'meta': {
+            'seed': args.seed,
+            'sizes': args.sizes,
+            'backend': args.backend,
+            'commit': _commit(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'started': datetime.datetime.utcnow().isoformat() + 'Z',
+        },
+    }
+    # The server & handlers print as they go. Keep stdout for the results.
+    with contextlib.redirect_stdout(sys.stderr):
+        report['results'] = run(args.sizes, args.seed, args.backend)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,79 @@
+"""Peak memory of preparing the MLP's training data, by labeled corpus size.
+
+Compares, on seeded synthetic corpora (see corpus.py):
+    in_memory: every text held in a list, vectorized, then densified, as
+        model.fit on the whole matrix may do.
+    streamed: mlp.streamed_ngram_vectorize, then one epoch of mlp.SparseBatches.
+
+Peak memory is measured with tracemalloc, so only python & numpy allocations
+in this process are counted. Annotation runs in this process, from a cold
+cache each time.
+
+Usage (from the nlp directory):
+    python -m benchmarks.training_memory --sizes 5000 20000 80000
+"""
+
+import argparse
+import contextlib
+import sys
+import tracemalloc
+
+import annotation_cache
+import constants
+import mlp
+import storage
+
+from benchmarks import corpus
+
+def _reset_annotation_cache():
+    constants.ANNOTATION_CACHE_PATH = ':memory:'
+    annotation_cache._connection = None
+
+def peak_mb(function):
+    _reset_annotation_cache()
+    tracemalloc.start()
+    try:
+        result = function()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return result, peak / 2 ** 20
+
+def in_memory(mode):
+    (train_names, train_labels), (val_names, _) = mlp.names_with_classification(mode)
+    train_texts = list(mlp.stream_texts(train_names, processes=1))
+    val_texts = list(mlp.stream_texts(val_names, processes=1))
+    x_train, x_val = mlp.ngram_vectorize(train_texts, train_labels, val_texts)
+    x_train.toarray()
+    return x_train.shape
+
+def streamed(mode, batch_size):
+    _, _, (x_train, train_labels), _ = mlp.streamed_ngram_vectorize(mode, processes=1)
+    batches = mlp.SparseBatches(x_train, train_labels, batch_size)
+    for i in range(len(batches)):
+        batches[i]
+    return x_train.shape
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark memory of the MLP training data.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[5000, 20000, 80000])
+    parser.add_argument('--seed', type=int, default=corpus.DEFAULT_SEED)
+    parser.add_argument('--mode', choices=[constants.POSITIVITY, constants.CATEGORY], default=constants.CATEGORY)
+    parser.add_argument('--batch-size', type=int, default=128)
+    args = parser.parse_args(argv)
+
+    print('{:>10} {:>10} {:>10} {:>16} {:>16}'.format(
+        'comments', 'labeled', 'features', 'in_memory (MB)', 'streamed (MB)'))
+    for size in args.sizes:
+        # The handlers & vectorizer print as they go, keep stdout for the results.
+        with contextlib.redirect_stdout(sys.stderr):
+            comments = corpus.generate_comments(size, args.seed)
+            corpus.seed_backend(storage.MemoryStorage(), comments, args.seed)
+            del comments
+            shape, in_memory_mb = peak_mb(lambda: in_memory(args.mode))
+            _, streamed_mb = peak_mb(lambda: streamed(args.mode, args.batch_size))
+        print('{:>10} {:>10} {:>10} {:>16.1f} {:>16.1f}'.format(
+            size, shape[0], shape[1], in_memory_mb, streamed_mb))
+
+if __name__ == '__main__':
+    main()
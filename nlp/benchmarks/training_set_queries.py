@@ -0,0 +1,77 @@
+"""Round trips and wall time to build the training sets from mongodb.
+
+Compares the old per-comment lookup (one get_comment per labeled comment) with
+the bulk path in mongo_handler._combine_official_and_user_classified_comments.
+Only reads from the database.
+
+Usage (from the nlp directory):
+    python -m benchmarks.training_set_queries
+"""
+
+import time
+
+from pymongo import MongoClient
+from pymongo import monitoring
+
+import constants
+import mongo_handler
+import storage
+
+class CommandCounter(monitoring.CommandListener):
+    def __init__(self):
+        self.count = 0
+
+    def started(self, event):
+        self.count += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+def per_comment_lookup(function, field):
+    """The training set builder before the bulk fetch, kept for comparison."""
+    pairs = []
+    used_names = set()
+    for classified_comment in function():
+        full_comment = mongo_handler.get_comment(classified_comment['name'], pretty=False)
+        pairs.append((full_comment, classified_comment[field]))
+        used_names.add(classified_comment['name'])
+
+    for user_classified_comment in mongo_handler.get_all_user_classified_comments():
+        if field in user_classified_comment and user_classified_comment['name'] not in used_names:
+            full_comment = mongo_handler.get_comment(user_classified_comment['name'], pretty=False)
+            pairs.append((full_comment, user_classified_comment[field]))
+            used_names.add(user_classified_comment['name'])
+    return pairs
+
+def measure(counter, builder, function, field):
+    counter.count = 0
+    start = time.perf_counter()
+    pairs = builder(function, field)
+    return len(pairs), counter.count, time.perf_counter() - start
+
+def main():
+    counter = CommandCounter()
+    mongo_handler.use_backend(storage.MongoStorage(MongoClient(event_listeners=[counter])))
+
+    builders = [
+        ('per comment', per_comment_lookup),
+        ('bulk', mongo_handler._combine_official_and_user_classified_comments),
+    ]
+    fields = [
+        (constants.CATEGORY, mongo_handler.get_categorized_classified_comments),
+        (constants.POSITIVITY, mongo_handler.get_positivity_classified_comments),
+    ]
+
+    print('{:<12} {:<12} {:>8} {:>12} {:>10}'.format(
+        'field', 'builder', 'pairs', 'round trips', 'seconds'))
+    for field, function in fields:
+        for builder_name, builder in builders:
+            n_pairs, round_trips, seconds = measure(counter, builder, function, field)
+            print('{:<12} {:<12} {:>8} {:>12} {:>10.3f}'.format(
+                field, builder_name, n_pairs, round_trips, seconds))
+
+if __name__ == '__main__':
+    main()
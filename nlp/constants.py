@@ -7,11 +7,17 @@ DB_TEST = 'test'
 COMMENTS = 'wavy-comments'
 TRAIN_CATEGORIES = 'wavy-categories'
 USER_CLASSIFIED = 'user-classification'
+STATISTICS = 'statistics'
 
 # Names for fields
 POSITIVITY = 'is_wavy'
 CATEGORY = 'category'
 
+# Fields for the majority user vote, kept up to date on each user classification.
+MAJORITY_POSITIVITY = 'majority_is_wavy'
+MAJORITY_CATEGORY = 'majority_category'
+N_VOTES = 'n_votes'
+
 # Python remembers order of insertion for 3.7+
 
 # Positive or negative use
@@ -58,3 +64,34 @@ USEFUL_WORDS = [
         'Kanye',
         '/s'
 ]
+
+# Local cache of nltk annotations, see annotation_cache.py
+ANNOTATION_CACHE_PATH = 'annotations.sqlite3'
+ANNOTATION_CACHE_MAX_ENTRIES = 200000
+
+# Directory for trained model versions, see model_store.py
+MODEL_DIR = 'models'
+
+# Classifiers the server uses: 'nb' (model_store's Naive Bayes versions) or
+# 'mlp' (the n-gram bundles saved by mlp.train_ngram_model).
+CLASSIFIER_MODE = 'nb'
+# Directory for the n-gram model bundles, one per mode. See mlp.save_bundle
+MLP_MODEL_DIR = 'mlp_models'
+
+# Buffering of user votes, see vote_buffer.py. When off, each vote is written as it comes.
+BUFFER_USER_VOTES = False
+VOTE_BUFFER_MAX_VOTES = 100
+VOTE_BUFFER_MAX_DELAY = 2 # seconds
+
+# Batching of /classify requests, see micro_batcher.py. When off, each request is classified on its own.
+MICRO_BATCH_CLASSIFY = False
+CLASSIFY_BATCH_MAX_SIZE = 32
+CLASSIFY_BATCH_MAX_WAIT = 0.005 # seconds
+
+# Storage for comments, labels & votes, see storage.py: 'mongo' or 'memory'.
+STORAGE_BACKEND = 'mongo'
+# Optional mongodump tarball the 'memory' backend starts from.
+MEMORY_STORAGE_DUMP = None
+
+# Stage timers & counters served at /metrics, see metrics.py
+METRICS_ENABLED = True
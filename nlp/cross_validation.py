@@ -0,0 +1,160 @@
+"""k-fold cross validation of the Naive Bayes classifiers.
+
+A single test/train split (see nlp.test_train_sets) gives a noisy accuracy.
+Here the labeled comments are featurized once (nlp.get_labeled_dataset), split
+into k stratified folds, and each fold is scored by a classifier trained on the
+others. Folds are trained & scored in parallel processes, using
+numpy_nb.NumpyNaiveBayesClassifier, which predicts the same as the nltk and
+online classifiers the server uses.
+
+Usage (from the nlp directory):
+    python cross_validation.py [k]
+
+    reports = cross_validation.evaluate(k=10)
+    reports['is_wavy']['accuracy_mean'], reports['is_wavy']['classes']['wavy']['precision']
+"""
+
+import concurrent.futures
+import os
+import random
+import statistics
+import sys
+
+import numpy
+
+import constants
+import nlp
+import numpy_nb
+
+DEFAULT_K = 10
+DEFAULT_SEED = 1738
+
+def stratified_folds(labels, k=DEFAULT_K, seed=DEFAULT_SEED):
+    """Split row indices into k folds, each with about the same share of every label.
+
+    # Returns
+        list of k lists of row indices.
+    """
+    if k < 2:
+        raise ValueError('Cross validation needs at least 2 folds, not {}'.format(k))
+    if len(labels) < k:
+        raise ValueError('Cannot split {} rows into {} folds'.format(len(labels), k))
+    rng = random.Random(seed)
+    rows_by_label = {}
+    for i, label in enumerate(labels):
+        rows_by_label.setdefault(label, []).append(i)
+
+    folds = [[] for _ in range(k)]
+    # Deal the rows of each label round the folds, carrying on from the last label.
+    n_dealt = 0
+    for label in sorted(rows_by_label):
+        rows = rows_by_label[label]
+        rng.shuffle(rows)
+        for row in rows:
+            folds[n_dealt % k].append(row)
+            n_dealt += 1
+    return folds
+
+# Set in each worker process by _init_worker, so X & y are sent once per worker.
+_X = None
+_y = None
+
+def _init_worker(X, y):
+    global _X
+    global _y
+    _X, _y = X, y
+
+def _score_fold(test_rows):
+    """Train on every row but test_rows, and classify test_rows.
+
+    # Returns
+        (true label, predicted label) for each test row.
+    """
+    train = numpy.ones(len(_y), dtype=bool)
+    train[test_rows] = False
+    classifier = numpy_nb.NumpyNaiveBayesClassifier.train(_X[train], list(_y[train]))
+    return list(zip(_y[test_rows].tolist(), classifier.classify_matrix(_X[test_rows])))
+
+def score_folds(X, y, folds, processes=None):
+    """The (true, predicted) labels of each fold, scored in parallel.
+
+    # Arguments
+        X: numpy bool array, the features of each row.
+        y: list, the label of each row.
+        folds: list of lists of row indices, see stratified_folds.
+        processes: int, number of worker processes. Defaults to the cpu count.
+    """
+    y = numpy.asarray(y, dtype=object)
+    processes = min(processes or os.cpu_count() or 1, len(folds))
+    if processes <= 1:
+        _init_worker(X, y)
+        return [_score_fold(fold) for fold in folds]
+
+    with concurrent.futures.ProcessPoolExecutor(
+            max_workers=processes, initializer=_init_worker, initargs=(X, y)) as executor:
+        return list(executor.map(_score_fold, folds))
+
+def report(fold_predictions):
+    """Accuracy across folds, and precision & recall for each class.
+
+    Precision & recall are over the predictions of all folds together.
+    """
+    accuracies = [sum(true == predicted for true, predicted in predictions) / len(predictions)
+                  for predictions in fold_predictions]
+    pairs = [pair for predictions in fold_predictions for pair in predictions]
+
+    classes = {}
+    for label in sorted(set(true for true, _ in pairs) | set(predicted for _, predicted in pairs)):
+        true_positives = sum(1 for true, predicted in pairs if true == label and predicted == label)
+        n_predicted = sum(1 for _, predicted in pairs if predicted == label)
+        support = sum(1 for true, _ in pairs if true == label)
+        classes[label] = {
+            'precision': true_positives / n_predicted if n_predicted else 0.0,
+            'recall': true_positives / support if support else 0.0,
+            'support': support,
+        }
+    return {
+        'k': len(fold_predictions),
+        'n': len(pairs),
+        'accuracies': accuracies,
+        'accuracy_mean': statistics.mean(accuracies),
+        'accuracy_stdev': statistics.stdev(accuracies),
+        'classes': classes,
+    }
+
+def cross_validate(dataset, field, k=DEFAULT_K, seed=DEFAULT_SEED, processes=None):
+    """k-fold cross validation of the classifier for field, on a FeatureMatrix."""
+    rows = dataset.rows_with(field)
+    labels = [dataset.labels[field][i] for i in rows]
+    folds = stratified_folds(labels, k, seed)
+    return report(score_folds(dataset.X[rows], labels, folds, processes))
+
+def evaluate(dataset=None, k=DEFAULT_K, seed=DEFAULT_SEED, processes=None):
+    """Cross validate both the positivity & category classifiers.
+
+    # Arguments
+        dataset: FeatureMatrix from nlp.get_labeled_dataset. Fetched &
+            featurized if not given.
+
+    # Returns
+        dict, maps 'is_wavy' & 'category' to their report (see report).
+    """
+    if dataset is None:
+        dataset = nlp.get_labeled_dataset(processes)
+    return {field: cross_validate(dataset, field, k, seed, processes)
+            for field in [constants.POSITIVITY, constants.CATEGORY]}
+
+def format_report(field, field_report):
+    lines = ['{}: accuracy {:.3f} +/- {:.3f} over {} folds of {} comments'.format(
+        field, field_report['accuracy_mean'], field_report['accuracy_stdev'],
+        field_report['k'], field_report['n'])]
+    lines.append('    {:<15} {:>10} {:>10} {:>10}'.format('label', 'precision', 'recall', 'support'))
+    for label, scores in field_report['classes'].items():
+        lines.append('    {:<15} {:>10.3f} {:>10.3f} {:>10}'.format(
+            label, scores['precision'], scores['recall'], scores['support']))
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    k = int(sys.argv[1]) if len(sys.argv) > 1 else DEFAULT_K
+    for field, field_report in evaluate(k=k).items():
+        print(format_report(field, field_report))
@@ -0,0 +1,74 @@
+import random
+import unittest
+
+import nltk
+
+import constants
+import cross_validation
+import feature_matrix
+import numpy_nb_test
+
+labels = ['wavy', 'not_wavy', 'ambiguous']
+
+class CrossValidationTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1738)
+        labeled = [numpy_nb_test.random_featureset(rng, labels) for _ in range(200)]
+        # Some rows without a positivity label, as in the real dataset.
+        positivities = [label if i % 10 else None for i, (_, label) in enumerate(labeled)]
+        self.dataset = feature_matrix.FeatureMatrix.from_featuresets(
+                ['t1_{}'.format(i) for i in range(len(labeled))],
+                [features for features, _ in labeled],
+                {constants.POSITIVITY: positivities, constants.CATEGORY: [None] * len(labeled)})
+
+    def testStratifiedFolds(self):
+        y = ['a'] * 30 + ['b'] * 10 + ['c'] * 3
+        folds = cross_validation.stratified_folds(y, k=5)
+        self.assertEqual(sorted(row for fold in folds for row in fold), list(range(len(y))))
+        for fold in folds:
+            self.assertEqual(sum(1 for row in fold if y[row] == 'a'), 6)
+            self.assertEqual(sum(1 for row in fold if y[row] == 'b'), 2)
+        self.assertEqual([len(fold) for fold in folds], [9, 9, 9, 8, 8])
+        self.assertEqual(folds, cross_validation.stratified_folds(y, k=5))
+
+        with self.assertRaises(ValueError):
+            cross_validation.stratified_folds(y, k=1)
+        with self.assertRaises(ValueError):
+            cross_validation.stratified_folds(y[:3], k=5)
+
+    def testSameAsNltk(self):
+        rows = self.dataset.rows_with(constants.POSITIVITY)
+        y = [self.dataset.labels[constants.POSITIVITY][i] for i in rows]
+        X = self.dataset.X[rows]
+        folds = cross_validation.stratified_folds(y, k=4)
+
+        serial = cross_validation.score_folds(X, y, folds, processes=1)
+        self.assertEqual(cross_validation.score_folds(X, y, folds, processes=2), serial)
+        for fold, predictions in zip(folds, serial):
+            train = [(feature_matrix.to_featureset(X[i]), y[i]) for i in range(len(y)) if i not in fold]
+            classifier = nltk.NaiveBayesClassifier.train(train)
+            self.assertEqual(predictions, [
+                (y[i], classifier.classify(feature_matrix.to_featureset(X[i]))) for i in fold])
+
+    def testReport(self):
+        report = cross_validation.report([
+            [('wavy', 'wavy'), ('wavy', 'not_wavy')],
+            [('not_wavy', 'not_wavy'), ('wavy', 'wavy')],
+        ])
+        self.assertEqual(report['accuracies'], [0.5, 1.0])
+        self.assertEqual(report['accuracy_mean'], 0.75)
+        self.assertEqual(report['classes']['wavy'], {'precision': 1.0, 'recall': 2 / 3, 'support': 3})
+        self.assertEqual(report['classes']['not_wavy'], {'precision': 0.5, 'recall': 1.0, 'support': 1})
+
+    def testCrossValidate(self):
+        report = cross_validation.cross_validate(self.dataset, constants.POSITIVITY, k=5, processes=1)
+        self.assertEqual(report['n'], len(self.dataset.rows_with(constants.POSITIVITY)))
+        self.assertEqual(len(report['accuracies']), 5)
+        self.assertEqual(sorted(report['classes']), sorted(labels))
+        text = cross_validation.format_report(constants.POSITIVITY, report)
+        for label in labels:
+            self.assertIn(label, text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,169 @@
+"""Evaluates saved model versions on the comments they were not trained on.
+
+Each version's manifest names its held-out comments (see train.py). Their
+features come from one nlp.get_labeled_dataset, and each classifier labels
+all of them in one batched call over the feature matrix. Confusion matrices
+and per-label precision, recall & f1 are numpy arrays. Evaluations are cached
+with their version (see model_store.save_evaluation), so comparing versions
+only evaluates the new ones.
+
+Usage (from the nlp directory):
+    python evaluation.py [version ...] # compares versions, by default all of them
+
+    result = evaluation.evaluate() # the newest version
+    result['fields']['is_wavy']['accuracy'], result['fields']['is_wavy']['confusion_matrix']
+"""
+
+import sys
+
+import numpy
+
+import constants
+import feature_matrix
+import metrics
+import model_store
+import nlp
+
+# Keys of a field's evaluation that hold arrays.
+ARRAY_KEYS = ['confusion_matrix', 'precision', 'recall', 'f1', 'support']
+
+def classify_matrix(classifier, X):
+    """Labels for every row of a feature matrix, in one batched call."""
+    if len(X) == 0:
+        return []
+    numpy_classifier = classifier.numpy_classifier() if hasattr(classifier, 'numpy_classifier') else None
+    if numpy_classifier:
+        return numpy_classifier.classify_matrix(X)
+    return classifier.classify_many([feature_matrix.to_featureset(row) for row in X])
+
+def confusion_matrix(true, predicted, labels):
+    """(labels x labels) counts: rows are the true labels, columns the predicted ones."""
+    index = {label: i for i, label in enumerate(labels)}
+    matrix = numpy.zeros((len(labels), len(labels)), dtype=int)
+    rows = numpy.array([index[label] for label in true], dtype=int)
+    columns = numpy.array([index[label] for label in predicted], dtype=int)
+    numpy.add.at(matrix, (rows, columns), 1)
+    return matrix
+
+def _ratio(numerator, denominator):
+    return numpy.divide(numerator, denominator, out=numpy.zeros(len(numerator)), where=denominator > 0)
+
+def field_evaluation(true, predicted, labels=None):
+    """Accuracy, confusion matrix, and per-label precision, recall, f1 & support."""
+    labels = labels or sorted(set(true) | set(predicted))
+    matrix = confusion_matrix(true, predicted, labels)
+    true_positives = numpy.diag(matrix)
+    support = matrix.sum(axis=1)
+    precision = _ratio(true_positives, matrix.sum(axis=0))
+    recall = _ratio(true_positives, support)
+    return {
+        'labels': labels,
+        'n': len(true),
+        'accuracy': float(true_positives.sum() / len(true)) if len(true) else 0.0,
+        'confusion_matrix': matrix,
+        'precision': precision,
+        'recall': recall,
+        'f1': _ratio(2 * precision * recall, precision + recall),
+        'support': support,
+    }
+
+def _held_out_rows(dataset, field, names):
+    """Rows of the held-out comments still labeled for field, or every labeled row if names is None."""
+    labeled = dataset.rows_with(field)
+    if names is None:
+        return labeled
+    index = {dataset.names[i]: i for i in labeled}
+    return [index[name] for name in names if name in index]
+
+def _to_json(result):
+    fields = {field: dict(evaluation, **{key: evaluation[key].tolist() for key in ARRAY_KEYS})
+              for field, evaluation in result['fields'].items()}
+    return dict(result, fields=fields)
+
+def _from_json(result):
+    fields = {field: dict(evaluation, **{key: numpy.array(evaluation[key]) for key in ARRAY_KEYS})
+              for field, evaluation in result['fields'].items()}
+    return dict(result, fields=fields)
+
+@metrics.timed('evaluate')
+def evaluate(version=None, dataset=None, refresh=False):
+    """Evaluate a saved version, by default the newest, on its held-out comments.
+
+    # Arguments
+        version: string, see model_store.versions.
+        dataset: FeatureMatrix from nlp.get_labeled_dataset, fetched if needed.
+        refresh: bool, whether to evaluate again rather than use the cached result.
+
+    # Returns
+        dict with the 'version', and its evaluation (see field_evaluation) for
+        each of 'fields'. Versions saved before held-out comments were
+        recorded are evaluated on every labeled comment, and have
+        'held_out': False for that field.
+
+    # Raises
+        ValueError: if there is no saved version.
+    """
+    version = version or model_store.latest_version()
+    if not version:
+        raise ValueError('No saved model versions in {}'.format(constants.MODEL_DIR))
+    if not refresh:
+        cached = model_store.load_evaluation(version)
+        if cached is not None:
+            return _from_json(cached)
+
+    classifiers, manifest = model_store.load(version)
+    if dataset is None:
+        dataset = nlp.get_labeled_dataset()
+    held_out = manifest.get('held_out', {})
+
+    result = {'version': version, 'fields': {}}
+    for field, classifier in sorted(classifiers.items()):
+        rows = _held_out_rows(dataset, field, held_out.get(field))
+        true = [dataset.labels[field][i] for i in rows]
+        evaluation = field_evaluation(true, classify_matrix(classifier, dataset.X[rows]))
+        evaluation['held_out'] = field in held_out
+        result['fields'][field] = evaluation
+
+    model_store.save_evaluation(version, _to_json(result))
+    return result
+
+def compare(versions=None, dataset=None):
+    """Evaluations of several versions (by default all of them), oldest first.
+
+    The dataset is only fetched if a version has not been evaluated yet.
+    """
+    results = []
+    for version in versions or model_store.versions():
+        if dataset is None and model_store.load_evaluation(version) is None:
+            dataset = nlp.get_labeled_dataset()
+        results.append(evaluate(version, dataset))
+    return results
+
+def format_evaluation(result):
+    lines = ['Version {}'.format(result['version'])]
+    for field, evaluation in sorted(result['fields'].items()):
+        lines.append('{}: accuracy {:.3f} on {} {}comments'.format(
+            field, evaluation['accuracy'], evaluation['n'],
+            'held-out ' if evaluation['held_out'] else ''))
+        labels = evaluation['labels']
+        width = max([15] + [len(label) + 1 for label in labels])
+        lines.append('    {:<{w}} {:>10} {:>10} {:>10} {:>10}'.format(
+            'label', 'precision', 'recall', 'f1', 'support', w=width))
+        for i, label in enumerate(labels):
+            lines.append('    {:<{w}} {:>10.3f} {:>10.3f} {:>10.3f} {:>10}'.format(
+                label, evaluation['precision'][i], evaluation['recall'][i], evaluation['f1'][i],
+                evaluation['support'][i], w=width))
+        lines.append('    confusion matrix (rows: true, columns: predicted)')
+        for label, row in zip(labels, evaluation['confusion_matrix']):
+            lines.append('    {:<{w}} {}'.format(label, ' '.join('{:>6}'.format(n) for n in row), w=width))
+    return '\n'.join(lines)
+
+if __name__ == '__main__':
+    results = compare(sys.argv[1:])
+    print('{:<26} {}'.format('version', ' '.join('{:>10}'.format(f) for f in [constants.POSITIVITY, constants.CATEGORY])))
+    for result in results:
+        print('{:<26} {}'.format(result['version'], ' '.join(
+            '{:>10.3f}'.format(result['fields'][f]['accuracy']) if f in result['fields'] else '{:>10}'.format('-')
+            for f in [constants.POSITIVITY, constants.CATEGORY])))
+    if results:
+        print(format_evaluation(results[-1]))
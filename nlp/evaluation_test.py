@@ -0,0 +1,100 @@
+import random
+import shutil
+import tempfile
+import unittest
+
+import nltk
+import numpy
+
+import constants
+import evaluation
+import feature_matrix
+import model_store
+import nlp
+import numpy_nb_test
+
+labels = ['wavy', 'not_wavy', 'ambiguous']
+
+class EvaluationTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = constants.MODEL_DIR
+        constants.MODEL_DIR = tempfile.mkdtemp()
+
+        rng = random.Random(1738)
+        labeled = [numpy_nb_test.random_featureset(rng, labels) for _ in range(300)]
+        self.dataset = feature_matrix.FeatureMatrix.from_featuresets(
+                ['t1_{}'.format(i) for i in range(len(labeled))],
+                [features for features, _ in labeled],
+                {constants.POSITIVITY: [label for _, label in labeled]})
+        self.train = self.dataset.subset(range(200))
+        self.classifier = nlp.train_online_classifier(self.train, constants.POSITIVITY)
+        self.held_out = self.dataset.names[200:]
+
+    def tearDown(self):
+        shutil.rmtree(constants.MODEL_DIR)
+        constants.MODEL_DIR = self.model_dir
+
+    def save(self, held_out=True):
+        manifest = {'held_out': {constants.POSITIVITY: self.held_out}} if held_out else {}
+        return model_store.save({constants.POSITIVITY: self.classifier}, manifest)
+
+    def testSameAsOneAtATime(self):
+        version = self.save()
+        result = evaluation.evaluate(version, self.dataset)
+        positivity = result['fields'][constants.POSITIVITY]
+        self.assertTrue(positivity['held_out'])
+        self.assertEqual(positivity['n'], 100)
+
+        test = self.dataset.subset(range(200, 300)).labeled_featuresets(constants.POSITIVITY)
+        classifier = nltk.NaiveBayesClassifier.train(self.train.labeled_featuresets(constants.POSITIVITY))
+        true = [label for _, label in test]
+        predicted = [classifier.classify(features) for features, _ in test]
+        self.assertAlmostEqual(positivity['accuracy'], nltk.classify.accuracy(classifier, test))
+
+        cm = nltk.ConfusionMatrix(true, predicted)
+        for i, true_label in enumerate(positivity['labels']):
+            for j, predicted_label in enumerate(positivity['labels']):
+                self.assertEqual(positivity['confusion_matrix'][i, j], cm[true_label, predicted_label])
+
+    def testFieldEvaluation(self):
+        result = evaluation.field_evaluation(
+                ['wavy', 'wavy', 'wavy', 'not_wavy'], ['wavy', 'wavy', 'not_wavy', 'ambiguous'])
+        self.assertEqual(result['labels'], ['ambiguous', 'not_wavy', 'wavy'])
+        numpy.testing.assert_array_equal(result['confusion_matrix'], [[0, 0, 0], [1, 0, 0], [0, 1, 2]])
+        numpy.testing.assert_allclose(result['precision'], [0, 0, 1])
+        numpy.testing.assert_allclose(result['recall'], [0, 0, 2 / 3])
+        numpy.testing.assert_allclose(result['f1'], [0, 0, 0.8])
+        numpy.testing.assert_array_equal(result['support'], [0, 1, 3])
+        self.assertEqual(result['accuracy'], 0.5)
+        self.assertEqual(evaluation.field_evaluation([], [])['accuracy'], 0.0)
+
+    def testCached(self):
+        version = self.save()
+        result = evaluation.evaluate(version, self.dataset)
+        # No dataset is needed once a version has been evaluated.
+        cached = evaluation.evaluate(version)
+        numpy.testing.assert_array_equal(cached['fields'][constants.POSITIVITY]['confusion_matrix'],
+                                         result['fields'][constants.POSITIVITY]['confusion_matrix'])
+        self.assertEqual(cached['fields'][constants.POSITIVITY]['accuracy'],
+                         result['fields'][constants.POSITIVITY]['accuracy'])
+        self.assertEqual([r['version'] for r in evaluation.compare()], [version])
+
+        self.held_out = self.dataset.names[250:]
+        refreshed = evaluation.evaluate(version, self.dataset, refresh=True)
+        self.assertEqual(refreshed['fields'][constants.POSITIVITY]['n'], 100)
+        self.assertIn('confusion matrix', evaluation.format_evaluation(refreshed))
+
+    def testWithoutHeldOut(self):
+        version = self.save(held_out=False)
+        positivity = evaluation.evaluate(version, self.dataset)['fields'][constants.POSITIVITY]
+        self.assertFalse(positivity['held_out'])
+        self.assertEqual(positivity['n'], 300)
+
+    def testNoVersions(self):
+        with self.assertRaises(ValueError) as context:
+            evaluation.evaluate()
+        self.assertEqual(str(context.exception), 'No saved model versions in ' + constants.MODEL_DIR)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+"""Fixed boolean feature schema, and an eager feature matrix for labeled comments.
+
+Every feature nlp.get_features produces is a boolean from a small, known set.
+A FeatureMatrix holds the features for a whole dataset as one boolean array, so
+training, evaluation and confusion matrices can all reuse it without extracting
+features again.
+
+Usage:
+    dataset = nlp.get_labeled_dataset()
+    test, train = nlp.test_train_sets(dataset, 'is_wavy')
+    train.X, train.labels['is_wavy'], train.labeled_featuresets('is_wavy')
+"""
+
+import emoji
+import numpy
+
+import constants
+
+# NaiveBayes cannot take non-binary values, so these are binned. Only the
+# matching bin is set, the others are left out of the featureset.
+LENGTH_FEATURES = ['short', 'mid-length', 'long']
+NE_FEATURES = ['no ne', 'one ne', 'multiple ne']
+BINNED_FEATURES = frozenset(LENGTH_FEATURES + NE_FEATURES)
+
+# Maps each of constants.USEFUL_EMOJI / USEFUL_WORDS to the name of its feature.
+EMOJI_FEATURES = {
+    emoji.emojize(e, use_aliases=True): 'emoji ({})'.format(emoji.emojize(e, use_aliases=True))
+    for e in constants.USEFUL_EMOJI
+}
+WORD_FEATURES = {w: 'contains \'{}\''.format(w) for w in constants.USEFUL_WORDS}
+
+FEATURE_NAMES = (
+    LENGTH_FEATURES
+    + ['top level comment', 'is OP', 'mentions user']
+    + list(EMOJI_FEATURES.values())
+    + list(WORD_FEATURES.values())
+    + NE_FEATURES
+)
+FEATURE_INDEX = {name: i for i, name in enumerate(FEATURE_NAMES)}
+
+def to_row(featureset):
+    row = numpy.zeros(len(FEATURE_NAMES), dtype=bool)
+    for fname, fval in featureset.items():
+        if fval:
+            row[FEATURE_INDEX[fname]] = True
+    return row
+
+def to_featureset(row):
+    """The featureset for a row, exactly as nlp.get_features returned it."""
+    return {fname: bool(fval) for fname, fval in zip(FEATURE_NAMES, row)
+            if fval or fname not in BINNED_FEATURES}
+
+class FeatureMatrix:
+
+    def __init__(self, names, X, labels):
+        """
+        # Arguments
+            names: list, comment name of each row.
+            X: numpy bool array, (rows x FEATURE_NAMES).
+            labels: dict, maps 'is_wavy'/'category' to a list with the label of
+                each row, or None if the row has no label for it.
+        """
+        self.names = list(names)
+        self.X = X
+        self.labels = {field: list(column) for field, column in labels.items()}
+
+    @classmethod
+    def from_featuresets(cls, names, featuresets, labels):
+        X = numpy.zeros((len(featuresets), len(FEATURE_NAMES)), dtype=bool)
+        for i, featureset in enumerate(featuresets):
+            X[i] = to_row(featureset)
+        return cls(names, X, labels)
+
+    def __len__(self):
+        return len(self.names)
+
+    def rows_with(self, field):
+        """Indices of the rows labeled for field."""
+        return [i for i, label in enumerate(self.labels[field]) if label is not None]
+
+    def subset(self, rows):
+        rows = list(rows)
+        return FeatureMatrix(
+            [self.names[i] for i in rows],
+            self.X[rows],
+            {field: [column[i] for i in rows] for field, column in self.labels.items()})
+
+    def featuresets(self):
+        return [to_featureset(row) for row in self.X]
+
+    def labeled_featuresets(self, field):
+        """(featureset, label) tuples for the rows labeled for field, as nltk expects."""
+        return [(to_featureset(self.X[i]), self.labels[field][i]) for i in self.rows_with(field)]
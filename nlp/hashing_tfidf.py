@@ -0,0 +1,78 @@
+"""Tf-idf n-gram features over a fixed number of hashed columns.
+
+sklearn's TfidfVectorizer keeps a vocabulary: it must be refit on the whole
+corpus to learn new words, and grows with every new one. Here each n-gram is
+hashed to one of n_features columns instead, so new comments are vectorized
+without a refit, and memory stays fixed. The idf is kept up to date from
+document counts per column, which partial_fit adds to.
+
+Usage:
+    vectorizer = HashingTfidfVectorizer(n_features=2 ** 15, ngram_range=(1, 2))
+    x = vectorizer.fit_transform(texts)
+    vectorizer.partial_fit(new_texts) # updates the idf
+    x_new = vectorizer.transform(new_texts)
+"""
+
+import numpy
+
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+class HashingTfidfVectorizer:
+
+    def __init__(self, n_features=2 ** 18, use_idf=True, dtype=numpy.float32, **kwargs):
+        """
+        # Arguments
+            n_features: int, number of columns n-grams are hashed to.
+            use_idf: bool, whether to weight counts by idf. If not, rows are
+                normalized counts.
+            dtype: type of the vectorized matrices.
+            kwargs: passed on to sklearn's HashingVectorizer, eg. ngram_range.
+        """
+        self.n_features = n_features
+        self.use_idf = use_idf
+        self.dtype = dtype
+        self.hashing = HashingVectorizer(n_features=n_features, alternate_sign=False, norm=None,
+                                         dtype=dtype, **kwargs)
+        self.n_documents = 0
+        # Number of documents with an n-gram hashed to each column.
+        self.document_counts = numpy.zeros(n_features, dtype=numpy.int64)
+
+    def _counts(self, texts):
+        counts = self.hashing.transform(texts)
+        counts.sum_duplicates()
+        return counts
+
+    def _add_document_counts(self, counts):
+        self.n_documents += counts.shape[0]
+        self.document_counts += numpy.bincount(counts.indices, minlength=self.n_features)
+
+    def idf(self):
+        # Smoothed like TfidfVectorizer's: as if one more document had every n-gram.
+        return (numpy.log((1 + self.n_documents) / (1 + self.document_counts)) + 1).astype(self.dtype)
+
+    def _weigh(self, counts):
+        if self.use_idf:
+            counts.data *= self.idf()[counts.indices]
+        return normalize(counts, copy=False)
+
+    def partial_fit(self, texts):
+        """Add the texts to the document counts behind the idf."""
+        self._add_document_counts(self._counts(texts))
+        return self
+
+    def fit(self, texts):
+        self.n_documents = 0
+        self.document_counts[:] = 0
+        return self.partial_fit(texts)
+
+    def fit_transform(self, texts):
+        """fit then transform, hashing texts (which may be a generator) once."""
+        self.n_documents = 0
+        self.document_counts[:] = 0
+        counts = self._counts(texts)
+        self._add_document_counts(counts)
+        return self._weigh(counts)
+
+    def transform(self, texts):
+        return self._weigh(self._counts(texts))
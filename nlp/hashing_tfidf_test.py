@@ -0,0 +1,60 @@
+import unittest
+
+import numpy
+
+from sklearn.feature_extraction.text import TfidfVectorizer
+
+import hashing_tfidf
+
+texts = [
+    'this is so wavy _water_wave_',
+    'not wavy at all _is_op',
+    'ye is the goat _top_level_comment',
+    'so wavy it hurts _water_wave_ _water_wave_',
+]
+new_texts = ['new slang just dropped', 'so wavy new slang']
+
+def row_values(x):
+    # The columns differ, so compare the sorted values of each row.
+    x = x.tocsr()
+    return [sorted(x.data[x.indptr[i]:x.indptr[i + 1]]) for i in range(x.shape[0])]
+
+class HashingTfidfTest(unittest.TestCase):
+
+    def assertSameRows(self, x, y):
+        for x_row, y_row in zip(row_values(x), row_values(y)):
+            numpy.testing.assert_allclose(x_row, y_row, rtol=1e-5)
+
+    def testMatchesTfidf(self):
+        # With enough columns that no n-grams collide.
+        for use_idf in [True, False]:
+            hashing = hashing_tfidf.HashingTfidfVectorizer(n_features=2 ** 20, use_idf=use_idf, ngram_range=(1, 2))
+            tfidf = TfidfVectorizer(use_idf=use_idf, ngram_range=(1, 2))
+            x = hashing.fit_transform(iter(texts))
+            self.assertEqual(x.dtype, numpy.float32)
+            self.assertEqual(x.shape, (len(texts), 2 ** 20))
+            self.assertSameRows(x, tfidf.fit_transform(texts))
+            self.assertSameRows(hashing.transform(texts), tfidf.transform(texts))
+
+    def testPartialFit(self):
+        incremental = hashing_tfidf.HashingTfidfVectorizer(n_features=2 ** 10)
+        incremental.fit(texts[:2]).partial_fit(texts[2:]).partial_fit(new_texts)
+        once = hashing_tfidf.HashingTfidfVectorizer(n_features=2 ** 10)
+        once.fit(texts + new_texts)
+        self.assertEqual(incremental.n_documents, len(texts) + len(new_texts))
+        numpy.testing.assert_array_equal(incremental.document_counts, once.document_counts)
+        self.assertEqual((incremental.transform(texts) != once.transform(texts)).nnz, 0)
+
+        # Refitting starts over.
+        incremental.fit(texts)
+        self.assertEqual(incremental.n_documents, len(texts))
+
+    def testFixedSize(self):
+        vectorizer = hashing_tfidf.HashingTfidfVectorizer(n_features=16)
+        vectorizer.fit(texts)
+        x = vectorizer.transform(new_texts)
+        self.assertEqual(x.shape, (2, 16))
+        numpy.testing.assert_allclose(numpy.sqrt(numpy.asarray(x.multiply(x).sum(axis=1))).ravel(), [1, 1], rtol=1e-5)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,43 @@
+"""Creates the mongo indexes that mongo_handler's queries rely on.
+
+create_index does nothing for an index that already exists, so this is safe
+to run at every server start.
+
+Usage (from the nlp directory):
+    python indexes.py
+"""
+
+import pymongo
+
+import constants
+import mongo_handler
+
+# Maps each collection to the keys of its indexes.
+INDEXES = {
+    constants.COMMENTS: [
+        [('name', pymongo.ASCENDING)],
+        # Newest first, see mongo_handler.get_noncategorized_comments
+        [('created_utc', pymongo.DESCENDING)],
+    ],
+    constants.TRAIN_CATEGORIES: [
+        [('name', pymongo.ASCENDING)],
+        [(constants.CATEGORY, pymongo.ASCENDING)],
+        [(constants.POSITIVITY, pymongo.ASCENDING)],
+    ],
+    constants.USER_CLASSIFIED: [
+        [('name', pymongo.ASCENDING)],
+        [(constants.MAJORITY_POSITIVITY, pymongo.ASCENDING)],
+        [(constants.MAJORITY_CATEGORY, pymongo.ASCENDING)],
+    ],
+}
+
+def ensure_indexes():
+    """Returns the names of the indexes, by collection. 
+    
+    Only the mongo backend has indexes, see storage.py
+    """
+    return mongo_handler.backend.ensure_indexes(INDEXES)
+
+if __name__ == '__main__':
+    for collection, names in ensure_indexes().items():
+        print(collection, names)
@@ -0,0 +1,54 @@
+import unittest
+
+from pymongo import MongoClient
+
+import constants
+import indexes
+import mongo_handler
+
+def _stages(plan):
+    """Every stage name in an explain plan, from the top down."""
+    # Newer servers nest the plan when it runs on the slot based engine.
+    plan = plan.get('queryPlan', plan)
+    stages = [plan['stage']]
+    for key in ['inputStage', 'inputStages']:
+        children = plan.get(key, [])
+        for child in children if isinstance(children, list) else [children]:
+            stages += _stages(child)
+    return stages
+
+class IndexesTest(unittest.TestCase):
+
+    def setUp(self):
+        # Indexes are built, and plans explained, on the test database.
+        self.db = constants.DB_KANYE
+        constants.DB_KANYE = constants.DB_TEST
+        self.client = MongoClient()
+        self.client.test[constants.COMMENTS].insert_many(
+            [{'name': 't1_' + str(i), 'created_utc': i, 'body': 'body'} for i in range(50)])
+        indexes.ensure_indexes()
+
+    def tearDown(self):
+        for collection in indexes.INDEXES:
+            self.client.test[collection].drop()
+        constants.DB_KANYE = self.db
+
+    def testEnsureTwice(self):
+        self.assertEqual(indexes.ensure_indexes(), indexes.ensure_indexes())
+
+    def testNewestFirstUsesIndex(self):
+        plan = mongo_handler.backend.newest_comments_cursor().limit(10).explain()['queryPlanner']['winningPlan']
+        stages = _stages(plan)
+        self.assertIn('IXSCAN', stages)
+        self.assertNotIn('SORT', stages)
+        self.assertNotIn('COLLSCAN', stages)
+
+    def testLabeledNamesUsesIndex(self):
+        categories = self.client.test[constants.TRAIN_CATEGORIES]
+        plan = categories.find({'name': {'$in': ['t1_1', 't1_2']}}, {'_id': 0, 'name': 1}).explain()
+        stages = _stages(plan['queryPlanner']['winningPlan'])
+        self.assertIn('IXSCAN', stages)
+        self.assertNotIn('COLLSCAN', stages)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+"""Imports curated labels in bulk from a JSONL file.
+
+Each line is a JSON object with the comment's name, and its category, is_wavy,
+or both:
+    {"name": "t1_e6oq65l", "category": "kanye", "is_wavy": "wavy"}
+
+Every record is checked before anything is written. Labels are then written
+with batched bulk_writes, see mongo_handler.import_curated_labels.
+
+Usage (from the nlp directory):
+    python label_import.py labels.jsonl
+"""
+
+import json
+import sys
+import time
+
+import constants
+import mongo_handler
+
+def read_records(lines):
+    """(name, category, is_wavy) tuples from JSONL lines. Blank lines are skipped.
+
+    Raises ValueError, with the line number, for a record that cannot be imported.
+    """
+    records = []
+    for line_number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError('Line {}: not valid JSON: {}'.format(line_number, e))
+        if not isinstance(record, dict) or not isinstance(record.get('name'), str):
+            raise ValueError('Line {}: expecting an object with a comment name'.format(line_number))
+
+        category, is_wavy = record.get(constants.CATEGORY), record.get(constants.POSITIVITY)
+        if category is None and is_wavy is None:
+            raise ValueError('Line {}: no {} or {} for {}'.format(
+                    line_number, constants.CATEGORY, constants.POSITIVITY, record['name']))
+        if category is not None and category not in constants.CATEGORIES_TEXT:
+            raise ValueError('Line {}: category does not exist: {}'.format(line_number, category))
+        if is_wavy is not None and is_wavy not in constants.POSITIVITY_TEXT:
+            raise ValueError('Line {}: positivity does not exist: {}'.format(line_number, is_wavy))
+        records.append((record['name'], category, is_wavy))
+    return records
+
+def import_file(path):
+    with open(path) as f:
+        records = read_records(f)
+
+    start = time.perf_counter()
+    changes = mongo_handler.import_curated_labels(records)
+    seconds = time.perf_counter() - start
+
+    print('Imported {} labels in {:.2f}s ({:.0f} labels/s), {} training labels changed'.format(
+            len(records), seconds, len(records) / seconds if seconds else 0, len(changes)))
+    return changes
+
+if __name__ == '__main__':
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+    import_file(sys.argv[1])
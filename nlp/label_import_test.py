@@ -0,0 +1,27 @@
+import unittest
+
+import constants
+import label_import
+
+class ReadRecordsTest(unittest.TestCase):
+
+    def testRecords(self):
+        records = label_import.read_records([
+            '{"name": "t1_a", "category": "kanye", "is_wavy": "wavy"}\n',
+            '\n',
+            '{"name": "t1_b", "is_wavy": "not_wavy"}\n',
+        ])
+        self.assertEqual(records, [('t1_a', 'kanye', 'wavy'), ('t1_b', None, 'not_wavy')])
+
+    def testInvalid(self):
+        for line in ['not json',
+                     '["t1_a", "kanye"]',
+                     '{"category": "kanye"}',
+                     '{"name": "t1_a"}',
+                     '{"name": "t1_a", "category": "nonexistent"}',
+                     '{"name": "t1_a", "is_wavy": "nonexistent"}']:
+            with self.assertRaises(ValueError):
+                label_import.read_records(['{"name": "t1_ok", "category": "op"}', line])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Single pass matcher for the emoji and keywords that features are built from.
+
+The useful emoji, useful words and user mentions are compiled into one regular
+expression, once, at import. One scan over a comment body finds every hit, and
+one more pass (only at the characters an emoji can start with) produces the
+demojized text, as mlp uses it.
+
+Usage:
+    hits = matcher.scan(comment['body'])
+    '🔥' in hits.emoji, 'you' in hits.words, hits.mentions_user
+
+    hits = matcher.scan(comment['body'], demojize=True)
+    hits.demojized
+"""
+
+import collections
+import functools
+import re
+
+import emoji
+
+import constants
+
+USEFUL_EMOJI = [emoji.emojize(e, use_aliases=True) for e in constants.USEFUL_EMOJI]
+MENTION = 'u/'
+
+# Words are looked for in the lowercased body, so a word with capitals (eg. 'Kanye') is never found.
+_MATCHABLE_WORDS = [w for w in constants.USEFUL_WORDS if w == w.lower()]
+
+# Delimiters mlp uses, so that the vectorizer keeps each emoji as its own token.
+DEMOJIZE_DELIMITERS = (' _', '_ ')
+
+Hits = collections.namedtuple('Hits', ['emoji', 'words', 'mentions_user', 'demojized'])
+
+def _alternation(patterns):
+    if not patterns:
+        return '(?!)' # Never matches.
+    # Longest first, so a pattern is preferred over any of its prefixes.
+    patterns = sorted(patterns, key=len, reverse=True)
+    return '|'.join(re.escape(p) for p in patterns)
+
+# The hits are matched inside a lookahead, so overlapping hits are all found,
+# the same as checking `pattern in body` for each pattern. The pattern runs on
+# the lowercased body rather than ignoring case, since re's case folding
+# matches characters that lower() leaves alone (eg. 'ſ' for 's'). Emoji have
+# no case, so lowercasing does not change where they are found.
+_HIT = '(?=(?P<emoji>{})|(?P<word>{}))'.format(
+        _alternation(USEFUL_EMOJI),
+        _alternation(_MATCHABLE_WORDS))
+_HIT_PATTERN = re.compile(_HIT)
+
+# Every emoji, for demojizing, as a trie of dicts keyed by character. An
+# empty key marks the end of an emoji.
+_ALL_EMOJI = emoji.UNICODE_EMOJI['en']
+_ALL_EMOJI_TRIE = {}
+for _e in _ALL_EMOJI:
+    _node = _ALL_EMOJI_TRIE
+    for _char in _e:
+        _node = _node.setdefault(_char, {})
+    _node[''] = _e
+_MAX_EMOJI_LENGTH = max(len(e) for e in _ALL_EMOJI)
+
+# Every emoji starts with a non ASCII character, a digit, '#' or '*' (keycaps).
+# Searching for these is far cheaper than trying every emoji at every position.
+_EMOJI_START_PATTERN = re.compile('[0-9#*]|[^\x00-\x7f]')
+
+# When a pattern matches, any pattern that is its prefix matched at the same spot.
+def _prefixes(patterns):
+    return {p: [q for q in patterns if p.startswith(q)] for p in patterns}
+
+_EMOJI_PREFIXES = _prefixes(USEFUL_EMOJI)
+_WORD_PREFIXES = _prefixes(_MATCHABLE_WORDS)
+
+@functools.lru_cache(maxsize=4096)
+def _demojized(e):
+    name = _ALL_EMOJI[e]
+    return DEMOJIZE_DELIMITERS[0] + name[1:-1] + DEMOJIZE_DELIMITERS[1]
+
+def _longest_emoji(text, start):
+    """The longest emoji starting at text[start], or None."""
+    node, found = _ALL_EMOJI_TRIE, None
+    for char in text[start:start + _MAX_EMOJI_LENGTH]:
+        node = node.get(char)
+        if node is None:
+            break
+        found = node.get('', found)
+    return found
+
+def _demojize(text):
+    pieces, last = [], 0
+    start = _EMOJI_START_PATTERN.search(text)
+    while start:
+        e = _longest_emoji(text, start.start())
+        if e:
+            pieces.append(text[last:start.start()])
+            pieces.append(_demojized(e))
+            last = start.start() + len(e)
+        start = _EMOJI_START_PATTERN.search(text, last if e else start.start() + 1)
+    pieces.append(text[last:])
+    # Like emoji.demojize, drop any leftover variation selectors.
+    return ''.join(pieces).replace('\ufe0e', '').replace('\ufe0f', '')
+
+def scan(text, demojize=False):
+    """Find the useful emoji, useful words and user mentions in text.
+
+    # Arguments
+        text: string, comment body.
+        demojize: bool, whether to also build the demojized text.
+
+    # Returns
+        Hits: the useful emoji and words found, whether a user is mentioned,
+            and the demojized text (None unless demojize is set).
+    """
+    found_emoji, found_words = set(), set()
+
+    for match in _HIT_PATTERN.finditer(text.lower()):
+        kind = match.lastgroup
+        if kind == 'emoji':
+            found_emoji.update(_EMOJI_PREFIXES[match.group(kind)])
+        elif kind == 'word':
+            found_words.update(_WORD_PREFIXES[match.group(kind)])
+
+    # Mentions are case sensitive.
+    mentions_user = MENTION in text
+    demojized = _demojize(text) if demojize else None
+    return Hits(frozenset(found_emoji), frozenset(found_words), mentions_user, demojized)
@@ -0,0 +1,48 @@
+import unittest
+
+import emoji
+
+import constants
+import matcher
+
+BODIES = [
+    'Wavy baby 🌊',
+    'you are not wavy op 🔥🔥🔥 /s',
+    'YOU, OP. NOT unwavy',
+    'stop posting u/someone',
+    'Kanye is wavy',
+    '🙅‍♂️ ❌❎🚫 ⛰️ ⛰ 🔥',
+    '',
+    # re ignoring case would match 'ſ' as 's', but lower() leaves it alone.
+    '/ſ OP /S',
+    'U/someone İs wavy',
+]
+
+class MatcherTest(unittest.TestCase):
+
+    def testSameAsPerPatternChecks(self):
+        for body in BODIES:
+            hits = matcher.scan(body)
+            self.assertEqual(hits.emoji, {e for e in matcher.USEFUL_EMOJI if e in body})
+            self.assertEqual(hits.words, {w for w in constants.USEFUL_WORDS if w in body.lower()})
+            self.assertEqual(hits.mentions_user, 'u/' in body)
+            self.assertIsNone(hits.demojized)
+
+    def testDemojize(self):
+        for body in BODIES:
+            hits = matcher.scan(body, demojize=True)
+            self.assertEqual(hits.demojized, emoji.demojize(body, delimiters=matcher.DEMOJIZE_DELIMITERS))
+            self.assertEqual(hits.emoji, matcher.scan(body).emoji)
+            self.assertEqual(hits.words, matcher.scan(body).words)
+
+    def testOverlappingHits(self):
+        hits = matcher.scan('unwavyou/s')
+        self.assertEqual(hits.words, {'unwavy', 'you', '/s'})
+        self.assertTrue(hits.mentions_user)
+
+    def testCaseFoldedCharacters(self):
+        self.assertEqual(matcher.scan('/ſ').words, set())
+        self.assertEqual(matcher.scan('/ſ /S').words, {'/s'})
+
+if __name__ == '__main__':
+    unittest.main()
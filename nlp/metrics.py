@@ -0,0 +1,127 @@
+"""Timers and counters for the hot paths, exported in Prometheus text format.
+
+Each stage (eg. 'pos_tag', 'classify', 'mongo_find_comments') gets a histogram
+of how long it took, and events (eg. annotation cache hits) get counters. When
+constants.METRICS_ENABLED is off, timers and counters do nothing.
+
+Usage:
+    with metrics.timer('pos_tag'):
+        tagged = nltk.pos_tag(tokens)
+
+    @metrics.timed('classify')
+    def classify(): ...
+
+    metrics.count('annotation_cache_hit', n)
+    metrics.prometheus_text() # served by server.py at /metrics
+"""
+
+import bisect
+import functools
+import threading
+import time
+
+import constants
+
+# Upper bounds of the histogram buckets, in seconds.
+BUCKETS = [0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+           0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60]
+
+STAGE_METRIC = 'kanye_stage_seconds'
+EVENT_METRIC = 'kanye_events_total'
+
+_lock = threading.Lock()
+_histograms = {} # stage -> [bucket counts (not cumulative), sum, count]
+_counters = {} # event -> count
+
+def observe(stage, seconds):
+    with _lock:
+        histogram = _histograms.get(stage)
+        if histogram is None:
+            histogram = _histograms[stage] = [[0] * (len(BUCKETS) + 1), 0.0, 0]
+        histogram[0][bisect.bisect_left(BUCKETS, seconds)] += 1
+        histogram[1] += seconds
+        histogram[2] += 1
+
+def count(event, n=1):
+    if not constants.METRICS_ENABLED:
+        return
+    with _lock:
+        _counters[event] = _counters.get(event, 0) + n
+
+class _Timer:
+
+    def __init__(self, stage):
+        self.stage = stage
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        observe(self.stage, time.perf_counter() - self.start)
+
+class _NullTimer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        pass
+
+_NULL_TIMER = _NullTimer()
+
+def timer(stage):
+    """Context manager that records the time spent in its block for stage."""
+    if not constants.METRICS_ENABLED:
+        return _NULL_TIMER
+    return _Timer(stage)
+
+def timed(stage):
+    """Decorator that records the time spent in each call for stage."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            if not constants.METRICS_ENABLED:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                observe(stage, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+def _label(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def prometheus_text():
+    """Every histogram and counter, in the Prometheus text exposition format."""
+    with _lock:
+        histograms = {stage: (list(h[0]), h[1], h[2]) for stage, h in _histograms.items()}
+        counters = dict(_counters)
+
+    lines = [
+        '# HELP {} Time spent in each stage of feature extraction, classification, training and storage.'.format(STAGE_METRIC),
+        '# TYPE {} histogram'.format(STAGE_METRIC),
+    ]
+    for stage, (buckets, total, n) in sorted(histograms.items()):
+        stage = _label(stage)
+        cumulative = 0
+        for bound, bucket_count in zip(BUCKETS + ['+Inf'], buckets):
+            cumulative += bucket_count
+            lines.append('{}_bucket{{stage="{}",le="{}"}} {}'.format(STAGE_METRIC, stage, bound, cumulative))
+        lines.append('{}_sum{{stage="{}"}} {}'.format(STAGE_METRIC, stage, repr(total)))
+        lines.append('{}_count{{stage="{}"}} {}'.format(STAGE_METRIC, stage, n))
+
+    lines += [
+        '# HELP {} Number of times each event happened.'.format(EVENT_METRIC),
+        '# TYPE {} counter'.format(EVENT_METRIC),
+    ]
+    for event, n in sorted(counters.items()):
+        lines.append('{}{{event="{}"}} {}'.format(EVENT_METRIC, _label(event), n))
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,53 @@
+import unittest
+
+import constants
+import metrics
+
+class MetricsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.enabled = constants.METRICS_ENABLED
+        constants.METRICS_ENABLED = True
+        metrics.reset()
+
+    def tearDown(self):
+        constants.METRICS_ENABLED = self.enabled
+        metrics.reset()
+
+    def testTimers(self):
+        with metrics.timer('pos_tag'):
+            pass
+
+        @metrics.timed('classify')
+        def classify(x):
+            return x + 1
+
+        self.assertEqual(classify(1), 2)
+        self.assertEqual(classify.__name__, 'classify')
+        metrics.observe('classify', 0.3)
+        metrics.count('annotation_cache_hit', 3)
+
+        text = metrics.prometheus_text()
+        self.assertIn('# TYPE kanye_stage_seconds histogram', text)
+        self.assertIn('kanye_stage_seconds_count{stage="pos_tag"} 1', text)
+        self.assertIn('kanye_stage_seconds_count{stage="classify"} 2', text)
+        self.assertIn('kanye_stage_seconds_bucket{stage="classify",le="0.25"} 1', text)
+        self.assertIn('kanye_stage_seconds_bucket{stage="classify",le="0.5"} 2', text)
+        self.assertIn('kanye_stage_seconds_bucket{stage="classify",le="+Inf"} 2', text)
+        self.assertIn('kanye_events_total{event="annotation_cache_hit"} 3', text)
+
+    def testDisabled(self):
+        constants.METRICS_ENABLED = False
+
+        @metrics.timed('classify')
+        def classify():
+            return 'wavy'
+
+        with metrics.timer('pos_tag'):
+            self.assertEqual(classify(), 'wavy')
+        metrics.count('annotation_cache_hit')
+        self.assertNotIn('stage=', metrics.prometheus_text())
+        self.assertNotIn('event=', metrics.prometheus_text())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""Groups single classification requests into batches for the classifiers.
+
+Classifying one comment at a time pays the per-call overhead (feature
+extraction setup, a model call) for each comment. Requests are queued instead,
+and a worker thread classifies them together: it takes up to max_batch_size
+queued comments, waiting at most max_wait seconds after the first one for more
+to come in. Each caller gets a future for its own result.
+
+Usage:
+    batcher = micro_batcher.MicroBatcher(classify_many)
+    classification = batcher.submit(comment).result()
+"""
+
+import queue
+import threading
+import time
+
+from concurrent.futures import Future
+
+import constants
+import metrics
+
+# Queued to stop the worker.
+_CLOSE = object()
+
+class MicroBatcher:
+
+    def __init__(self, classify_many, max_batch_size=constants.CLASSIFY_BATCH_MAX_SIZE,
+                 max_wait=constants.CLASSIFY_BATCH_MAX_WAIT):
+        """
+        # Arguments
+            classify_many: function, takes a list of items and returns their
+                results in the same order.
+            max_batch_size: int, most items classified together.
+            max_wait: number, seconds the first item of a batch may wait for more.
+        """
+        if max_batch_size < 1:
+            raise ValueError('max_batch_size must be at least 1, not {}'.format(max_batch_size))
+        self.classify_many = classify_many
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._run, name='micro-batcher', daemon=True)
+        self._worker.start()
+
+    def submit(self, item):
+        """Queue an item. Returns a future for its result."""
+        future = Future()
+        self._queue.put((item, future))
+        return future
+
+    def close(self):
+        """Classify what is already queued, then stop the worker."""
+        self._queue.put(_CLOSE)
+        self._worker.join()
+
+    def _next_batch(self):
+        """Blocks for the first item, then takes more until the batch is full or max_wait is up."""
+        first = self._queue.get()
+        if first is _CLOSE:
+            return None, True
+        batch = [first]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                entry = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if entry is _CLOSE:
+                return batch, True
+            batch.append(entry)
+        return batch, False
+
+    def _run(self):
+        closed = False
+        while not closed:
+            batch, closed = self._next_batch()
+            if batch:
+                self._classify(batch)
+
+    def _classify(self, batch):
+        # Callers that gave up on their future do not need a result.
+        batch = [(item, future) for item, future in batch if future.set_running_or_notify_cancel()]
+        if not batch:
+            return
+        try:
+            with metrics.timer('micro_batch'):
+                results = self.classify_many([item for item, _ in batch])
+            if len(results) != len(batch):
+                raise ValueError('Got {} results for a batch of {}'.format(len(results), len(batch)))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+            return
+        metrics.count('micro_batches')
+        metrics.count('micro_batched_items', len(batch))
+        for (_, future), result in zip(batch, results):
+            future.set_result(result)
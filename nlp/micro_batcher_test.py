@@ -0,0 +1,72 @@
+import threading
+import unittest
+
+import micro_batcher
+
+class MicroBatcherTest(unittest.TestCase):
+
+    def setUp(self):
+        self.batches = []
+        self.batcher = None
+
+    def tearDown(self):
+        if self.batcher is not None:
+            self.batcher.close()
+
+    def double_many(self, items):
+        self.batches.append(list(items))
+        return [2 * item for item in items]
+
+    def testBatchesConcurrentItems(self):
+        # Items queued while the worker is busy are classified together.
+        busy, release = threading.Event(), threading.Event()
+        def classify_many(items):
+            if items == ['block']:
+                busy.set()
+                release.wait()
+                return ['done']
+            return self.double_many(items)
+
+        self.batcher = micro_batcher.MicroBatcher(classify_many, max_batch_size=3, max_wait=0)
+        blocked = self.batcher.submit('block')
+        busy.wait()
+        futures = [self.batcher.submit(i) for i in range(5)]
+        release.set()
+
+        self.assertEqual(blocked.result(), 'done')
+        self.assertEqual([f.result() for f in futures], [0, 2, 4, 6, 8])
+        self.assertEqual(self.batches, [[0, 1, 2], [3, 4]])
+
+    def testWaitsForMore(self):
+        self.batcher = micro_batcher.MicroBatcher(self.double_many, max_batch_size=2, max_wait=10)
+        first = self.batcher.submit(1)
+        second = self.batcher.submit(2)
+        # The batch is full, so it does not wait out max_wait.
+        self.assertEqual(first.result(timeout=5), 2)
+        self.assertEqual(second.result(timeout=5), 4)
+        self.assertEqual(self.batches, [[1, 2]])
+
+    def testCloseClassifiesQueued(self):
+        self.batcher = micro_batcher.MicroBatcher(self.double_many, max_batch_size=10, max_wait=10)
+        future = self.batcher.submit(3)
+        self.batcher.close()
+        self.batcher = None
+        self.assertEqual(future.result(timeout=0), 6)
+
+    def testErrors(self):
+        def fail(items):
+            raise KeyError('bad comment')
+        self.batcher = micro_batcher.MicroBatcher(fail, max_wait=0)
+        with self.assertRaises(KeyError):
+            self.batcher.submit(1).result(timeout=5)
+
+        self.batcher.close()
+        self.batcher = micro_batcher.MicroBatcher(lambda items: [], max_wait=0)
+        with self.assertRaises(ValueError):
+            self.batcher.submit(1).result(timeout=5)
+
+        with self.assertRaises(ValueError):
+            micro_batcher.MicroBatcher(self.double_many, max_batch_size=0)
+
+if __name__ == '__main__':
+    unittest.main()
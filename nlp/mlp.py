@@ -4,14 +4,31 @@ https://developers.google.com/machine-learning/guides/text-classification/step-4
 Usage: 
     data = comments_with_classification()
     train_ngram_model(data)
+
+    # Or, streaming the labeled comments rather than holding all their texts.
+    train_streamed_ngram_model(constants.POSITIVITY)
+
+    # With VECTORIZER_MODE = 'hashing', keep training the saved model on new labels.
+    update_ngram_model(newly_labeled_comments, labels, constants.POSITIVITY)
+
+    # Load the vectorizer, selector & model saved by train_ngram_model.
+    bundle = load_bundle(constants.POSITIVITY)
+    labels = bundle.classify_many(extract_relevant_metadata_as_strings(comments))
 """
 
-import emoji
-import nltk
+import json
+import math
+import numpy
+import os
+import pickle
 import random
+import shutil
 import tensorflow
 
+import annotation_cache
 import constants
+import hashing_tfidf
+import matcher
 import mongo_handler
 
 from tensorflow.python.keras import models
@@ -39,6 +56,22 @@ TOKEN_MODE = 'word'
 # Minimum document/corpus frequency below which a token will be discarded.
 MIN_DOCUMENT_FREQUENCY = 2
 
+# How n-grams are turned into features. One of 'tfidf', 'hashing'.
+# 'tfidf' learns a vocabulary, and has to be refit on the whole corpus every 
+# training run. 'hashing' hashes n-grams to a fixed number of features, so new 
+# comments need no refit, and the model can keep training (see update_ngram_model).
+VECTORIZER_MODE = 'tfidf'
+
+# Number of features n-grams are hashed to in 'hashing' mode, which is also the
+# size of the model's input. They are all kept: there is no feature selection.
+HASHING_N_FEATURES = 2 ** 15
+
+# Whether 'hashing' mode weighs n-grams by idf, updated as new texts come in.
+HASHING_USE_IDF = True
+
+# Number of comments fetched & annotated at a time, when streaming them.
+STREAM_BATCH_SIZE = 1000
+
 # Vector translation for features.
 POSITIVITY_VECTORIZATION = dict(zip(
     constants.POSITIVITY_TEXT.keys(), 
@@ -57,21 +90,28 @@ def _convert_emoji(s):
     We modify the delimiter to a character that the vectorizer will retain, and
         add the space to ensure each emoji is a seperate token.
     """
-    return emoji.demojize(s, delimiters=(' _', '_ '))
+    return matcher.scan(s, demojize=True).demojized
 
-def _extract_relevant_metadata_as_string(comment):
+def _extract_relevant_metadata_as_string(comment, annotation=None, hits=None):
     """Identify useful metadata and write as a string. 
 
     This allows us to create a new token in the body for relevant feaetures. 
 
     # Arguments
         comment: dict, full comment from mongodb
+        annotation: dict, optional annotation of the demojized body, if it 
+            was already looked up (see extract_relevant_metadata_as_strings)
+        hits: matcher.Hits, optional scan of the body with demojize set, if
+            it was already scanned.
 
     # Returns: 
         string, body of comment plus additional words representing metadata
     """
     # Consider: is the comment long?
-    body = _convert_emoji(comment['body'])
+    # Emoji are converted in the same scan that looks for user mentions.
+    if hits is None:
+        hits = matcher.scan(comment['body'], demojize=True)
+    body = hits.demojized
     strs = [] # Will not append until body has been analyzed.
 
     # Comment is a top-level comment
@@ -81,15 +121,36 @@ def _extract_relevant_metadata_as_string(comment):
     if comment['is_submitter']: 
         strs.append('_is_op')
     # Directly mentions another user
-    if 'u/' in body:
+    if hits.mentions_user:
         strs.append('_mentions_user')
     # Named entities
-    for chunk in nltk.chunk.ne_chunk(nltk.pos_tag(nltk.word_tokenize(body))):
-        if hasattr(chunk, 'label'):
-            strs.append('_contains_ne')
+    if annotation is None:
+        annotation = annotation_cache.annotate(comment.get('name'), body)
+    strs += ['_contains_ne'] * annotation['n_entities']
 
     return body + ' ' + ' '.join(strs)
 
+def extract_relevant_metadata_as_strings(comments, processes=None):
+    """_extract_relevant_metadata_as_string for a list of comments, in order.
+
+    Comments that have not been annotated yet are annotated across processes.
+
+    # Arguments
+        comments: list of dicts, full comments from mongodb
+        processes: int, number of processes to annotate with. Defaults to the 
+            cpu count.
+
+    # Returns: 
+        list of strings
+    """
+    # Each body is scanned & demojized once. Comments sent to the server may not have a name.
+    hits = [matcher.scan(comment['body'], demojize=True) for comment in comments]
+    annotations = annotation_cache.annotate_many(
+            [(comment.get('name'), h.demojized) for comment, h in zip(comments, hits)],
+            processes)
+    return [_extract_relevant_metadata_as_string(comment, annotation, h) 
+            for comment, annotation, h in zip(comments, annotations, hits)]
+
 def comments_with_classification(mode=constants.POSITIVITY):
     """Preps comments and their label for the model.
     
@@ -102,24 +163,39 @@ def comments_with_classification(mode=constants.POSITIVITY):
     # Returns: 
         A tuple of all comment bodies with their corresponding label.
     """
-    texts, vectorized_labels = [], []
+    (train_names, train_labels), (val_names, val_labels) = names_with_classification(mode)
+    return ((list(stream_texts(train_names)), train_labels), 
+            (list(stream_texts(val_names)), val_labels))
+
+def names_with_classification(mode=constants.POSITIVITY):
+    """Like comments_with_classification, but with comment names instead of texts.
+
+    # Returns: 
+        A tuple of train & validation comment names with their vectorized labels.
+    """
     if mode == constants.POSITIVITY: 
-        classified_comments = mongo_handler.classified_comments_with_positivity()
-        for comment, label in classified_comments:
-            texts.append(_extract_relevant_metadata_as_string(comment))
-            vectorized_labels.append(POSITIVITY_VECTORIZATION[label])
+        vectorization = POSITIVITY_VECTORIZATION
     elif mode == constants.CATEGORY:
-        classified_comments = mongo_handler.classified_comments_with_category()
-        for comment, label in classified_comments:
-            texts.append(_extract_relevant_metadata_as_string(comment))
-            vectorized_labels.append(CATEGORY_VECTORIZATION[label])
+        vectorization = CATEGORY_VECTORIZATION
     else: 
         raise ValueError(f'You must request classification of either '
-                '{constants.POSITIVITY} or constants.CATEGORY}')
+                f'{constants.POSITIVITY} or {constants.CATEGORY}')
+    labeled = mongo_handler.classified_names_with_label(mode)
+    names = [name for name, label in labeled]
+    vectorized_labels = [vectorization[label] for name, label in labeled]
 
     # TODO: shuffle these together
-    cutoff = int(len(texts) * RATIO)
-    return (texts[:cutoff], vectorized_labels[:cutoff]), (texts[cutoff:], vectorized_labels[cutoff:])
+    cutoff = int(len(names) * RATIO)
+    return (names[:cutoff], vectorized_labels[:cutoff]), (names[cutoff:], vectorized_labels[cutoff:])
+
+def stream_texts(names, batch_size=STREAM_BATCH_SIZE, processes=None):
+    """Yields the text of each named comment (see extract_relevant_metadata_as_strings), in order.
+
+    Comments are fetched and annotated a batch at a time, so only one batch of 
+    comments is held in memory.
+    """
+    for comments in mongo_handler.iter_comment_batches(names, batch_size):
+        yield from extract_relevant_metadata_as_strings(comments, processes)
 
 def create_ngram_vectorizer():
     """Create a vectorizer: a tool that translates the corpus into vectors.
@@ -132,19 +208,24 @@ def create_ngram_vectorizer():
     # Create keyword arguments to pass to the tf-idf vectorizer.
     kwargs = {
             'ngram_range': NGRAM_RANGE, # Use 1-grams & 2-grams.
-            'dtype': 'int32',
+            # The model takes float32, so vectorize straight to it rather than copying.
+            'dtype': numpy.float32,
             'strip_accents': 'unicode',
             'decode_error': 'replace',
             'analyzer': TOKEN_MODE, # Split text into word tokens.
-            'min_df': MIN_DOCUMENT_FREQUENCY,
         }
-    return TfidfVectorizer(**kwargs)
+    if VECTORIZER_MODE == 'hashing':
+        return hashing_tfidf.HashingTfidfVectorizer(
+                n_features=HASHING_N_FEATURES, use_idf=HASHING_USE_IDF, **kwargs)
+    if VECTORIZER_MODE != 'tfidf':
+        raise ValueError(f'VECTORIZER_MODE is either tfidf or hashing, not {VECTORIZER_MODE}')
+    return TfidfVectorizer(min_df=MIN_DOCUMENT_FREQUENCY, **kwargs)
 
 def fit_vectorizer(train_texts, vectorizer):
     """Sets up the vectorizer using the train texts.
     
     # Arguments
-        train_texts: list, training text strings.
+        train_texts: iterable, training text strings. Only iterated once.
         vectorizer: the sklearn vectorizer to fit.
 
     # Returns
@@ -181,17 +262,82 @@ def create_selector(k):
     return SelectKBest(f_classif, k=k)
 
 
-def ngram_vectorize(train_texts, train_labels, val_texts):
+def fit_ngram_vectorizer(train_texts, train_labels):
+    """Fits the vectorizer & selector to the train texts.
+
+    # Returns
+        vectorizer, selector (None in 'hashing' mode), and the vectorized & 
+        selected train texts.
+    """
     vectorizer = create_ngram_vectorizer()
     x_train = fit_vectorizer(train_texts, vectorizer)
-    x_val = vectorize_texts(val_texts, vectorizer)
+    if isinstance(vectorizer, hashing_tfidf.HashingTfidfVectorizer):
+        # Keep every hashed feature, so the model's inputs never change.
+        return vectorizer, None, x_train
 
     selector = create_selector(min(TOP_K, x_train.shape[1]))
     selector.fit(x_train, train_labels)
-    x_train = selector.transform(x_train).astype('float32')
-    x_val = selector.transform(x_val).astype('float32')
+    return vectorizer, selector, _select(selector, x_train)
+
+def _select(selector, x):
+    if selector is not None:
+        x = selector.transform(x)
+    # The vectorizer already gives float32, so astype does not copy.
+    return x.astype('float32', copy=False)
+
+def ngram_vectorize(train_texts, train_labels, val_texts):
+    vectorizer, selector, x_train = fit_ngram_vectorizer(train_texts, train_labels)
+    x_val = _select(selector, vectorize_texts(val_texts, vectorizer))
     return x_train, x_val
 
+def streamed_ngram_vectorize(mode=constants.POSITIVITY, batch_size=STREAM_BATCH_SIZE, processes=None):
+    """ngram_vectorize for the labeled comments, streamed in batches.
+
+    The texts are vectorized as they are streamed, and never all held at once. 
+    Features stay sparse: only the sparse tf-idf matrices are kept.
+
+    # Returns
+        vectorizer, selector, and (x, labels) tuples for the train & validation 
+        sets. x are float32 scipy sparse matrices.
+    """
+    (train_names, train_labels), (val_names, val_labels) = names_with_classification(mode)
+    vectorizer, selector, x_train = fit_ngram_vectorizer(
+            stream_texts(train_names, batch_size, processes), train_labels)
+    x_val = _select(selector, vectorize_texts(stream_texts(val_names, batch_size, processes), vectorizer))
+    return vectorizer, selector, (x_train, train_labels), (x_val, val_labels)
+
+class SparseBatches(tensorflow.keras.utils.Sequence):
+    """Batches of a sparse matrix for model.fit, densified one batch at a time.
+
+    Passing a sparse matrix to model.fit directly may densify all of it.
+
+    # Arguments
+        x: scipy sparse matrix, one row per sample.
+        labels: list, label of each row.
+        batch_size: int, number of rows per batch.
+        shuffle: bool, whether to shuffle the rows every epoch, like model.fit does.
+    """
+
+    def __init__(self, x, labels, batch_size, shuffle=True, seed=None):
+        self.x = x.tocsr()
+        self.labels = numpy.asarray(labels)
+        self.batch_size = batch_size
+        self.shuffle = shuffle
+        self.rows = numpy.arange(self.x.shape[0])
+        self.rng = numpy.random.RandomState(seed)
+        self.on_epoch_end()
+
+    def __len__(self):
+        return int(math.ceil(self.x.shape[0] / self.batch_size))
+
+    def __getitem__(self, i):
+        rows = self.rows[i * self.batch_size:(i + 1) * self.batch_size]
+        return self.x[rows].toarray(), self.labels[rows]
+
+    def on_epoch_end(self):
+        if self.shuffle:
+            self.rng.shuffle(self.rows)
+
 
 def get_num_classes(labels):
     """Gets the total number of classes.
@@ -271,7 +417,9 @@ def train_ngram_model(data,
                       batch_size=128,
                       layers=2,
                       units=64,
-                      dropout_rate=0.2):
+                      dropout_rate=0.2,
+                      *,
+                      mode=constants.POSITIVITY):
     """Trains n-gram model on the given dataset.
 
     # Arguments
@@ -282,6 +430,8 @@ def train_ngram_model(data,
         layers: int, number of `Dense` layers in the model.
         units: int, output dimension of Dense layers in the model.
         dropout_rate: float: percentage of input to drop at Dropout layers.
+        mode: string, keyword only, the classification the labels are for.
+            The trained bundle is saved under this mode, see save_bundle.
 
     # Raises
         ValueError: If validation data has label values which were not seen
@@ -289,8 +439,44 @@ def train_ngram_model(data,
     """
     # Get the data.
     (train_texts, train_labels), (val_texts, val_labels) = data
+    _check_labels(train_labels, val_labels)
+
+    # Vectorize texts.
+    vectorizer, selector, x_train = fit_ngram_vectorizer(train_texts, train_labels)
+    x_val = _select(selector, vectorize_texts(val_texts, vectorizer))
+
+    return _train_and_save(vectorizer, selector, (x_train, train_labels), (x_val, val_labels), mode,
+                           learning_rate, epochs, batch_size, layers, units, dropout_rate)
+
+def train_streamed_ngram_model(mode=constants.POSITIVITY,
+                               stream_batch_size=STREAM_BATCH_SIZE,
+                               learning_rate=5e-5,
+                               epochs=1000,
+                               batch_size=128,
+                               layers=2,
+                               units=64,
+                               dropout_rate=0.2):
+    """train_ngram_model on the labeled comments for mode, streamed from mongo.
+
+    Memory grows with the number of non-zero features, not with the texts or 
+    the number of features: see streamed_ngram_vectorize.
 
-    # Verify that validation labels are in the same range as training labels.
+    # Arguments
+        mode: string, the classification to train for.
+        stream_batch_size: int, number of comments fetched & annotated at a time.
+        The rest are as for train_ngram_model.
+    """
+    vectorizer, selector, train, val = streamed_ngram_vectorize(mode, stream_batch_size)
+    _check_labels(train[1], val[1])
+    return _train_and_save(vectorizer, selector, train, val, mode,
+                           learning_rate, epochs, batch_size, layers, units, dropout_rate)
+
+def _check_labels(train_labels, val_labels):
+    """Verify that validation labels are in the same range as training labels.
+
+    # Returns
+        int, the number of classes.
+    """
     num_classes = get_num_classes(train_labels)
     unexpected_labels = [v for v in val_labels if v not in range(num_classes)]
     if len(unexpected_labels):
@@ -299,10 +485,44 @@ def train_ngram_model(data,
                          'labels in the validation set are in the same range '
                          'as training labels.'.format(
                              unexpected_labels=unexpected_labels))
+    return num_classes
 
-    # Vectorize texts.
-    x_train, x_val = ngram_vectorize(train_texts, train_labels, val_texts)
+def _train_and_save(vectorizer, selector, train, val, mode,
+                    learning_rate, epochs, batch_size, layers, units, dropout_rate):
+    """Trains the model on the vectorized (x, labels) train & val sets, and saves the bundle."""
+    model, history = fit_model(train, val, learning_rate, epochs, batch_size, layers, units, dropout_rate)
+    num_classes = get_num_classes(train[1])
+
+    # Save the model, along with what it needs to classify new comments.
+    bundle = NgramBundle(vectorizer, selector, model, _label_names(mode, num_classes))
+    save_bundle(bundle, mode, {
+        'vectorizer': type(vectorizer).__name__,
+        'training_set_size': len(train[1]),
+        'val_acc': float(history['val_acc'][-1]),
+        'val_loss': float(history['val_loss'][-1]),
+    })
+    return history['val_acc'][-1], history['val_loss'][-1]
 
+def fit_model(train, val,
+              learning_rate=5e-5,
+              epochs=1000,
+              batch_size=128,
+              layers=2,
+              units=64,
+              dropout_rate=0.2,
+              verbose=2):
+    """Creates and trains a model on vectorized texts, stopping early on validation loss.
+
+    # Arguments
+        train: tuple, (x, labels) for training. x may be a scipy sparse matrix.
+        val: tuple, (x, labels) for validation.
+        The rest are as for train_ngram_model. verbose is passed on to model.fit.
+
+    # Returns
+        the trained model, and its history dict (eg. 'val_acc': accuracy after each epoch).
+    """
+    (x_train, train_labels), (x_val, val_labels) = train, val
+    num_classes = get_num_classes(train_labels)
 
     # Create model instance.
     model = mlp_model(layers=layers,
@@ -324,22 +544,160 @@ def train_ngram_model(data,
     callbacks = [tensorflow.keras.callbacks.EarlyStopping(
         monitor='val_loss', patience=2)]
 
-    # Train and validate model.
+    # Train and validate model. Features stay sparse until each batch goes in.
     history = model.fit(
-            x_train,
-            train_labels,
+            SparseBatches(x_train, train_labels, batch_size),
             epochs=epochs,
             callbacks=callbacks,
-            validation_data=(x_val, val_labels),
-            verbose=2,  # Logs once per epoch.
-            batch_size=batch_size)
+            validation_data=SparseBatches(x_val, val_labels, batch_size, shuffle=False),
+            verbose=verbose)  # 2 logs once per epoch.
 
     # Print results.
     history = history.history
     print('Validation accuracy: {acc}, loss: {loss}'.format(
             acc=history['val_acc'][-1], loss=history['val_loss'][-1]))
+    return model, history
 
-    # Save model.
-    model.save('IMDb_mlp_model.h5')
-    return history['val_acc'][-1], history['val_loss'][-1]
+def _label_names(mode, num_classes):
+    """The label of each model output, the inverse of the mode's vectorization."""
+    vectorization = POSITIVITY_VECTORIZATION if mode == constants.POSITIVITY else CATEGORY_VECTORIZATION
+    names = {index: label for label, index in vectorization.items()}
+    return [names[i] for i in range(num_classes)]
+
+class NgramBundle:
+    """A trained model, with the fitted vectorizer & selector its inputs went through.
+
+    # Arguments
+        vectorizer: fitted sklearn tf-idf vectorizer, or hashing_tfidf.HashingTfidfVectorizer.
+        selector: fitted sklearn SelectKBest, or None to keep every feature.
+        model: trained keras model.
+        labels: list, the label for each model output index (eg. ['wavy', 'not_wavy']).
+    """
+
+    def __init__(self, vectorizer, selector, model, labels):
+        self.vectorizer = vectorizer
+        self.selector = selector
+        self.model = model
+        self.labels = labels
+
+    def vectorize(self, texts):
+        return _select(self.selector, self.vectorizer.transform(texts))
+
+    def classify_many(self, texts, batch_size=128):
+        """Labels for a list of texts (see extract_relevant_metadata_as_strings), in order.
+
+        All texts are vectorized together, and go through the model in batches.
+        """
+        if not texts:
+            return []
+        probabilities = self.model.predict(self.vectorize(texts), batch_size=batch_size)
+        if probabilities.shape[1] == 1:
+            # Two classes: a single sigmoid output, the probability of label 1.
+            indices = (probabilities[:, 0] > 0.5).astype('int32')
+        else:
+            indices = probabilities.argmax(axis=1)
+        return [self.labels[i] for i in indices]
+
+    def classify(self, text):
+        return self.classify_many([text])[0]
+
+BUNDLE_MODEL_FILE = 'model.h5'
+BUNDLE_VECTORIZER_FILE = 'vectorizer.pickle'
+BUNDLE_MANIFEST_FILE = 'manifest.json'
+
+def _bundle_dir(mode):
+    return os.path.join(constants.MLP_MODEL_DIR, mode)
+
+def save_bundle(bundle, mode, manifest=None):
+    """Save a bundle as the model for a mode, replacing the previous one.
+
+    The bundle is a directory holding the keras model, the pickled vectorizer &
+    selector, and a manifest.json with the label mapping.
+
+    # Arguments
+        bundle: NgramBundle
+        mode: string, eg. constants.POSITIVITY
+        manifest: dict, optional json-serializable description of the training run.
+    """
+    manifest = dict(manifest or {}, mode=mode, labels=bundle.labels)
+    path = _bundle_dir(mode)
+
+    # Write to a temporary directory first, so a half-written bundle is never loaded.
+    tmp_dir = path + '.tmp'
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    try:
+        bundle.model.save(os.path.join(tmp_dir, BUNDLE_MODEL_FILE))
+        with open(os.path.join(tmp_dir, BUNDLE_VECTORIZER_FILE), 'wb') as f:
+            pickle.dump((bundle.vectorizer, bundle.selector), f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(tmp_dir, BUNDLE_MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        shutil.rmtree(path, ignore_errors=True)
+        os.rename(tmp_dir, path)
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    print('Saved', mode, 'n-gram model to', path)
+
+def load_bundle(mode):
+    """Load the bundle saved for a mode.
+
+    # Returns
+        NgramBundle, and its manifest.
+
+    # Raises
+        ValueError: if no bundle has been saved for the mode.
+    """
+    path = _bundle_dir(mode)
+    if not os.path.isfile(os.path.join(path, BUNDLE_MANIFEST_FILE)):
+        raise ValueError(f'No saved n-gram model for {mode} in {constants.MLP_MODEL_DIR}')
+    with open(os.path.join(path, BUNDLE_MANIFEST_FILE)) as f:
+        manifest = json.load(f)
+    with open(os.path.join(path, BUNDLE_VECTORIZER_FILE), 'rb') as f:
+        vectorizer, selector = pickle.load(f)
+    model = models.load_model(os.path.join(path, BUNDLE_MODEL_FILE))
+    return NgramBundle(vectorizer, selector, model, manifest['labels']), manifest
+
+def update_ngram_model(comments, labels, mode=constants.POSITIVITY, epochs=1, batch_size=128,
+                       update_idf=True, processes=None):
+    """Keeps training the saved model for mode on newly labeled comments, and saves it.
+
+    Only models trained with VECTORIZER_MODE = 'hashing' can be updated: their 
+    inputs do not depend on a vocabulary, so they stay the same as labels come in.
+
+    # Arguments
+        comments: list of dicts, full comments from mongodb.
+        labels: list, the label of each comment (eg. 'wavy').
+        mode: string, the classification the labels are for.
+        epochs: int, number of passes over the new comments.
+        batch_size: int, number of samples per batch.
+        update_idf: bool, whether to add the comments to the idf first.
+        processes: int, number of processes to annotate with.
+
+    # Returns
+        the training loss & accuracy on the new comments.
+
+    # Raises
+        ValueError: if the saved model was not trained in 'hashing' mode, or a 
+            label is not one of the model's.
+    """
+    bundle, manifest = load_bundle(mode)
+    if not isinstance(bundle.vectorizer, hashing_tfidf.HashingTfidfVectorizer):
+        raise ValueError(f'The {mode} model was not trained in hashing mode, it needs a full retrain')
+    unexpected_labels = [label for label in labels if label not in bundle.labels]
+    if unexpected_labels:
+        raise ValueError(f'Unexpected labels for the {mode} model: {unexpected_labels}')
+
+    texts = extract_relevant_metadata_as_strings(comments, processes)
+    if update_idf and bundle.vectorizer.use_idf:
+        bundle.vectorizer.partial_fit(texts)
+    vectorized_labels = [bundle.labels.index(label) for label in labels]
+    history = bundle.model.fit(
+            SparseBatches(bundle.vectorize(texts), vectorized_labels, batch_size),
+            epochs=epochs,
+            verbose=2).history
 
+    manifest['training_set_size'] = manifest.get('training_set_size', 0) + len(labels)
+    manifest['n_updates'] = manifest.get('n_updates', 0) + 1
+    save_bundle(bundle, mode, manifest)
+    return history['loss'][-1], history['acc'][-1]
@@ -0,0 +1,159 @@
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy
+
+import annotation_cache
+import constants
+import matcher
+import mlp
+
+texts = ['so wavy _water_wave_', 'not wavy at all', 'op is so wavy', 'op is not wavy _is_op']
+labels = [0, 1, 0, 1]
+
+class ThresholdModel:
+    """Stands in for a keras model: the probability of each class is the text's first feature."""
+
+    def __init__(self, n_outputs):
+        self.n_outputs = n_outputs
+
+    def predict(self, x, batch_size=None):
+        first = numpy.asarray(x[:, 0].todense()).reshape(-1, 1)
+        if self.n_outputs == 1:
+            return first
+        return numpy.hstack([first, 1 - first] + [numpy.zeros_like(first)] * (self.n_outputs - 2))
+
+class NgramBundleTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vectorizer, self.selector, self.x_train = mlp.fit_ngram_vectorizer(texts, labels)
+
+    def testVectorizeMatchesTraining(self):
+        bundle = mlp.NgramBundle(self.vectorizer, self.selector, None, ['wavy', 'not_wavy'])
+        self.assertEqual((bundle.vectorize(texts) != self.x_train).nnz, 0)
+
+    def testClassifyMany(self):
+        for n_outputs in [1, 3]:
+            bundle = mlp.NgramBundle(self.vectorizer, self.selector, ThresholdModel(n_outputs),
+                                     ['wavy', 'not_wavy', 'ambiguous'])
+            x = bundle.vectorize(texts)
+            first = numpy.asarray(x[:, 0].todense()).ravel()
+            if n_outputs == 1:
+                expected = ['not_wavy' if p > 0.5 else 'wavy' for p in first]
+            else:
+                expected = ['wavy' if p > 1 - p else 'not_wavy' for p in first]
+            self.assertEqual(bundle.classify_many(texts), expected)
+            self.assertEqual(bundle.classify(texts[0]), expected[0])
+        self.assertEqual(bundle.classify_many([]), [])
+
+    def testLabelNames(self):
+        names = mlp._label_names(constants.POSITIVITY, len(mlp.POSITIVITY_VECTORIZATION))
+        self.assertEqual([mlp.POSITIVITY_VECTORIZATION[name] for name in names],
+                         list(range(len(names))))
+
+class MetadataStringsTest(unittest.TestCase):
+
+    def setUp(self):
+        self.path = constants.ANNOTATION_CACHE_PATH
+        constants.ANNOTATION_CACHE_PATH = ':memory:'
+        annotation_cache._connection = None
+
+    def tearDown(self):
+        constants.ANNOTATION_CACHE_PATH = self.path
+        annotation_cache._connection = None
+
+    def testWithoutName(self):
+        comments = [
+            {'name': 't1_a', 'body': 'so wavy 🌊 u/someone', 'link_id': 't3_a', 'parent_id': 't3_a', 'is_submitter': False},
+            # As sent to /classify_batch, without a name.
+            {'body': 'not wavy', 'link_id': 't3_a', 'parent_id': 't1_a', 'is_submitter': True},
+        ]
+        with mock.patch('matcher.scan', wraps=matcher.scan) as scan:
+            strings = mlp.extract_relevant_metadata_as_strings(comments, processes=1)
+            # Each body is scanned once.
+            self.assertEqual(scan.call_count, len(comments))
+        self.assertEqual(strings, [mlp._extract_relevant_metadata_as_string(comment) for comment in comments])
+        self.assertIn('_water_wave_', strings[0])
+        self.assertIn('_mentions_user', strings[0])
+        self.assertIn('_is_op', strings[1])
+
+class HashingModeTest(unittest.TestCase):
+
+    def setUp(self):
+        self.vectorizer_mode = mlp.VECTORIZER_MODE
+        mlp.VECTORIZER_MODE = 'hashing'
+
+    def tearDown(self):
+        mlp.VECTORIZER_MODE = self.vectorizer_mode
+
+    def testNoSelection(self):
+        vectorizer, selector, x = mlp.fit_ngram_vectorizer(iter(texts), labels)
+        self.assertIsNone(selector)
+        self.assertEqual(x.shape, (len(texts), mlp.HASHING_N_FEATURES))
+        self.assertEqual(x.dtype, numpy.float32)
+
+        bundle = mlp.NgramBundle(vectorizer, selector, ThresholdModel(1), ['wavy', 'not_wavy'])
+        # Words the vectorizer has never seen still get features.
+        self.assertEqual(bundle.vectorize(['brand new slang']).nnz, 5)
+        self.assertEqual(len(bundle.classify_many(texts)), len(texts))
+
+class SparseBatchesTest(unittest.TestCase):
+
+    def testBatches(self):
+        vectorizer, selector, x = mlp.fit_ngram_vectorizer(texts, labels)
+        self.assertEqual(x.dtype, numpy.float32)
+        batches = mlp.SparseBatches(x, labels, batch_size=3, shuffle=False)
+        self.assertEqual(len(batches), 2)
+        first_x, first_labels = batches[0]
+        numpy.testing.assert_array_equal(first_x, x[:3].toarray())
+        numpy.testing.assert_array_equal(first_labels, labels[:3])
+
+        # Shuffled batches still cover every row once per epoch.
+        batches = mlp.SparseBatches(x, labels, batch_size=3, seed=1738)
+        for _ in range(2):
+            rows = numpy.vstack([batches[i][0] for i in range(len(batches))])
+            self.assertEqual(sorted(map(tuple, rows)), sorted(map(tuple, x.toarray())))
+            batches.on_epoch_end()
+
+class BundleStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = constants.MLP_MODEL_DIR
+        constants.MLP_MODEL_DIR = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(constants.MLP_MODEL_DIR)
+        constants.MLP_MODEL_DIR = self.model_dir
+
+    def testNoBundle(self):
+        with self.assertRaises(ValueError):
+            mlp.load_bundle(constants.POSITIVITY)
+
+    def testSaveLoad(self):
+        vectorizer, selector, x_train = mlp.fit_ngram_vectorizer(texts, labels)
+        model = mlp.mlp_model(layers=2, units=4, dropout_rate=0.2,
+                              input_shape=x_train.shape[1:], num_classes=2)
+        bundle = mlp.NgramBundle(vectorizer, selector, model, ['wavy', 'not_wavy'])
+        mlp.save_bundle(bundle, constants.POSITIVITY, {'training_set_size': len(texts)})
+        # Saving again replaces the bundle.
+        mlp.save_bundle(bundle, constants.POSITIVITY, {'training_set_size': len(texts)})
+
+        loaded, manifest = mlp.load_bundle(constants.POSITIVITY)
+        self.assertEqual(manifest['labels'], ['wavy', 'not_wavy'])
+        self.assertEqual(manifest['training_set_size'], len(texts))
+        self.assertEqual(loaded.vectorizer.vocabulary_, vectorizer.vocabulary_)
+        numpy.testing.assert_allclose(loaded.model.predict(x_train), model.predict(x_train), rtol=1e-5)
+        self.assertEqual(loaded.classify_many(texts), bundle.classify_many(texts))
+
+    def testUpdateNeedsHashing(self):
+        vectorizer, selector, x_train = mlp.fit_ngram_vectorizer(texts, labels)
+        model = mlp.mlp_model(layers=2, units=4, dropout_rate=0.2,
+                              input_shape=x_train.shape[1:], num_classes=2)
+        mlp.save_bundle(mlp.NgramBundle(vectorizer, selector, model, ['wavy', 'not_wavy']), constants.POSITIVITY)
+        with self.assertRaises(ValueError):
+            mlp.update_ngram_model([], [], constants.POSITIVITY)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+"""Versioned, on-disk storage for trained classifiers.
+
+Each version is a directory in constants.MODEL_DIR holding the pickled
+classifiers and a manifest.json describing how they were trained. Versions are
+named by their creation time, so the newest version sorts last. A version's
+evaluation (see evaluation.py) is cached alongside it.
+
+Usage:
+    version = model_store.save({'is_wavy': classifier}, {'training_set_size': {'is_wavy': 500}})
+    classifiers, manifest = model_store.load()
+"""
+
+import datetime
+import json
+import os
+import pickle
+import shutil
+
+import constants
+
+CLASSIFIERS_FILE = 'classifiers.pickle'
+MANIFEST_FILE = 'manifest.json'
+EVALUATION_FILE = 'evaluation.json'
+
+def _version_dir(version):
+    return os.path.join(constants.MODEL_DIR, version)
+
+def save(classifiers, manifest):
+    """Save classifiers as a new version.
+
+    # Arguments
+        classifiers: dict, maps a name (eg. 'is_wavy') to a picklable classifier.
+        manifest: dict, json-serializable description of the training run.
+
+    # Returns
+        string, the new version.
+    """
+    now = datetime.datetime.utcnow()
+    version = now.strftime('%Y%m%d-%H%M%S-%f')
+    manifest = dict(manifest,
+            version=version,
+            created_utc=now.isoformat(),
+            classifiers=sorted(classifiers))
+
+    # Write to a temporary directory first, so a half-written version is never loaded.
+    tmp_dir = _version_dir('.tmp-' + version)
+    os.makedirs(tmp_dir)
+    try:
+        with open(os.path.join(tmp_dir, CLASSIFIERS_FILE), 'wb') as f:
+            pickle.dump(classifiers, f, protocol=pickle.HIGHEST_PROTOCOL)
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+        os.rename(tmp_dir, _version_dir(version))
+    except Exception:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    print('Saved model version', version)
+    return version
+
+def versions():
+    """All saved versions, oldest first."""
+    if not os.path.isdir(constants.MODEL_DIR):
+        return []
+    return sorted(v for v in os.listdir(constants.MODEL_DIR) 
+                  if not v.startswith('.')
+                  and os.path.isfile(os.path.join(_version_dir(v), MANIFEST_FILE)))
+
+def latest_version():
+    all_versions = versions()
+    return all_versions[-1] if all_versions else None
+
+def load_manifest(version):
+    with open(os.path.join(_version_dir(version), MANIFEST_FILE)) as f:
+        return json.load(f)
+
+def load(version=None):
+    """Load the classifiers and manifest for a version, by default the newest.
+
+    # Raises
+        ValueError: if there is no saved version.
+    """
+    version = version or latest_version()
+    if not version:
+        raise ValueError('No saved model versions in {}'.format(constants.MODEL_DIR))
+    with open(os.path.join(_version_dir(version), CLASSIFIERS_FILE), 'rb') as f:
+        classifiers = pickle.load(f)
+    return classifiers, load_manifest(version)
+
+def load_evaluation(version):
+    """The evaluation saved for a version, or None if it has not been evaluated."""
+    path = os.path.join(_version_dir(version), EVALUATION_FILE)
+    if not os.path.isfile(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+def save_evaluation(version, evaluation):
+    """Save a json-serializable evaluation of a version, replacing any earlier one."""
+    path = os.path.join(_version_dir(version), EVALUATION_FILE)
+    with open(path + '.tmp', 'w') as f:
+        json.dump(evaluation, f, indent=2, sort_keys=True)
+    os.replace(path + '.tmp', path)
+
+def prune(keep=5):
+    """Delete all but the newest <keep> versions."""
+    for version in versions()[:-keep]:
+        shutil.rmtree(_version_dir(version))
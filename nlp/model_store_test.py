@@ -0,0 +1,50 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import constants
+import model_store
+
+class ModelStoreTest(unittest.TestCase):
+
+    def setUp(self):
+        self.model_dir = constants.MODEL_DIR
+        constants.MODEL_DIR = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(constants.MODEL_DIR)
+        constants.MODEL_DIR = self.model_dir
+
+    def testNoVersions(self):
+        self.assertIsNone(model_store.latest_version())
+        with self.assertRaises(ValueError) as context:
+            model_store.load()
+        self.assertEqual(str(context.exception), 'No saved model versions in ' + constants.MODEL_DIR)
+
+    def testSaveLoad(self):
+        first = model_store.save({'is_wavy': {'a': 1}}, {'training_set_size': {'is_wavy': 1}})
+        second = model_store.save({'is_wavy': {'b': 2}}, {'training_set_size': {'is_wavy': 2}})
+        self.assertEqual(model_store.versions(), [first, second])
+
+        classifiers, manifest = model_store.load()
+        self.assertDictEqual(classifiers, {'is_wavy': {'b': 2}})
+        self.assertEqual(manifest['version'], second)
+        self.assertEqual(manifest['training_set_size'], {'is_wavy': 2})
+
+        classifiers, manifest = model_store.load(first)
+        self.assertDictEqual(classifiers, {'is_wavy': {'a': 1}})
+
+    def testIgnoresPartialVersions(self):
+        version = model_store.save({}, {})
+        os.makedirs(os.path.join(constants.MODEL_DIR, '.tmp-99999999'))
+        os.makedirs(os.path.join(constants.MODEL_DIR, '99999999-no-manifest'))
+        self.assertEqual(model_store.latest_version(), version)
+
+    def testPrune(self):
+        versions = [model_store.save({}, {}) for _ in range(4)]
+        model_store.prune(keep=2)
+        self.assertEqual(model_store.versions(), versions[2:])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,15 +1,19 @@
 from collections import defaultdict
-from pymongo import MongoClient
-from bson.son import SON
 
 import constants
-import pymongo
+import itertools
 import pprint
 import operator
 import nltk # natural language toolkit
+import storage
 import time
 
-client = MongoClient()
+# Every read & write goes through the storage backend, see storage.py
+backend = storage.create()
+
+def use_backend(new_backend):
+    global backend
+    backend = new_backend
 
 def short_comment(comment):
     ret = {}
@@ -25,152 +29,264 @@ def body_only(comment):
     return comment['body']
 
 def get_comment(comment_name, pretty=True):
-    comments = client[constants.DB_KANYE][constants.COMMENTS]
-    comment = comments.find_one({'name': comment_name})
+    comment = backend.find_comment(comment_name)
     if not comment:
         raise ValueError('Could not find comment for name:', comment_name)
     comment = short_comment(comment) if pretty else comment
     return comment
 
+# Maximum number of names in a single $in query.
+BULK_QUERY_SIZE = 1000
+
+# Maps each name to its comment, with one query per BULK_QUERY_SIZE names.
+def get_comments(comment_names, pretty=True):
+    names = list(set(comment_names))
+    found = {}
+    for i in range(0, len(names), BULK_QUERY_SIZE):
+        for comment in backend.find_comments(names[i:i + BULK_QUERY_SIZE]):
+            # Same as find_one, keep the first comment if a name is duplicated.
+            if comment['name'] not in found:
+                found[comment['name']] = short_comment(comment) if pretty else comment
+
+    missing = [name for name in names if name not in found]
+    if missing:
+        raise ValueError('Could not find comments for names:', missing)
+    return found
+
 # gets <limit> most recent comments.
 def get_recent_comments(limit=10, pretty=True):
-    comments = client[constants.DB_KANYE][constants.COMMENTS]
     ret = []
-    for comment in comments.find().sort('created_utc', pymongo.DESCENDING).limit(limit):
+    for comment in backend.recent_comments(limit):
         ret.append(comment if not pretty else short_comment(comment))
     return ret
 
 ### The following handle comment categories
 
 def is_updated(comment_name):
-    categories = client[constants.DB_KANYE][constants.TRAIN_CATEGORIES]
-    comment = categories.find_one({'name': comment_name})
-    return bool(comment)
+    return next(iter(backend.find_curated([comment_name])), None) is not None
 
-def update_comment_category(comment_name, category=None, is_wavy=None):
-    categories = client[constants.DB_KANYE][constants.TRAIN_CATEGORIES]
-    # TODO: compress into one statement?
-    # TODO: make this ACID compliant (both should fail or succeed together)
+def _validate_curated_labels(labels):
+    if constants.CATEGORY in labels and labels[constants.CATEGORY] not in constants.CATEGORIES_TEXT:
+        raise ValueError('Category does not exist:', labels[constants.CATEGORY])
+    if constants.POSITIVITY in labels and labels[constants.POSITIVITY] not in constants.POSITIVITY_TEXT:
+        raise ValueError('Positivity does not exist:', labels[constants.POSITIVITY])
+
+def _curated_labels(category, is_wavy):
+    labels = {}
     if category:
-        if category not in constants.CATEGORIES_TEXT:
-            raise ValueError('Category does not exist:', category)
-        categories.find_one_and_update(
-                {'name': comment_name},
-                {'$set': {constants.CATEGORY: category}},
-                upsert=True)
+        labels[constants.CATEGORY] = category
     if is_wavy:
-        if is_wavy not in constants.POSITIVITY_TEXT:
-            raise ValueError('Positivity does not exist:', is_wavy)
-        categories.find_one_and_update(
-                {'name': comment_name},
-                {'$set': {constants.POSITIVITY: is_wavy}},
-                upsert=True)
-
-# returns command cursor
+        labels[constants.POSITIVITY] = is_wavy
+    _validate_curated_labels(labels)
+    return labels
+
+# Returns the (field, old label, new label) changes to the comment's training labels.
+def update_comment_category(comment_name, category=None, is_wavy=None):
+    labels = _curated_labels(category, is_wavy)
+    if not labels:
+        return []
+    # Both labels are set in a single (atomic) write.
+    before = backend.set_curated(comment_name, labels)
+
+    majorities = None
+    if any(field not in (before or {}) for field in labels):
+        # The curated label replaces the users' label, if they gave one.
+        majorities = next(iter(backend.find_majorities([comment_name])), None)
+
+    changes = _curated_label_changes(labels, before, majorities)
+    update_statistics(changes)
+    return changes
+
+# Number of labels written by each bulk_write in import_curated_labels.
+BULK_WRITE_SIZE = 1000
+
+# Sets the curated labels of many comments, with a few queries per BULK_WRITE_SIZE comments.
+# Takes (comment name, category, is_wavy) tuples, where either label may be None.
+# Every label is checked before anything is written.
+# Returns the (comment name, field, old label, new label) changes to the training labels.
+def import_curated_labels(records):
+    labeled = {}
+    for name, category, is_wavy in records:
+        # A later record for the same comment adds to (or replaces) its labels.
+        labeled.setdefault(name, {}).update(_curated_labels(category, is_wavy))
+    labeled = {name: labels for name, labels in labeled.items() if labels}
+
+    names = list(labeled)
+    all_changes = []
+    for i in range(0, len(names), BULK_WRITE_SIZE):
+        batch = names[i:i + BULK_WRITE_SIZE]
+        before = {c['name']: c for c in backend.find_curated(batch)}
+        majorities = {m['name']: m for m in backend.find_majorities(batch)}
+        backend.set_curated_many({name: labeled[name] for name in batch})
+
+        changes = []
+        for name in batch:
+            for change in _curated_label_changes(labeled[name], before.get(name), majorities.get(name)):
+                changes.append(change)
+                all_changes.append((name,) + change)
+        update_statistics(changes)
+    return all_changes
+
+# Changes to a comment's training labels when it gets curated labels.
+# before is its previous curated labels, and majorities its users' majority labels.
+def _curated_label_changes(labels, before, majorities):
+    changes = []
+    for field, label in labels.items():
+        if before and field in before:
+            old_label = before[field]
+        else:
+            old_label = majorities.get(MAJORITY_FIELDS[field]) if majorities else None
+        if old_label != label:
+            changes.append((field, old_label, label))
+    return changes
+
+# Number of comments checked for labels at a time by get_noncategorized_comments.
+NONCATEGORIZED_BATCH_SIZE = 100
+
+# The <limit> newest comments without a curated label.
+# Walks the comments newest first, and stops as soon as it has found enough.
 def get_noncategorized_comments(limit=10):
-    comments = client[constants.DB_KANYE][constants.COMMENTS]
-    # join logic taken from: https://stackoverflow.com/questions/8772936
-    pipeline = [
-        {'$lookup' : {
-            'from': constants.TRAIN_CATEGORIES,
-            'localField': 'name',
-            'foreignField': 'name',
-            'as': 'matched_docs',
-        }},
-        {'$match': {'matched_docs': {'$eq': []}}},
-        {'$sort': SON([('created_utc', -1)])},
-        {'$limit': limit}
-    ]
-    command_cursor = comments.aggregate(pipeline)
-    return command_cursor
+    newest = backend.newest_comments(NONCATEGORIZED_BATCH_SIZE)
+    found = []
+    try:
+        while len(found) < limit:
+            batch = list(itertools.islice(newest, NONCATEGORIZED_BATCH_SIZE))
+            if not batch:
+                break
+            labeled = {c['name'] for c in backend.find_curated([comment['name'] for comment in batch])}
+            found += [comment for comment in batch if comment['name'] not in labeled]
+    finally:
+        newest.close()
+    return found[:limit]
 
 # all categorized comments, and their categories
 def get_categorized_classified_comments():
-    categories = client[constants.DB_KANYE][constants.TRAIN_CATEGORIES]
-    return categories.find({constants.CATEGORY: {'$exists': True}})
+    return backend.find_curated(fields=[constants.CATEGORY])
 
 def get_positivity_classified_comments():
-    categories = client[constants.DB_KANYE][constants.TRAIN_CATEGORIES]
-    return categories.find({constants.POSITIVITY: {'$exists': True}})
+    return backend.find_curated(fields=[constants.POSITIVITY])
 
+# Maps the vote count fields to the fields holding their majority label.
+MAJORITY_FIELDS = {
+    constants.POSITIVITY: constants.MAJORITY_POSITIVITY,
+    constants.CATEGORY: constants.MAJORITY_CATEGORY,
+}
+
+def _majority_labels(totals):
+    majorities = {}
+    for field, majority_field in MAJORITY_FIELDS.items():
+        # Not gonna worry about ties.
+        # Finding key for max value taken from:
+        # https://stackoverflow.com/questions/268272/getting-key-with-maximum-value-in-dictionary
+        label, votes = max(totals[field].items(), key=operator.itemgetter(1))
+        if votes > 0:
+            majorities[majority_field] = label
+    return majorities
+
+# Maps the n_votes & label count fields of a user classification to their increments for one vote.
+def user_vote_increments(classification):
+    increments = {constants.N_VOTES: 1}
+    for field in MAJORITY_FIELDS:
+        if field in classification:
+            increments[field + '.' + classification[field]] = 1
+    return increments
+
+# The label counts a comment's new totals start at, other than the ones incremented.
+def _user_vote_zeroes(increments):
+    zeroes = {}
+    for field, labels in [(constants.POSITIVITY, constants.POSITIVITY_TEXT), 
+                          (constants.CATEGORY, constants.CATEGORIES_TEXT)]:
+        for label in labels:
+            # A field cannot be in both $inc and $setOnInsert.
+            if field + '.' + label not in increments:
+                zeroes[field + '.' + label] = 0
+    return zeroes
+
+# Returns the (field, old label, new label) changes to the comment's training labels.
 def update_user_classification(comment_name, classification):
-    user_classified = client[constants.DB_KANYE][constants.USER_CLASSIFIED]
-    doc = user_classified.find_one({'name': comment_name})
-    if doc:
-        if constants.POSITIVITY in classification:
-            user_classified.find_one_and_update(
-                {'name': comment_name}, 
-                {'$inc': { constants.POSITIVITY + '.' + classification[constants.POSITIVITY] : 1 } }
-            )
-
-        if constants.CATEGORY in classification:
-            user_classified.find_one_and_update(
-                {'name': comment_name}, 
-                {'$inc': { constants.CATEGORY + '.' + classification[constants.CATEGORY] : 1 } }
-            )
-    else:
-        doc = { 
-            'name': comment_name,
-            constants.POSITIVITY: {},
-            constants.CATEGORY: {}
-        }
-        for key in constants.POSITIVITY_TEXT:
-            doc[constants.POSITIVITY][key] = 0
-        for key in constants.CATEGORIES_TEXT:
-            doc[constants.CATEGORY][key] = 0
-
-        if constants.POSITIVITY in classification:
-            doc[constants.POSITIVITY][classification[constants.POSITIVITY]] += 1
-        if constants.CATEGORY in classification:
-            doc[constants.CATEGORY][classification[constants.CATEGORY]] += 1
-
-        user_classified.insert_one(doc).acknowledged
+    increments = user_vote_increments(classification)
+    # A single round trip, whether or not the comment has been voted on before.
+    totals = backend.add_votes(comment_name, increments, _user_vote_zeroes(increments))
+    return _apply_majority_changes([totals]).get(comment_name, [])
+
+# Adds many comments' votes at once, see vote_buffer.py. 
+# Maps each comment name to its increments (summed user_vote_increments).
+# Returns a dict of the comments whose training labels changed, to their changes.
+def add_user_votes(increments_by_name):
+    if not increments_by_name:
+        return {}
+    names = list(increments_by_name)
+    totals = []
+    for i in range(0, len(names), BULK_QUERY_SIZE):
+        totals += backend.add_votes_many({
+            name: (increments_by_name[name], _user_vote_zeroes(increments_by_name[name]))
+            for name in names[i:i + BULK_QUERY_SIZE]})
+    return _apply_majority_changes(totals)
+
+# Sets the majority labels that changed with new votes, given the totals after the votes.
+# Returns a dict of the comments whose training labels changed, to their changes.
+def _apply_majority_changes(all_totals):
+    changed = {}
+    for totals in all_totals:
+        majorities = _majority_labels(totals)
+        majority_changes = {k: v for k, v in majorities.items() if totals.get(k) != v}
+        # Only write the majority if it changed. Matching on the vote count means 
+        # a concurrent vote cannot be overwritten with a stale majority: the later 
+        # vote sets the majority from its own (newer) totals.
+        if majority_changes and backend.set_vote_fields(
+                totals['name'], totals[constants.N_VOTES], majority_changes):
+            changed[totals['name']] = (totals, majority_changes)
+
+    if not changed:
+        return {}
+
+    # A curated label takes priority over the users' majority.
+    curated = {c['name']: c for c in backend.find_curated(list(changed))}
+    changes = {}
+    for name, (totals, majority_changes) in changed.items():
+        label_changes = [(field, totals.get(majority_field), majority_changes[majority_field])
+                         for field, majority_field in MAJORITY_FIELDS.items()
+                         if majority_field in majority_changes and field not in curated.get(name, {})]
+        if label_changes:
+            changes[name] = label_changes
+
+    update_statistics([change for label_changes in changes.values() for change in label_changes])
+    return changes
+
+# Sets the majority labels on user classifications saved before they were kept on write.
+def backfill_user_majorities():
+    n_updated = 0
+    for totals in backend.find_votes(without_n_votes=True):
+        # Every vote counts towards positivity, category, or both.
+        n_votes = max(sum(totals[constants.POSITIVITY].values()), sum(totals[constants.CATEGORY].values()))
+        update = dict(_majority_labels(totals), **{constants.N_VOTES: n_votes})
+        backend.set_vote_fields(totals['name'], None, update)
+        n_updated += 1
+    return n_updated
 
 def get_single_comment_classification_totals(comment_name):
-    user_classified = client[constants.DB_KANYE][constants.USER_CLASSIFIED]
-    totals =  user_classified.find_one({'name': comment_name})
+    totals = next(iter(backend.find_votes([comment_name])), None)
     if not totals: 
         raise ValueError('Comment ' + comment_name + ' has not been classified by a user.')
     return totals
 
-def get_single_user_classification(comment_name):
-    totals = get_single_comment_classification_totals(comment_name)
-    comment = { 'name': comment_name }
-    
-    # Not gonna worry about ties.
-    # Finding key for max value taken from:
-    # https://stackoverflow.com/questions/268272/getting-key-with-maximum-value-in-dictionary
-    positivity = max(totals[constants.POSITIVITY].items(), key=operator.itemgetter(1))[0]
-    category = max(totals[constants.CATEGORY].items(), key=operator.itemgetter(1))[0]
-
-    if totals[constants.POSITIVITY][positivity] > 0:
-        comment[constants.POSITIVITY] = positivity
-    if totals[constants.CATEGORY][category] > 0:
-        comment[constants.CATEGORY] = category
-
+def _user_classified_comment(majorities):
+    comment = { 'name': majorities['name'] }
+    for field, majority_field in MAJORITY_FIELDS.items():
+        if majority_field in majorities:
+            comment[field] = majorities[majority_field]
     return comment
 
-# Much copy paste. Wow reuse code. Def refactor.
+def get_single_user_classification(comment_name):
+    majorities = next(iter(backend.find_majorities([comment_name])), None)
+    if not majorities:
+        raise ValueError('Comment ' + comment_name + ' has not been classified by a user.')
+    return _user_classified_comment(majorities)
+
 # Returns list of comments with their category and positivity (if they exist)
 def get_all_user_classified_comments():
-    user_classified = client[constants.DB_KANYE][constants.USER_CLASSIFIED]
-    user_classified_totals = user_classified.find({})
-
-    ret = []
-    for totals in user_classified_totals:
-        comment = { 'name': totals['name'] }
-        
-        # Not gonna worry about ties.
-        # Finding key for max value taken from:
-        # https://stackoverflow.com/questions/268272/getting-key-with-maximum-value-in-dictionary
-        positivity = max(totals[constants.POSITIVITY].items(), key=operator.itemgetter(1))[0]
-        category = max(totals[constants.CATEGORY].items(), key=operator.itemgetter(1))[0]
-
-        if totals[constants.POSITIVITY][positivity] > 0:
-            comment[constants.POSITIVITY] = positivity
-        if totals[constants.CATEGORY][category] > 0:
-            comment[constants.CATEGORY] = category
-        ret.append(comment)
+    ret = [_user_classified_comment(majorities) 
+           for majorities in backend.find_majorities()]
 
     print("Applied user classification to", len(ret), "comments")
     return ret
@@ -178,19 +294,24 @@ def get_all_user_classified_comments():
 # NOTE: if a user refers to an external object, we are considering it external 
 # (even if the user is sort of referring to the link)
 def get_link_comments():
-    categories = client[constants.DB_KANYE][constants.TRAIN_CATEGORIES]
-    cursor = categories.find({"category": "link"})
-    return cursor
-
-def _combine_official_and_user_classified_comments(function, field):
-    pairs = []
+    return backend.find_curated(query={constants.CATEGORY: 'link'})
+
+# Yields the full comments for names in batches (lists) of up to batch_size, in 
+# order, so only one batch is in memory at a time.
+def iter_comment_batches(comment_names, batch_size=BULK_QUERY_SIZE, pretty=False):
+    comment_names = list(comment_names)
+    for i in range(0, len(comment_names), batch_size):
+        batch = comment_names[i:i + batch_size]
+        found = get_comments(batch, pretty=pretty)
+        yield [found[name] for name in batch]
+
+def _official_and_user_labels(function, field):
+    labels = [] # (name, label), in order
     used_names = set() # In case the users classify a comment that I did myself.
 
     # comments that I have classified
-    cursor = function()
-    for classified_comment in cursor:
-        full_comment = get_comment(classified_comment['name'], pretty=False)
-        pairs.append((full_comment, classified_comment[field]))
+    for classified_comment in function():
+        labels.append((classified_comment['name'], classified_comment[field]))
         used_names.add(classified_comment['name'])
 
     # Comments that users have classified.
@@ -198,15 +319,18 @@ def _combine_official_and_user_classified_comments(function, field):
     for user_classified_comment in user_classified:
     # A labeled comment may not always be labeled for both 'is_wavy' and 'category'
         if field in user_classified_comment and user_classified_comment['name'] not in used_names:
-            full_comment = get_comment(user_classified_comment ['name'], pretty=False)
-            pairs.append((full_comment, user_classified_comment[field]))
+            labels.append((user_classified_comment['name'], user_classified_comment[field]))
             used_names.add(user_classified_comment['name'])
-    
-    return pairs
+    return labels
+
+def _combine_official_and_user_classified_comments(function, field):
+    labels = _official_and_user_labels(function, field)
+    # Fetch all the full comments together, rather than one query per comment.
+    full_comments = get_comments([name for name, label in labels], pretty=False)
+    return [(full_comments[name], label) for name, label in labels]
 
 def get_count(category):
-    categories = client[constants.DB_KANYE][constants.TRAIN_CATEGORIES]
-    return categories.find({"category": category}).count()
+    return backend.count_curated({constants.CATEGORY: category})
 
 # Maps each category to (total, pct) comments in that category.
 def categories_counts():
@@ -249,11 +373,97 @@ def positivity_counts():
 
     return count
 
+### Materialized label counts, kept up to date as labels change.
+
+STATISTICS_ID = storage.STATISTICS_ID
+
+def update_statistics(changes):
+    increments = defaultdict(int)
+    for field, old_label, new_label in changes:
+        if old_label:
+            increments[field + '.' + old_label] -= 1
+        increments[field + '.' + new_label] += 1
+    if increments:
+        # If the counts have not been built yet, get_statistics will build them.
+        backend.inc_statistics(increments)
+
+def _counts_without_zeros(counts):
+    return {label: count for label, count in counts.items() if count}
+
+def get_statistics():
+    """Maps 'is_wavy' and 'category' to the number of comments with each label."""
+    doc = backend.get_statistics()
+    if not doc:
+        reconcile_statistics()
+        doc = backend.get_statistics()
+    return {
+        constants.POSITIVITY: _counts_without_zeros(doc.get(constants.POSITIVITY, {})),
+        constants.CATEGORY: _counts_without_zeros(doc.get(constants.CATEGORY, {})),
+    }
+
+def reconcile_statistics():
+    """Rebuild the label counts from scratch. 
+
+    # Returns
+        dict, for each field, the labels whose stored count had drifted, mapped 
+        to (stored count, actual count).
+    """
+    stored = backend.get_statistics() or {}
+    actual = {
+        constants.POSITIVITY: dict(positivity_counts()),
+        constants.CATEGORY: dict(categories_counts()),
+    }
+
+    drift = {}
+    for field, counts in actual.items():
+        stored_counts = _counts_without_zeros(stored.get(field, {}))
+        labels = set(stored_counts) | set(counts)
+        drifted = {label: (stored_counts.get(label, 0), counts.get(label, 0))
+                   for label in labels if stored_counts.get(label, 0) != counts.get(label, 0)}
+        if drifted:
+            drift[field] = drifted
+
+    backend.replace_statistics(actual)
+    return drift
+
+# Returns a list of (comment, labels) tuples for every labeled comment. Labels maps
+# 'is_wavy' and/or 'category' to the training label, each taken from my (official)
+# classification if there is one, otherwise from the users' majority.
+def classified_comments_with_labels():
+    labels = {} # name -> labels, in order
+
+    curated = backend.find_curated(fields=[constants.CATEGORY, constants.POSITIVITY])
+    for classified_comment in curated:
+        comment_labels = labels.setdefault(classified_comment['name'], {})
+        for field in MAJORITY_FIELDS:
+            if field in classified_comment:
+                comment_labels[field] = classified_comment[field]
+
+    for user_classified_comment in get_all_user_classified_comments():
+        comment_labels = labels.setdefault(user_classified_comment['name'], {})
+        for field in MAJORITY_FIELDS:
+            if field in user_classified_comment and field not in comment_labels:
+                comment_labels[field] = user_classified_comment[field]
+
+    # Votes without a majority yet have no labels, and their comment may not be stored.
+    labels = {name: comment_labels for name, comment_labels in labels.items() if comment_labels}
+    full_comments = get_comments(labels, pretty=False)
+    return [(full_comments[name], comment_labels) for name, comment_labels in labels.items()]
+
 def classified_comments_with_category():
     return _combine_official_and_user_classified_comments(get_categorized_classified_comments, constants.CATEGORY)
 
 def classified_comments_with_positivity():
     return _combine_official_and_user_classified_comments(get_positivity_classified_comments, constants.POSITIVITY)
 
+# Returns (name, label) for every comment labeled for field ('category' or 'is_wavy'),
+# without the full comments. See iter_comment_batches to fetch them.
+def classified_names_with_label(field):
+    if field == constants.CATEGORY:
+        return _official_and_user_labels(get_categorized_classified_comments, field)
+    if field == constants.POSITIVITY:
+        return _official_and_user_labels(get_positivity_classified_comments, field)
+    raise ValueError('Labels are either {} or {}, not {}'.format(constants.CATEGORY, constants.POSITIVITY, field))
+
 if __name__ == "__main__":
     pprint.pprint(get_recent_comments())
@@ -118,6 +118,19 @@ class CommentsDBTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             mongo_handler.get_comment('comment_dne')
 
+    def testGetComments(self):
+        comments = mongo_handler.get_comments(['t1_e8z9okx', 't1_e6oq65l'], pretty=False)
+        self.assertEqual(len(comments), 2)
+        self.assertEqual(comments['t1_e8z9okx']['author'], 'HangTheDJHoldTheMayo')
+
+        with self.assertRaises(ValueError):
+            mongo_handler.get_comments(['t1_e8z9okx', 'comment_dne'])
+
+    def testCommentBatches(self):
+        names = ['t1_e8z9okx', 't1_e6oq65l', 't1_e8z9okx']
+        batches = list(mongo_handler.iter_comment_batches(names, batch_size=2))
+        self.assertEqual([[c['name'] for c in batch] for batch in batches], [names[:2], names[2:]])
+
     def testShortener(self):
         comment = mongo_handler.get_comment('t1_e6oq65l')
         self.assertEqual(len(comment), 4)
@@ -157,13 +170,49 @@ class CategoriesDBTest(unittest.TestCase):
         with self.assertRaises(ValueError):
             mongo_handler.update_comment_category('c_name', is_wavy='nonexistent')
     
+    def testUpdateBothLabels(self):
+        changes = mongo_handler.update_comment_category('in_db', category='kanye', is_wavy='wavy')
+        self.assertEqual(sorted(changes), [
+            (constants.CATEGORY, 'poster', 'kanye'), (constants.POSITIVITY, None, 'wavy')])
+        curated = self.client.test[constants.TRAIN_CATEGORIES].find_one({'name': 'in_db'})
+        self.assertEqual(curated[constants.CATEGORY], 'kanye')
+        self.assertEqual(curated[constants.POSITIVITY], 'wavy')
+
+    def testImportCuratedLabels(self):
+        changes = mongo_handler.import_curated_labels([
+            ('in_db', 'poster', 'not_wavy'),
+            ('also_in_db', None, 'wavy'),
+            ('new', 'op', None),
+            ('new', None, 'ambiguous'),
+        ])
+        self.assertEqual(sorted(changes), [
+            ('in_db', constants.POSITIVITY, None, 'not_wavy'),
+            ('new', constants.CATEGORY, None, 'op'),
+            ('new', constants.POSITIVITY, None, 'ambiguous'),
+        ])
+        curated = self.client.test[constants.TRAIN_CATEGORIES].find_one({'name': 'new'})
+        self.assertEqual(curated[constants.CATEGORY], 'op')
+        self.assertEqual(curated[constants.POSITIVITY], 'ambiguous')
+
+    def testImportValidatesFirst(self):
+        with self.assertRaises(ValueError):
+            mongo_handler.import_curated_labels([('new', 'op', None), ('other', 'nonexistent', None)])
+        self.assertFalse(mongo_handler.is_updated('new'))
+
     def testIn(self):
         self.assertFalse(mongo_handler.is_updated('zarglbargl'))
         self.assertTrue(mongo_handler.is_updated('in_db'))
 
     def testGetNoncategorized(self):
-        command_cursor = mongo_handler.get_noncategorized_comments()
-        self.assertEqual(sum(1 for _ in command_cursor), 5)
+        comments = mongo_handler.get_noncategorized_comments()
+        self.assertEqual(len(comments), 5)
+        self.assertEqual([c['created_utc'] for c in comments], 
+                         sorted([c['created_utc'] for c in comments], reverse=True))
+
+        # Labeled comments are skipped, and the walk stops at the limit.
+        mongo_handler.update_comment_category(comments[0]['name'], category='kanye')
+        newest = mongo_handler.get_noncategorized_comments(limit=2)
+        self.assertEqual([c['name'] for c in newest], [c['name'] for c in comments[1:3]])
 
     def testGetCategorized(self):
         command_cursor = mongo_handler.get_categorized_classified_comments()
@@ -214,6 +263,29 @@ class UserClassificationTest(unittest.TestCase):
         self.assertEqual(comment[constants.CATEGORY], 'link')
         self.assertNotIn(constants.POSITIVITY, comment)
     
+    def testMajorityKeptOnWrite(self):
+        totals = mongo_handler.get_single_comment_classification_totals('has_many_user_classifications')
+        self.assertEqual(totals[constants.MAJORITY_POSITIVITY], 'wavy')
+        self.assertEqual(totals[constants.MAJORITY_CATEGORY], 'poster')
+        self.assertEqual(totals[constants.N_VOTES], 3)
+
+        for _ in range(2):
+            mongo_handler.update_user_classification('has_many_user_classifications', {constants.CATEGORY: 'kanye'})
+        comment = mongo_handler.get_single_user_classification('has_many_user_classifications')
+        self.assertEqual(comment[constants.CATEGORY], 'kanye')
+        self.assertEqual(comment[constants.POSITIVITY], 'wavy')
+
+    def testBackfillMajority(self):
+        client = MongoClient()
+        user_categorized_collection = client.test[constants.USER_CLASSIFIED]
+        user_categorized_collection.update_many({}, {'$unset': {
+            constants.MAJORITY_POSITIVITY: '', constants.MAJORITY_CATEGORY: '', constants.N_VOTES: ''}})
+
+        self.assertEqual(mongo_handler.backfill_user_majorities(), 3)
+        comment = mongo_handler.get_single_user_classification('has_many_user_classifications')
+        self.assertEqual(comment[constants.POSITIVITY], 'wavy')
+        self.assertEqual(comment[constants.CATEGORY], 'poster')
+
     def testAllClassifiedComments(self):
         self.assertEqual(3, len(mongo_handler.get_all_user_classified_comments()))
         for comment in mongo_handler.get_all_user_classified_comments():
@@ -263,6 +335,8 @@ class CombineCommentsWithClassification(unittest.TestCase):
         user_classifications = client.test[constants.USER_CLASSIFIED]
         user_classifications.delete_many({})
 
+        client.test[constants.STATISTICS].delete_many({})
+
     def testOnlyOfficialComments(self):
 
         categorized = mongo_handler.classified_comments_with_category()
@@ -308,6 +382,29 @@ class CombineCommentsWithClassification(unittest.TestCase):
             self.assertIn('body', comment)
             self.assertIn('name', comment)
 
+    def testNamesWithLabel(self):
+        for field, builder in [
+                (constants.CATEGORY, mongo_handler.classified_comments_with_category),
+                (constants.POSITIVITY, mongo_handler.classified_comments_with_positivity)]:
+            self.assertEqual(mongo_handler.classified_names_with_label(field),
+                             [(comment['name'], label) for comment, label in builder()])
+        with self.assertRaises(ValueError):
+            mongo_handler.classified_names_with_label('dne')
+
+    def testSharedLabels(self):
+        for uc in user_classifications:
+            mongo_handler.update_user_classification(uc['name'], uc['classification'])
+            MongoClient().test[constants.COMMENTS].insert_one({'body': 'user classified', 'name': uc['name']})
+
+        labeled = mongo_handler.classified_comments_with_labels()
+        self.assertEqual(len(labeled), len({c['name'] for c in classified_comments + user_classifications}))
+
+        for field, per_field in [
+                (constants.CATEGORY, mongo_handler.classified_comments_with_category()),
+                (constants.POSITIVITY, mongo_handler.classified_comments_with_positivity())]:
+            shared = sorted((comment['name'], labels[field]) for comment, labels in labeled if field in labels)
+            self.assertEqual(shared, sorted((comment['name'], label) for comment, label in per_field))
+
     def testMetricsWithUserClassification(self):
         for uc in user_classifications:
             mongo_handler.update_user_classification(uc['name'], uc['classification'])
@@ -329,6 +426,28 @@ class CombineCommentsWithClassification(unittest.TestCase):
 
         self.assertEqual(total_count, 6)
 
+    def testIncrementalStatistics(self):
+        mongo_handler.reconcile_statistics()
+
+        for uc in user_classifications:
+            mongo_handler.update_user_classification(uc['name'], uc['classification'])
+        mongo_handler.update_comment_category('has_many_user_classifications', category='link')
+        mongo_handler.update_comment_category('t1_e6oq65l', category='kanye', is_wavy='not_wavy')
+
+        statistics = mongo_handler.get_statistics()
+        self.assertDictEqual(statistics[constants.CATEGORY], dict(mongo_handler.categories_counts()))
+        self.assertDictEqual(statistics[constants.POSITIVITY], dict(mongo_handler.positivity_counts()))
+        self.assertEqual(mongo_handler.reconcile_statistics(), {})
+
+    def testStatisticsDrift(self):
+        client = MongoClient()
+        client.test[constants.STATISTICS].delete_many({})
+        self.assertEqual(sum(mongo_handler.get_statistics()[constants.CATEGORY].values()), len(classified_comments))
+
+        client.test[constants.STATISTICS].update_one({}, {'$inc': {constants.CATEGORY + '.poster': 2}})
+        drift = mongo_handler.reconcile_statistics()
+        self.assertDictEqual(drift, {constants.CATEGORY: {'poster': (5, 3)}})
+
 if __name__ == '__main__':
     constants.DB_KANYE = constants.DB_TEST
     unittest.main()
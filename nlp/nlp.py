@@ -1,6 +1,10 @@
-import emoji
 import nltk
+import annotation_cache
+import feature_matrix
+import matcher
+import metrics
 import mongo_handler
+import online_nb
 import constants
 import pprint
 import random
@@ -49,22 +53,40 @@ python3 cli:
 # link_id, link_permalink (overall thread id & permalink, includes reddit.com)
 # consider also using neighbor words around 'wavy'
 
+@metrics.timed('get_features')
 def get_features(comment):
     if not comment:
         raise ValueError('Cannot extract features for empty comment.')
 
-    body = comment['body']
-    body_lowercase = body.lower()
-
     # NOTE: does not break up multiple emojis without space between them
-    tokens = nltk.word_tokenize(body)
-    tagged = nltk.pos_tag(tokens) # list of tuples
-    # https://stackoverflow.com/questions/48660547
-    entities = nltk.chunk.ne_chunk(tagged) 
+    # Tokens, pos tags & named entities are cached, see annotation_cache.py
+    annotation = annotation_cache.annotate(comment.get('name'), comment['body'])
+    return _features_from_annotation(comment, annotation)
+
+@metrics.timed('get_features_batch')
+def get_features_batch(comments, processes=1):
+    '''Extract features for a list of comments, in the same order.
+
+        Cached annotations are looked up together, and the pos tagger and ne
+        chunker are loaded once for all the comments that are not cached.
+        Pass processes (None for the cpu count) to annotate those comments in
+        parallel, see annotation_cache.compute_parallel.
+    '''
+    for comment in comments:
+        if not comment:
+            raise ValueError('Cannot extract features for empty comment.')
+
+    annotations = annotation_cache.annotate_many(
+            [(comment.get('name'), comment['body']) for comment in comments], processes)
+    return [_features_from_annotation(comment, annotation)
+            for comment, annotation in zip(comments, annotations)]
+
+def _features_from_annotation(comment, annotation):
+    body = comment['body']
 
     features = {}
     # NaiveBayes cannot take non-binary values. Must be binned. Ch6 5.3
-    l = len(tokens)
+    l = len(annotation['tagged'])
     if l < 3:
         features['short'] = True
     elif l < 15:
@@ -72,21 +94,21 @@ def get_features(comment):
     else:
         features['long'] = True
 
+    # One scan over the body finds every useful emoji & word, see matcher.py
+    with metrics.timer('match_features'):
+        hits = matcher.scan(body)
+
     features['top level comment'] = comment['link_id'] == comment['parent_id']
     features['is OP'] = comment['is_submitter']
-    features['mentions user'] = 'u/' in body
+    features['mentions user'] = hits.mentions_user
 
-    for e in constants.USEFUL_EMOJI:
-        features['emoji ({})'.format(emoji.emojize(e, use_aliases=True))] \
-            = emoji.emojize(e, use_aliases=True) in comment['body']
+    for e, fname in feature_matrix.EMOJI_FEATURES.items():
+        features[fname] = e in hits.emoji
 
-    for w in constants.USEFUL_WORDS:
-        features['contains \'{}\''.format(w)] = w in body_lowercase
+    for w, fname in feature_matrix.WORD_FEATURES.items():
+        features[fname] = w in hits.words
 
-    named_entities = 0
-    for chunk in entities:
-        if hasattr(chunk, 'label'):
-            named_entities += 1
+    named_entities = annotation['n_entities']
     if named_entities <= 0:
         features['no ne'] = True
     elif named_entities < 2:
@@ -96,23 +118,59 @@ def get_features(comment):
 
     return features
 
-def featureset(categorized_comments):
-    return [(get_features(comment), category) 
-            for (comment, category) in categorized_comments]
-
-def get_test_train_sets_positivity():
-    labeled_set = mongo_handler.classified_comments_with_positivity()
-    random.shuffle(labeled_set)
-    train_set = nltk.classify.apply_features(get_features, labeled_set[:500])
-    test_set = nltk.classify.apply_features(get_features, labeled_set[500:])
-    return test_set, train_set
-
-def get_test_train_sets_category():
-    labeled_set = mongo_handler.classified_comments_with_category()
-    random.shuffle(labeled_set)
-    train_set = nltk.classify.apply_features(get_features, labeled_set[:500])
-    test_set = nltk.classify.apply_features(get_features, labeled_set[500:])
-    return test_set, train_set
+def featureset(categorized_comments, processes=None):
+    comments = [comment for (comment, category) in categorized_comments]
+    return [(features, category) for features, (comment, category) 
+            in zip(get_features_batch(comments, processes), categorized_comments)]
+
+# Number of labeled comments to train on. The rest are used for testing.
+TRAIN_SIZE = 500
+
+def get_labeled_dataset(processes=None):
+    '''Every labeled comment, fetched and featurized once for both classifiers.
+
+        Uncached comments are annotated across processes (default: one per cpu).
+        Returns a FeatureMatrix with both 'is_wavy' and 'category' label columns. 
+    '''
+    labeled = mongo_handler.classified_comments_with_labels()
+    featuresets = get_features_batch([comment for comment, labels in labeled], processes)
+    return feature_matrix.FeatureMatrix.from_featuresets(
+            [comment['name'] for comment, labels in labeled],
+            featuresets,
+            {field: [labels.get(field) for comment, labels in labeled]
+             for field in [constants.POSITIVITY, constants.CATEGORY]})
+
+def test_train_sets(dataset, field):
+    '''Shuffle and split the comments labeled with field (eg. 'is_wavy').
+
+        Returns test and train FeatureMatrix subsets of the dataset.
+    '''
+    rows = dataset.rows_with(field)
+    random.shuffle(rows)
+    return dataset.subset(rows[TRAIN_SIZE:]), dataset.subset(rows[:TRAIN_SIZE])
+
+def get_test_train_sets_positivity(dataset=None):
+    if dataset is None:
+        dataset = get_labeled_dataset()
+    test, train = test_train_sets(dataset, constants.POSITIVITY)
+    return test.labeled_featuresets(constants.POSITIVITY), train.labeled_featuresets(constants.POSITIVITY)
+
+def get_test_train_sets_category(dataset=None):
+    if dataset is None:
+        dataset = get_labeled_dataset()
+    test, train = test_train_sets(dataset, constants.CATEGORY)
+    return test.labeled_featuresets(constants.CATEGORY), train.labeled_featuresets(constants.CATEGORY)
+
+def train_online_classifier(train, field):
+    '''Train a classifier that can take new labels, on a FeatureMatrix.
+
+        Examples are keyed by comment name, so a comment that is relabeled 
+        replaces its old example. See online_nb.py
+    '''
+    rows = train.rows_with(field)
+    return online_nb.OnlineNaiveBayesClassifier.train(
+            train.labeled_featuresets(field), 
+            keys=[train.names[i] for i in rows])
 
 def category_metrics_display():
     metrics = mongo_handler.categories_counts()
@@ -134,22 +192,23 @@ def category_metrics_display():
     s += 'TOTAL: {}'.format(total)
     return s
 
-def generate_confusion_matrix(classifier=None, test=None):
+def generate_confusion_matrix(classifier=None, test=None, dataset=None):
     '''Generate confusion matrix for categories. 
 
+        Pass a dataset from get_labeled_dataset to reuse its features.
+        To evaluate saved model versions, see evaluation.py
         See explanation of confusion matrix: 
         http://www.nltk.org/book/ch06.html (section 3.4)
     '''   
     if not test:
-        test, train = get_test_train_sets_category()
+        test, train = get_test_train_sets_category(dataset)
 
     if not classifier:
         classifier = nltk.NaiveBayesClassifier.train(train)
 
-    original_tags, classified_tags = [], []
-    for features, tag in test:
-        original_tags.append(tag)
-        classified_tags.append(classifier.classify(features))
+    # Classify the whole test set in one call.
+    original_tags = [tag for features, tag in test]
+    classified_tags = classifier.classify_many([features for features, tag in test])
     cm = nltk.ConfusionMatrix(original_tags, classified_tags)
     print(cm.pretty_format(sort_by_count=True, show_percents=True, truncate=9))
 
@@ -204,6 +263,6 @@ def request_input_on_cursor(comment):
 # generate train data by hand
 if __name__ == '__main__':
     
-    command_cursor = mongo_handler.get_noncategorized_comments(limit=50)
-    for comment in command_cursor:
+    comments = mongo_handler.get_noncategorized_comments(limit=50)
+    for comment in comments:
         request_input_on_cursor(comment)
@@ -4,6 +4,7 @@ from pymongo import MongoClient
 
 import nlp
 import constants
+import feature_matrix
 import mongo_handler
 
 long_comment = {
@@ -56,5 +57,50 @@ class FeatureExtractorTest(unittest.TestCase):
         for k in expected_keys:
             self.assertIn(k , features)
 
+    def testBatchCommentExtractor(self):
+        comments = [long_comment, dict(long_comment, body='Kanye is so wavy op 🔥🔥')]
+        batch = nlp.get_features_batch(comments)
+
+        self.assertEqual(len(batch), len(comments))
+        for comment, features in zip(comments, batch):
+            self.assertDictEqual(features, nlp.get_features(comment))
+
+        with self.assertRaises(ValueError):
+            nlp.get_features_batch([long_comment, {}])
+
+class LabeledDatasetTest(unittest.TestCase):
+
+    def testFeatureMatrixRoundTrip(self):
+        comments = [
+            long_comment,
+            dict(long_comment, body='Kanye is wavy, not you op 🔥🔥 u/someone /s'),
+            dict(long_comment, body='a long comment that has more than fifteen words in it, ' * 2,
+                 parent_id=long_comment['link_id'], is_submitter=True),
+        ]
+        featuresets = nlp.get_features_batch(comments)
+        dataset = feature_matrix.FeatureMatrix.from_featuresets(
+                ['a', 'b', 'c'], featuresets, {constants.POSITIVITY: ['wavy', None, 'not_wavy']})
+
+        self.assertEqual(dataset.X.shape, (3, len(feature_matrix.FEATURE_NAMES)))
+        self.assertEqual(dataset.featuresets(), featuresets)
+        self.assertEqual(dataset.labeled_featuresets(constants.POSITIVITY),
+                [(featuresets[0], 'wavy'), (featuresets[2], 'not_wavy')])
+
+    def testTestTrainSets(self):
+        n = 600
+        dataset = feature_matrix.FeatureMatrix.from_featuresets(
+                ['t1_{}'.format(i) for i in range(n + 1)],
+                [{'short': True}] * n + [{'long': True}],
+                {constants.POSITIVITY: ['wavy'] * n + [None], constants.CATEGORY: [None] * n + ['kanye']})
+
+        test, train = nlp.test_train_sets(dataset, constants.POSITIVITY)
+        self.assertEqual(len(train), nlp.TRAIN_SIZE)
+        self.assertEqual(len(test), n - nlp.TRAIN_SIZE)
+        self.assertNotIn('t1_{}'.format(n), train.names + test.names)
+
+        test, train = nlp.get_test_train_sets_category(dataset)
+        self.assertEqual(test, [])
+        self.assertEqual(train, [(feature_matrix.to_featureset(dataset.X[n]), 'kanye')])
+
 if __name__ == '__main__':
     unittest.main()
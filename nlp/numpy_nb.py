@@ -0,0 +1,116 @@
+"""Naive Bayes over the fixed boolean feature schema, backed by numpy arrays.
+
+Gives the same predictions as nltk.NaiveBayesClassifier trained on the same
+featuresets (with the default ELE estimator), but stores the log probabilities
+as (labels x features) arrays. A whole batch is classified with one matrix
+product, and training is a couple of array reductions.
+
+Usage:
+    classifier = numpy_nb.NumpyNaiveBayesClassifier.train(train.X, train.labels['is_wavy'])
+    classifier.classify_matrix(test.X)
+    classifier.classify(nlp.get_features(comment))
+"""
+
+import numpy
+
+import feature_matrix
+
+# Expected likelihood estimation adds 0.5 to each count, like nltk.ELEProbDist
+GAMMA = 0.5
+
+BINNED = numpy.array([fname in feature_matrix.BINNED_FEATURES
+                      for fname in feature_matrix.FEATURE_NAMES])
+
+class NumpyNaiveBayesClassifier:
+
+    def __init__(self, labels, log_prior, log_true, log_false):
+        """
+        # Arguments
+            labels: list of labels, sorted.
+            log_prior: array (labels,), log P(label).
+            log_true: array (labels x features), log P(feature is True | label).
+            log_false: array (labels x features), log P(feature is False | label),
+                or 0 where nltk would ignore the feature when it is not set.
+        """
+        self._labels = list(labels)
+        self._log_prior = log_prior
+        self._weights = (log_true - log_false).T # (features x labels)
+        self._bias = log_prior + log_false.sum(axis=1)
+
+    @classmethod
+    def train(cls, X, y):
+        """Train on a boolean feature matrix and a label for each row."""
+        labels = sorted(set(y))
+        y_index = numpy.searchsorted(labels, y)
+        one_hot = numpy.zeros((len(labels), len(y)))
+        one_hot[y_index, numpy.arange(len(y))] = 1
+
+        label_counts = one_hot.sum(axis=1)
+        true_counts = one_hot @ X
+        false_counts = label_counts[:, None] - true_counts
+        # Binned features have no False value, only an implicit None when unset.
+        false_counts[:, BINNED] = 0
+        return cls.from_counts(labels, label_counts, true_counts, false_counts)
+
+    @classmethod
+    def from_counts(cls, labels, label_counts, true_counts, false_counts):
+        """Build the classifier from label and feature value counts.
+
+        # Arguments
+            labels: list of labels, sorted.
+            label_counts: array (labels,), number of examples for each label.
+            true_counts: array (labels x features), examples where the feature is True.
+            false_counts: array (labels x features), examples where the feature
+                is explicitly False. Always 0 for binned features.
+        """
+        label_counts = numpy.asarray(label_counts, dtype=float)
+        true_counts = numpy.asarray(true_counts, dtype=float)
+        false_counts = numpy.asarray(false_counts, dtype=float)
+        none_counts = label_counts[:, None] - true_counts - false_counts
+
+        # nltk only knows about features it has seen a value for, and only
+        # adds the None value for a feature if some example left it out.
+        seen = (true_counts.sum(axis=0) + false_counts.sum(axis=0)) > 0
+        n_values = ((true_counts.sum(axis=0) > 0).astype(int)
+                    + (false_counts.sum(axis=0) > 0)
+                    + (none_counts.sum(axis=0) > 0))
+        divisor = label_counts[:, None] + GAMMA * n_values
+
+        log_prior = numpy.log((label_counts + GAMMA) / (label_counts.sum() + GAMMA * len(labels)))
+        log_true = numpy.log((true_counts + GAMMA) / divisor)
+        log_false = numpy.log((false_counts + GAMMA) / divisor)
+
+        # Unset binned features are left out of the featureset, so nltk adds
+        # nothing for them. Unseen features are ignored entirely.
+        log_false[:, BINNED] = 0
+        log_true[:, ~seen] = 0
+        log_false[:, ~seen] = 0
+        return cls(labels, log_prior, log_true, log_false)
+
+    def labels(self):
+        return list(self._labels)
+
+    def log_scores(self, X):
+        """Unnormalized log P(label, features) for each row, (rows x labels)."""
+        return numpy.asarray(X, dtype=float) @ self._weights + self._bias
+
+    def prob_matrix(self, X):
+        """P(label | features) for each row, (rows x labels)."""
+        scores = self.log_scores(X)
+        scores -= scores.max(axis=1, keepdims=True)
+        probs = numpy.exp(scores)
+        return probs / probs.sum(axis=1, keepdims=True)
+
+    def classify_matrix(self, X):
+        scores = self.log_scores(X)
+        # On a tie nltk picks the greatest label, and labels are sorted.
+        best = scores.shape[1] - 1 - numpy.argmax(scores[:, ::-1], axis=1)
+        return [self._labels[i] for i in best]
+
+    def classify_many(self, featuresets):
+        if not featuresets:
+            return []
+        return self.classify_matrix(numpy.array([feature_matrix.to_row(f) for f in featuresets]))
+
+    def classify(self, featureset):
+        return self.classify_many([featureset])[0]
@@ -0,0 +1,68 @@
+import random
+import unittest
+
+import nltk
+import numpy
+
+import feature_matrix
+import numpy_nb
+import online_nb
+
+def random_featureset(rng, labels):
+    # Labels shift the odds of some features, so the classifiers have something to learn.
+    label = rng.choice(labels)
+    bias = labels.index(label) / len(labels)
+    features = {rng.choice(feature_matrix.LENGTH_FEATURES): True, 
+                rng.choice(feature_matrix.NE_FEATURES[:2]): True}
+    for fname in feature_matrix.FEATURE_NAMES:
+        if fname not in feature_matrix.BINNED_FEATURES:
+            features[fname] = rng.random() < (0.1 + bias) / 2
+    return features, label
+
+class NumpyNaiveBayesTest(unittest.TestCase):
+
+    def setUp(self):
+        rng = random.Random(1738)
+        labels = ['wavy', 'not_wavy', 'ambiguous']
+        self.train = [random_featureset(rng, labels) for _ in range(300)]
+        self.test = [random_featureset(rng, labels)[0] for _ in range(300)]
+        self.nltk_classifier = nltk.NaiveBayesClassifier.train(self.train)
+
+    def matrix(self, labeled_featuresets):
+        return feature_matrix.FeatureMatrix.from_featuresets(
+                list(range(len(labeled_featuresets))),
+                [featureset for featureset, label in labeled_featuresets],
+                {'label': [label for featureset, label in labeled_featuresets]})
+
+    def testParityWithNltk(self):
+        train = self.matrix(self.train)
+        classifier = numpy_nb.NumpyNaiveBayesClassifier.train(train.X, train.labels['label'])
+
+        self.assertEqual(classifier.classify_many(self.test), self.nltk_classifier.classify_many(self.test))
+
+        X = numpy.array([feature_matrix.to_row(f) for f in self.test])
+        probs = classifier.prob_matrix(X)
+        for i, featureset in enumerate(self.test):
+            expected = self.nltk_classifier.prob_classify(featureset)
+            for j, label in enumerate(classifier.labels()):
+                self.assertAlmostEqual(probs[i, j], expected.prob(label), places=9)
+
+    def testUnseenFeatures(self):
+        # 'long' and 'one ne' never show up in training, so nltk ignores them.
+        train = [(dict(f, **{'short': True}), l) for f, l in self.train]
+        for f, l in train:
+            f.pop('long', None), f.pop('mid-length', None), f.pop('one ne', None)
+        matrix = self.matrix(train)
+        classifier = numpy_nb.NumpyNaiveBayesClassifier.train(matrix.X, matrix.labels['label'])
+        expected = nltk.NaiveBayesClassifier.train(train)
+        self.assertEqual(classifier.classify_many(self.test), expected.classify_many(self.test))
+
+    def testOnlineNumpyParity(self):
+        online = online_nb.OnlineNaiveBayesClassifier.train(self.train[:100])
+        for featureset, label in self.train[100:]:
+            online.add(featureset, label)
+        self.assertIsNotNone(online.numpy_classifier())
+        self.assertEqual(online.classify_many(self.test), self.nltk_classifier.classify_many(self.test))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,196 @@
+"""Naive Bayes classifier that can absorb new labels without a full retrain.
+
+Naive Bayes only needs label and feature value frequencies. This keeps those
+counts, and builds the same nltk.NaiveBayesClassifier that a full retrain on the
+same examples would, whenever it is next asked to classify.
+
+Usage:
+    classifier = online_nb.OnlineNaiveBayesClassifier.train(train_set, keys=names)
+    classifier.update(comment['name'], nlp.get_features(comment), 'wavy')
+    classifier.classify(features)
+"""
+
+import threading
+
+from collections import Counter
+from collections import defaultdict
+
+import nltk
+import numpy
+
+from nltk.probability import ELEProbDist
+from nltk.probability import FreqDist
+
+import feature_matrix
+import numpy_nb
+
+class OnlineNaiveBayesClassifier(nltk.classify.ClassifierI):
+
+    def __init__(self, estimator=ELEProbDist):
+        self._estimator = estimator
+        self._label_counts = Counter()
+        # Counts of the values explicitly given for each (label, feature name).
+        self._value_counts = defaultdict(Counter)
+        # Examples added with a key (eg. the comment name) can later be relabeled.
+        self._examples = {}
+        self._classifier = None
+        self._numpy_classifier = None
+        self._lock = threading.RLock()
+
+    @classmethod
+    def train(cls, labeled_featuresets, keys=None, estimator=ELEProbDist):
+        """Count up a list of (featureset, label) tuples.
+
+        # Arguments
+            labeled_featuresets: list of (featureset, label) tuples.
+            keys: list, optional key for each example, so it can be updated later.
+        """
+        classifier = cls(estimator=estimator)
+        if keys is None:
+            for featureset, label in labeled_featuresets:
+                classifier.add(featureset, label)
+        else:
+            for key, (featureset, label) in zip(keys, labeled_featuresets):
+                classifier.update(key, featureset, label)
+        return classifier
+
+    def add(self, featureset, label):
+        self._count(featureset, label, 1)
+
+    def remove(self, featureset, label):
+        """Undo a previous add of the same featureset and label."""
+        if self._label_counts[label] <= 0:
+            raise ValueError('No examples to remove for label:', label)
+        self._count(featureset, label, -1)
+
+    def update(self, key, featureset, label):
+        """Add an example, replacing the previous example for the same key."""
+        with self._lock:
+            if key in self._examples:
+                self.remove(*self._examples[key])
+            self.add(featureset, label)
+            self._examples[key] = (featureset, label)
+
+    def _count(self, featureset, label, n):
+        with self._lock:
+            self._label_counts[label] += n
+            for fname, fval in featureset.items():
+                self._value_counts[label, fname][fval] += n
+            self._classifier = None
+            self._numpy_classifier = None
+
+    def classifier(self):
+        """The nltk.NaiveBayesClassifier for the current counts."""
+        with self._lock:
+            if self._classifier is None:
+                self._classifier = self._build()
+            return self._classifier
+
+    def _build(self):
+        # Mirrors nltk.NaiveBayesClassifier.train, starting from the counts
+        # instead of the featuresets. Removed examples can leave zero counts
+        # behind, which must not count as seen labels or values.
+        label_freqdist = FreqDist()
+        feature_freqdist = defaultdict(FreqDist)
+        feature_values = defaultdict(set)
+        fnames = set()
+
+        for label, count in self._label_counts.items():
+            if count > 0:
+                label_freqdist[label] = count
+        for (label, fname), values in self._value_counts.items():
+            for fval, count in values.items():
+                if count > 0:
+                    feature_freqdist[label, fname][fval] = count
+                    feature_values[fname].add(fval)
+                    fnames.add(fname)
+
+        if not label_freqdist:
+            raise ValueError('Cannot classify without any training examples.')
+
+        # Features without a value for an instance get the implicit value None.
+        for label in label_freqdist:
+            num_samples = label_freqdist[label]
+            for fname in fnames:
+                count = feature_freqdist[label, fname].N()
+                if num_samples - count > 0:
+                    feature_freqdist[label, fname][None] += num_samples - count
+                    feature_values[fname].add(None)
+
+        label_probdist = self._estimator(label_freqdist)
+        feature_probdist = {}
+        for (label, fname), freqdist in feature_freqdist.items():
+            feature_probdist[label, fname] = self._estimator(
+                    freqdist, bins=len(feature_values[fname]))
+
+        return nltk.NaiveBayesClassifier(label_probdist, feature_probdist)
+
+    def numpy_classifier(self):
+        """The equivalent numpy_nb classifier, or None if the examples do not
+        fit the fixed feature schema (see feature_matrix.py)."""
+        with self._lock:
+            if self._numpy_classifier is None:
+                self._numpy_classifier = self._build_numpy() or False
+            return self._numpy_classifier or None
+
+    def _build_numpy(self):
+        # Only the default estimator has a numpy equivalent.
+        if self._estimator is not ELEProbDist:
+            return None
+
+        labels = sorted(label for label, count in self._label_counts.items() if count > 0)
+        label_index = {label: i for i, label in enumerate(labels)}
+        shape = (len(labels), len(feature_matrix.FEATURE_NAMES))
+        true_counts, false_counts = numpy.zeros(shape), numpy.zeros(shape)
+
+        for (label, fname), values in self._value_counts.items():
+            for fval, count in values.items():
+                if count <= 0:
+                    continue
+                if fname not in feature_matrix.FEATURE_INDEX or fval not in (True, False):
+                    return None
+                if fval is False and fname in feature_matrix.BINNED_FEATURES:
+                    return None
+                counts = true_counts if fval else false_counts
+                counts[label_index[label], feature_matrix.FEATURE_INDEX[fname]] = count
+
+        label_counts = [self._label_counts[label] for label in labels]
+        return numpy_nb.NumpyNaiveBayesClassifier.from_counts(
+                labels, label_counts, true_counts, false_counts)
+
+    def feature_names(self):
+        return sorted({fname for (label, fname), values in self._value_counts.items()
+                       if any(count > 0 for count in values.values())})
+
+    def size(self):
+        return sum(self._label_counts.values())
+
+    def labels(self):
+        return self.classifier().labels()
+
+    def classify(self, featureset):
+        return self.classify_many([featureset])[0]
+
+    def classify_many(self, featuresets):
+        numpy_classifier = self.numpy_classifier()
+        if numpy_classifier and all(fname in feature_matrix.FEATURE_INDEX 
+                                    for featureset in featuresets for fname in featureset):
+            return numpy_classifier.classify_many(featuresets)
+        return self.classifier().classify_many(featuresets)
+
+    def prob_classify(self, featureset):
+        return self.classifier().prob_classify(featureset)
+
+    def show_most_informative_features(self, n=10):
+        return self.classifier().show_most_informative_features(n)
+
+    # Locks cannot be pickled.
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.__dict__.setdefault('_numpy_classifier', None)
+        self._lock = threading.RLock()
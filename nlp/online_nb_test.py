@@ -0,0 +1,80 @@
+import random
+import unittest
+import pickle
+
+import nltk
+
+import online_nb
+
+def random_featureset(rng):
+    features = {
+        'top level comment': rng.random() < 0.3,
+        'is OP': rng.random() < 0.1,
+        'contains \'you\'': rng.random() < 0.5,
+    }
+    # Binned features are only present when True.
+    features[rng.choice(['short', 'mid-length', 'long'])] = True
+    if rng.random() < 0.2:
+        features['rare'] = True
+    return features
+
+def random_labeled_featuresets(rng, n, labels=('wavy', 'not_wavy', 'ambiguous')):
+    return [(random_featureset(rng), rng.choice(labels)) for _ in range(n)]
+
+class OnlineNaiveBayesTest(unittest.TestCase):
+
+    def setUp(self):
+        self.rng = random.Random(1738)
+        self.train = random_labeled_featuresets(self.rng, 200)
+        self.test = [featureset for featureset, _ in random_labeled_featuresets(self.rng, 100)]
+
+    def assertSamePredictions(self, online, expected):
+        for featureset in self.test + [{'unseen feature': True}]:
+            self.assertEqual(online.classify(featureset), expected.classify(featureset))
+            online_probs, expected_probs = online.prob_classify(featureset), expected.prob_classify(featureset)
+            for label in expected.labels():
+                self.assertAlmostEqual(online_probs.prob(label), expected_probs.prob(label), places=12)
+
+    def testFullTrain(self):
+        online = online_nb.OnlineNaiveBayesClassifier.train(self.train)
+        self.assertSamePredictions(online, nltk.NaiveBayesClassifier.train(self.train))
+
+    def testIncremental(self):
+        online = online_nb.OnlineNaiveBayesClassifier.train(self.train[:50])
+        online.classify(self.test[0])
+        for featureset, label in self.train[50:]:
+            online.add(featureset, label)
+        self.assertSamePredictions(online, nltk.NaiveBayesClassifier.train(self.train))
+
+    def testUpdateReplacesExample(self):
+        keys = list(range(len(self.train)))
+        online = online_nb.OnlineNaiveBayesClassifier.train(self.train, keys=keys)
+
+        relabeled = list(self.train)
+        for i in range(0, len(relabeled), 3):
+            featureset, label = relabeled[i]
+            relabeled[i] = (featureset, 'wavy' if label != 'wavy' else 'not_wavy')
+            online.update(i, featureset, relabeled[i][1])
+        # A label that disappears entirely.
+        for i, (featureset, label) in enumerate(relabeled):
+            if label == 'ambiguous':
+                relabeled[i] = (featureset, 'wavy')
+                online.update(i, featureset, 'wavy')
+
+        self.assertEqual(online.size(), len(self.train))
+        self.assertNotIn('ambiguous', online.labels())
+        self.assertSamePredictions(online, nltk.NaiveBayesClassifier.train(relabeled))
+
+    def testRemoveUnseenLabel(self):
+        online = online_nb.OnlineNaiveBayesClassifier.train(self.train)
+        with self.assertRaises(ValueError):
+            online.remove(self.test[0], 'copypasta')
+
+    def testPickle(self):
+        online = online_nb.OnlineNaiveBayesClassifier.train(self.train)
+        online = pickle.loads(pickle.dumps(online))
+        online.add(*self.train[0])
+        self.assertSamePredictions(online, nltk.NaiveBayesClassifier.train(self.train + self.train[:1]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,13 +1,21 @@
 from flask import Flask
+from flask import Response
 from flask import request
 from flask_apscheduler import APScheduler
 
 import nlp
 import nltk
+import train
 import constants
+import indexes
+import metrics
+import micro_batcher
+import model_store
 import mongo_handler
+import vote_buffer
 
 import ast
+import atexit
 import json
 
 '''
@@ -21,11 +29,26 @@ scheduler = APScheduler()
 scheduler.init_app(app)
 scheduler.start()
 
-positivity_test, positivity_train = nlp.get_test_train_sets_positivity()
-category_test, category_train = nlp.get_test_train_sets_category()
-
-positivity_classifier = nltk.NaiveBayesClassifier.train(positivity_train)
-category_classifier = nltk.NaiveBayesClassifier.train(category_train)
+indexes.ensure_indexes()
+mongo_handler.backfill_user_majorities()
+
+if constants.CLASSIFIER_MODE == 'mlp':
+    # The n-gram models need tensorflow, so only import it when they are used.
+    # They are trained & saved by mlp.train_ngram_model.
+    import mlp
+    positivity_bundle, _ = mlp.load_bundle(constants.POSITIVITY)
+    category_bundle, _ = mlp.load_bundle(constants.CATEGORY)
+    print("Loaded n-gram models")
+else:
+    # Classifiers are trained by a separate job (train.py). Only train here if none have been saved yet.
+    if not model_store.latest_version():
+        print("No saved classifiers, training them now.")
+        train.train_and_save()
+
+    classifiers, manifest = model_store.load()
+    positivity_classifier = classifiers[constants.POSITIVITY]
+    category_classifier = classifiers[constants.CATEGORY]
+    print("Loaded classifiers version", manifest['version'])
 
 n_retrained = 0
 
@@ -34,65 +57,172 @@ def hello_world():
     return 'Hello world!'
 
 @app.route('/classify', methods=['GET', 'POST'])
+@metrics.timed('route_classify')
 def classify():
     if request.method == 'POST':
         comment = request.json
         print("Getting comment classification:", comment['name'])
 
-        comment_features = nlp.get_features(comment)
-        cat = category_classifier.classify(comment_features)
-        pos = positivity_classifier.classify(comment_features)
+        if classify_queue is not None:
+            cat, pos = classify_queue.submit(comment).result()
+        elif constants.CLASSIFIER_MODE == 'mlp':
+            (cat,), (pos,) = _mlp_classify_many([comment])
+        else:
+            comment_features = nlp.get_features(comment)
+            with metrics.timer('classify'):
+                cat = category_classifier.classify(comment_features)
+                pos = positivity_classifier.classify(comment_features)
+        metrics.count('classified_comments')
 
         print('Comment', comment['name'], 'is referring to', cat, 'and', pos)
         
-        return json.dumps({
-                'category': constants.CATEGORIES_TEXT[cat], 
-                'is_wavy': constants.POSITIVITY_TEXT[pos]})
+        return json.dumps(_classification_text(cat, pos))
 
     return "Invalid request."
 
+# Expects a JSON list of comments, and returns their classifications in the same order.
+@app.route('/classify_batch', methods=['POST'])
+@metrics.timed('route_classify_batch')
+def classify_batch():
+    comments = request.json
+    if not isinstance(comments, list):
+        return "Invalid request - expecting a list of comments."
+    print("Getting classification for", len(comments), "comments")
+
+    cats, poss = _classify_many(comments)
+    metrics.count('classified_comments', len(comments))
+
+    return json.dumps([_classification_text(cat, pos) for cat, pos in zip(cats, poss)])
+
+def _classify_many(comments):
+    if constants.CLASSIFIER_MODE == 'mlp':
+        return _mlp_classify_many(comments)
+    featuresets = nlp.get_features_batch(comments)
+    with metrics.timer('classify_many'):
+        cats = category_classifier.classify_many(featuresets)
+        poss = positivity_classifier.classify_many(featuresets)
+    return cats, poss
+
+# The comments are vectorized together, and each model predicts them all at once.
+def _mlp_classify_many(comments):
+    texts = mlp.extract_relevant_metadata_as_strings(comments, processes=1)
+    with metrics.timer('mlp_classify_many'):
+        cats = category_bundle.classify_many(texts)
+        poss = positivity_bundle.classify_many(texts)
+    return cats, poss
+
+# Concurrent /classify requests are classified together when batching, see micro_batcher.py
+classify_queue = micro_batcher.MicroBatcher(
+        lambda comments: list(zip(*_classify_many(comments)))) if constants.MICRO_BATCH_CLASSIFY else None
+
+def _classification_text(cat, pos):
+    return {
+        'category': constants.CATEGORIES_TEXT[cat],
+        'is_wavy': constants.POSITIVITY_TEXT[pos]}
+
 # According to SO, python's json module should be safe enough for untrusted input. 
 # We should not, however, allow user-crafted JSON as a full query.
 # https://stackoverflow.com/questions/7278238/sanitizing-inputs-to-mongodb
 @app.route('/user_classification', methods=['POST'])
+@metrics.timed('route_user_classification')
 def user_classification():
     if request.method == 'POST':
         comment_name, ipaddr = request.json['comment_name'], request.json['ipaddr']
         classification = request.json['classification']
 
         print("Applying user classification", classification, "to comment", comment_name)
-        mongo_handler.update_user_classification(comment_name, classification)
+        if votes is not None:
+            votes.add(comment_name, classification)
+        else:
+            changes = mongo_handler.update_user_classification(comment_name, classification)
+            absorb_label_changes(comment_name, changes)
         return("Applying user classification to comment " + comment_name)
 
 
     return "Invalid request - expecting POST."
 
+# Updates the classifiers with a comment's new training labels, without a full retrain.
+@metrics.timed('absorb_label_changes')
+def absorb_label_changes(comment_name, changes):
+    # The n-gram models cannot learn one label at a time, they pick up new labels when retrained.
+    if not changes or constants.CLASSIFIER_MODE == 'mlp':
+        return
+    try:
+        features = nlp.get_features(mongo_handler.get_comment(comment_name, pretty=False))
+    except ValueError as e:
+        print("Could not update classifiers:", e)
+        return
+    for field, old_label, new_label in changes:
+        classifier = positivity_classifier if field == constants.POSITIVITY else category_classifier
+        classifier.update(comment_name, features, new_label)
+        metrics.count('absorbed_labels')
+        print("Classifier now trained on", comment_name, "as", new_label, "instead of", old_label)
+
+def absorb_all_label_changes(changes_by_name):
+    for comment_name, changes in changes_by_name.items():
+        absorb_label_changes(comment_name, changes)
+
+# Votes are written in bulk when buffered, see vote_buffer.py
+votes = vote_buffer.VoteBuffer(on_flush=absorb_all_label_changes) if constants.BUFFER_USER_VOTES else None
+
+if votes is not None:
+    @scheduler.task('interval', id='flush_votes',
+            seconds=constants.VOTE_BUFFER_MAX_DELAY, misfire_grace_time=30)
+    def flush_votes():
+        votes.flush_if_due()
+
+    # Write the votes still buffered when the server stops.
+    atexit.register(votes.flush)
+
 @app.route('/statistics')
 def generate_statistics():
     print("Generating statistics for all comments")
 
-    positivity_counts = mongo_handler.positivity_counts()
-    category_counts = mongo_handler.categories_counts()
+    # Counts are kept up to date as comments are labeled, see mongo_handler.get_statistics
+    statistics = mongo_handler.get_statistics()
     return json.dumps({
-        "positivity_statistics": positivity_counts,
-        "category_statistics": category_counts
+        "positivity_statistics": statistics[constants.POSITIVITY],
+        "category_statistics": statistics[constants.CATEGORY]
     })
 
+# Stage timings & counters, in the Prometheus text format. See metrics.py
+@app.route('/metrics')
+def serve_metrics():
+    return Response(metrics.prometheus_text(), mimetype='text/plain; version=0.0.4')
+
 @app.route('/n_retrained')
 def count_ntrained():
     return(f'Classifier retrained {n_retrained} times\n')
    
+# Loads the newest classifiers saved by train.py. New labels absorbed since the
+# last version are already in mongo, and so are part of the newer version.
 @scheduler.task('interval', id='reset_classifiers', 
-        seconds=86400, misfire_grace_time=300)
+        seconds=3600, misfire_grace_time=300)
+@metrics.timed('reload_classifiers')
 def reset_classifier():
     global positivity_classifier
     global category_classifier 
+    global manifest
 
-    positivity_test, positivity_train = nlp.get_test_train_sets_positivity()
-    category_test, category_train = nlp.get_test_train_sets_category()
+    if constants.CLASSIFIER_MODE == 'mlp':
+        return
+    version = model_store.latest_version()
+    if version == manifest['version']:
+        return
 
-    positivity_classifier = nltk.NaiveBayesClassifier.train(positivity_train)
-    category_classifier = nltk.NaiveBayesClassifier.train(category_train)
+    classifiers, manifest = model_store.load(version)
+    positivity_classifier = classifiers[constants.POSITIVITY]
+    category_classifier = classifiers[constants.CATEGORY]
+    print("Loaded classifiers version", version)
 
     global n_retrained
     n_retrained += 1
+    metrics.count('reloaded_classifiers')
+
+# Rebuilds the label counts behind /statistics, in case they drifted.
+@scheduler.task('interval', id='reconcile_statistics',
+        seconds=21600, misfire_grace_time=300)
+def reconcile_statistics():
+    drift = mongo_handler.reconcile_statistics()
+    if drift:
+        print("Label statistics had drifted, rebuilt them:", drift)
@@ -0,0 +1,410 @@
+"""Storage backends for comments, curated labels, user votes and label statistics.
+
+mongo_handler does all of its reads and writes through a backend, picked by
+constants.STORAGE_BACKEND:
+    'mongo': MongoStorage, the live database.
+    'memory': MemoryStorage, plain dicts in this process. It starts empty, or
+        from a mongodump tarball (constants.MEMORY_STORAGE_DUMP). Useful for
+        tests, and for benchmarking training without database latency.
+
+Documents look the same in both backends. User vote totals keep label counts
+under their field, eg. {'name': ..., 'is_wavy': {'wavy': 2, ...}, 'n_votes': 2},
+and increments name the count with a dotted path, eg. {'is_wavy.wavy': 1}.
+
+Usage:
+    mongo_handler.use_backend(storage.MemoryStorage())
+    mongo_handler.backend.insert_comments(comments)
+"""
+
+import abc
+import copy
+import itertools
+import tarfile
+import threading
+
+import bson
+import pymongo
+
+import constants
+import metrics
+
+class Storage(abc.ABC):
+    """The operations mongo_handler needs. Documents returned are copies."""
+
+    ### Comments
+
+    @abc.abstractmethod
+    def insert_comments(self, comments):
+        """Inserts the comment documents."""
+
+    @abc.abstractmethod
+    def find_comment(self, name):
+        """The comment with the name, or None."""
+
+    @abc.abstractmethod
+    def find_comments(self, names):
+        """Every comment with one of the names, in no particular order."""
+
+    @abc.abstractmethod
+    def recent_comments(self, limit):
+        """The <limit> newest comments, newest first."""
+
+    @abc.abstractmethod
+    def newest_comments(self, batch_size):
+        """Iterates over every comment, newest first, fetching batch_size at a time."""
+
+    ### Curated labels
+
+    @abc.abstractmethod
+    def find_curated(self, names=None, fields=None, query=None):
+        """Curated label documents, for the names (default: all) that have
+        at least one of the fields (default: any), and the labels in query
+        (a dict of field: label, default: any)."""
+
+    @abc.abstractmethod
+    def count_curated(self, query=None):
+        """The number of curated label documents with the labels in query (see find_curated)."""
+
+    @abc.abstractmethod
+    def set_curated(self, name, labels):
+        """Sets the labels, and returns the document as it was before (or None)."""
+
+    @abc.abstractmethod
+    def set_curated_many(self, labels_by_name):
+        """set_curated for many comments. Maps names to labels."""
+
+    ### User votes
+
+    @abc.abstractmethod
+    def add_votes(self, name, increments, zeroes):
+        """Adds the increments to the comment's vote totals, creating them with
+        zeroes if needed. Returns the totals after the update."""
+
+    @abc.abstractmethod
+    def add_votes_many(self, updates_by_name):
+        """add_votes for many comments. Maps names to (increments, zeroes)."""
+
+    @abc.abstractmethod
+    def set_vote_fields(self, name, n_votes, fields):
+        """Sets the fields on the comment's vote totals, but only if its vote
+        count is still n_votes (None: not set). Returns whether they were set."""
+
+    @abc.abstractmethod
+    def find_votes(self, names=None, without_n_votes=False):
+        """Vote totals for the names (default: all)."""
+
+    @abc.abstractmethod
+    def find_majorities(self, names=None):
+        """The name and majority label fields of vote totals, for the names (default: all)."""
+
+    ### Label statistics
+
+    @abc.abstractmethod
+    def get_statistics(self):
+        """The statistics document, or None."""
+
+    @abc.abstractmethod
+    def inc_statistics(self, increments):
+        """Adds dotted path increments to the statistics, if they exist."""
+
+    @abc.abstractmethod
+    def replace_statistics(self, statistics):
+        """Replaces the statistics document."""
+
+    def ensure_indexes(self, indexes):
+        """Creates the indexes (see indexes.py) the backend needs. Returns their names."""
+        return {}
+
+_MAJORITY_FIELDS = [constants.MAJORITY_POSITIVITY, constants.MAJORITY_CATEGORY]
+
+# The single statistics document.
+STATISTICS_ID = 'label-counts'
+
+class MongoStorage(Storage):
+    """Reads are returned as lists, so each timer (see metrics.py) covers the round trip."""
+
+    def __init__(self, client=None):
+        self.client = client or pymongo.MongoClient()
+
+    # The database is looked up on each call, so tests can switch constants.DB_KANYE.
+    def _collection(self, name):
+        return self.client[constants.DB_KANYE][name]
+
+    @metrics.timed('mongo_insert_comments')
+    def insert_comments(self, comments):
+        self._collection(constants.COMMENTS).insert_many(comments)
+
+    @metrics.timed('mongo_find_comment')
+    def find_comment(self, name):
+        return self._collection(constants.COMMENTS).find_one({'name': name})
+
+    @metrics.timed('mongo_find_comments')
+    def find_comments(self, names):
+        return list(self._collection(constants.COMMENTS).find({'name': {'$in': list(names)}}))
+
+    @metrics.timed('mongo_recent_comments')
+    def recent_comments(self, limit):
+        return list(self.newest_comments_cursor().limit(limit))
+
+    # Walks the created_utc index (see indexes.py), so no sort is needed.
+    def newest_comments_cursor(self):
+        return self._collection(constants.COMMENTS).find().sort('created_utc', pymongo.DESCENDING)
+
+    def newest_comments(self, batch_size):
+        with self.newest_comments_cursor().batch_size(batch_size) as cursor:
+            yield from cursor
+
+    @metrics.timed('mongo_find_curated')
+    def find_curated(self, names=None, fields=None, query=None):
+        query = dict(query or {})
+        if names is not None:
+            query['name'] = {'$in': list(names)}
+        if fields:
+            query['$or'] = [{field: {'$exists': True}} for field in fields]
+        return list(self._collection(constants.TRAIN_CATEGORIES).find(query))
+
+    @metrics.timed('mongo_count_curated')
+    def count_curated(self, query=None):
+        return self._collection(constants.TRAIN_CATEGORIES).count_documents(query or {})
+
+    @metrics.timed('mongo_set_curated')
+    def set_curated(self, name, labels):
+        return self._collection(constants.TRAIN_CATEGORIES).find_one_and_update(
+                {'name': name}, {'$set': labels}, upsert=True)
+
+    @metrics.timed('mongo_set_curated_many')
+    def set_curated_many(self, labels_by_name):
+        if labels_by_name:
+            self._collection(constants.TRAIN_CATEGORIES).bulk_write([
+                pymongo.UpdateOne({'name': name}, {'$set': labels}, upsert=True)
+                for name, labels in labels_by_name.items()
+            ], ordered=False)
+
+    @metrics.timed('mongo_add_votes')
+    def add_votes(self, name, increments, zeroes):
+        return self._collection(constants.USER_CLASSIFIED).find_one_and_update(
+                {'name': name},
+                {'$inc': increments, '$setOnInsert': zeroes},
+                upsert=True,
+                return_document=pymongo.ReturnDocument.AFTER)
+
+    @metrics.timed('mongo_add_votes_many')
+    def add_votes_many(self, updates_by_name):
+        if not updates_by_name:
+            return []
+        self._collection(constants.USER_CLASSIFIED).bulk_write([
+            pymongo.UpdateOne({'name': name}, {'$inc': increments, '$setOnInsert': zeroes}, upsert=True)
+            for name, (increments, zeroes) in updates_by_name.items()
+        ], ordered=False)
+        return self.find_votes(updates_by_name)
+
+    @metrics.timed('mongo_set_vote_fields')
+    def set_vote_fields(self, name, n_votes, fields):
+        n_votes_query = {'$exists': False} if n_votes is None else n_votes
+        return bool(self._collection(constants.USER_CLASSIFIED).update_one(
+                {'name': name, constants.N_VOTES: n_votes_query},
+                {'$set': fields}).modified_count)
+
+    @metrics.timed('mongo_find_votes')
+    def find_votes(self, names=None, without_n_votes=False):
+        query = {}
+        if names is not None:
+            query['name'] = {'$in': list(names)}
+        if without_n_votes:
+            query[constants.N_VOTES] = {'$exists': False}
+        return list(self._collection(constants.USER_CLASSIFIED).find(query))
+
+    @metrics.timed('mongo_find_majorities')
+    def find_majorities(self, names=None):
+        query = {} if names is None else {'name': {'$in': list(names)}}
+        projection = dict({'_id': 0, 'name': 1}, **{field: 1 for field in _MAJORITY_FIELDS})
+        return list(self._collection(constants.USER_CLASSIFIED).find(query, projection))
+
+    @metrics.timed('mongo_get_statistics')
+    def get_statistics(self):
+        return self._collection(constants.STATISTICS).find_one({'_id': STATISTICS_ID})
+
+    @metrics.timed('mongo_inc_statistics')
+    def inc_statistics(self, increments):
+        # No upsert: if the counts have not been built yet, get_statistics will build them.
+        self._collection(constants.STATISTICS).update_one(
+                {'_id': STATISTICS_ID}, {'$inc': increments})
+
+    @metrics.timed('mongo_replace_statistics')
+    def replace_statistics(self, statistics):
+        self._collection(constants.STATISTICS).replace_one(
+                {'_id': STATISTICS_ID},
+                dict(statistics, _id=STATISTICS_ID), upsert=True)
+
+    def ensure_indexes(self, indexes):
+        return {collection: [self._collection(collection).create_index(keys) for keys in keys_list]
+                for collection, keys_list in indexes.items()}
+
+def _inc(doc, path, n):
+    field, _, label = path.partition('.')
+    if label:
+        counts = doc.setdefault(field, {})
+        counts[label] = counts.get(label, 0) + n
+    else:
+        doc[field] = doc.get(field, 0) + n
+
+def _matches(doc, query):
+    return all(field in doc and doc[field] == value for field, value in (query or {}).items())
+
+class MemoryStorage(Storage):
+
+    def __init__(self):
+        # Comments in insertion order. A name can be duplicated, like in mongo.
+        self._comments = []
+        self._comments_by_name = {}
+        self._curated = {}
+        self._votes = {}
+        self._statistics = None
+        self._newest = None
+        self._ids = itertools.count()
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_dump(cls, path):
+        """A backend holding the collections of a mongodump tarball (eg. wavy-data.tar.gz)."""
+        backend = cls()
+        collections = {}
+        with tarfile.open(path) as dump:
+            for member in dump.getmembers():
+                if member.name.endswith('.bson'):
+                    collection = member.name.rsplit('/', 1)[-1][:-len('.bson')]
+                    collections[collection] = bson.decode_all(dump.extractfile(member).read())
+
+        backend.insert_comments(collections.get(constants.COMMENTS, []))
+        for doc in collections.get(constants.TRAIN_CATEGORIES, []):
+            backend._curated[doc['name']] = doc
+        for doc in collections.get(constants.USER_CLASSIFIED, []):
+            backend._votes[doc['name']] = doc
+        return backend
+
+    def _new_doc(self, doc):
+        doc = copy.deepcopy(doc)
+        doc.setdefault('_id', next(self._ids))
+        return doc
+
+    def insert_comments(self, comments):
+        with self._lock:
+            for comment in comments:
+                comment = self._new_doc(comment)
+                self._comments.append(comment)
+                self._comments_by_name.setdefault(comment['name'], comment)
+            self._newest = None
+
+    def find_comment(self, name):
+        with self._lock:
+            return copy.deepcopy(self._comments_by_name.get(name))
+
+    def find_comments(self, names):
+        with self._lock:
+            return [copy.deepcopy(self._comments_by_name[name])
+                    for name in set(names) if name in self._comments_by_name]
+
+    def _newest_first(self):
+        # Sorted once, until more comments are inserted.
+        if self._newest is None:
+            self._newest = sorted(self._comments, key=lambda c: c['created_utc'], reverse=True)
+        return self._newest
+
+    def recent_comments(self, limit):
+        with self._lock:
+            return copy.deepcopy(self._newest_first()[:limit])
+
+    def newest_comments(self, batch_size):
+        with self._lock:
+            newest = self._newest_first()
+        for i in range(0, len(newest), batch_size):
+            yield from copy.deepcopy(newest[i:i + batch_size])
+
+    def find_curated(self, names=None, fields=None, query=None):
+        with self._lock:
+            docs = self._curated.values() if names is None else [
+                    self._curated[name] for name in set(names) if name in self._curated]
+            return [copy.deepcopy(doc) for doc in docs
+                    if (not fields or any(field in doc for field in fields)) and _matches(doc, query)]
+
+    def count_curated(self, query=None):
+        with self._lock:
+            return sum(1 for doc in self._curated.values() if _matches(doc, query))
+
+    def set_curated(self, name, labels):
+        with self._lock:
+            before = self._curated.get(name)
+            after = self._new_doc(before or {'name': name})
+            after.update(labels)
+            self._curated[name] = after
+            return before
+
+    def set_curated_many(self, labels_by_name):
+        with self._lock:
+            for name, labels in labels_by_name.items():
+                self.set_curated(name, labels)
+
+    def add_votes(self, name, increments, zeroes):
+        with self._lock:
+            totals = self._votes.get(name)
+            if totals is None:
+                totals = self._new_doc({'name': name})
+                for path in zeroes:
+                    _inc(totals, path, 0)
+                self._votes[name] = totals
+            for path, n in increments.items():
+                _inc(totals, path, n)
+            return copy.deepcopy(totals)
+
+    def add_votes_many(self, updates_by_name):
+        with self._lock:
+            return [self.add_votes(name, increments, zeroes)
+                    for name, (increments, zeroes) in updates_by_name.items()]
+
+    def set_vote_fields(self, name, n_votes, fields):
+        with self._lock:
+            totals = self._votes.get(name)
+            if totals is None or totals.get(constants.N_VOTES) != n_votes:
+                return False
+            # Like mongo's modified_count, only count an actual change.
+            if all(totals.get(field) == value for field, value in fields.items()):
+                return False
+            totals.update(copy.deepcopy(fields))
+            return True
+
+    def find_votes(self, names=None, without_n_votes=False):
+        with self._lock:
+            docs = self._votes.values() if names is None else [
+                    self._votes[name] for name in set(names) if name in self._votes]
+            return [copy.deepcopy(doc) for doc in docs
+                    if not without_n_votes or constants.N_VOTES not in doc]
+
+    def find_majorities(self, names=None):
+        return [dict({'name': totals['name']},
+                     **{field: totals[field] for field in _MAJORITY_FIELDS if field in totals})
+                for totals in self.find_votes(names)]
+
+    def get_statistics(self):
+        with self._lock:
+            return copy.deepcopy(self._statistics)
+
+    def inc_statistics(self, increments):
+        with self._lock:
+            if self._statistics is not None:
+                for path, n in increments.items():
+                    _inc(self._statistics, path, n)
+
+    def replace_statistics(self, statistics):
+        with self._lock:
+            self._statistics = dict(copy.deepcopy(statistics), _id=STATISTICS_ID)
+
+def create(name=None):
+    """The backend for a constants.STORAGE_BACKEND name."""
+    name = name or constants.STORAGE_BACKEND
+    if name == 'mongo':
+        return MongoStorage()
+    if name == 'memory':
+        if constants.MEMORY_STORAGE_DUMP:
+            return MemoryStorage.from_dump(constants.MEMORY_STORAGE_DUMP)
+        return MemoryStorage()
+    raise ValueError('Unknown storage backend:', name)
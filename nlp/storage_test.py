@@ -0,0 +1,146 @@
+import unittest
+
+from pymongo import MongoClient
+
+import constants
+import mongo_handler
+import storage
+
+comments = [
+    {'name': 't1_old', 'created_utc': 10, 'body': 'old', 'author': 'a'},
+    {'name': 't1_new', 'created_utc': 30, 'body': 'new', 'author': 'b'},
+    {'name': 't1_mid', 'created_utc': 20, 'body': 'mid', 'author': 'c'},
+]
+
+# Both backends must behave the same, see MemoryStorageTest & MongoStorageTest.
+class StorageContract:
+
+    def setUp(self):
+        self.backend = self.create_backend()
+        self.backend.insert_comments(comments)
+
+    def testComments(self):
+        self.assertEqual(self.backend.find_comment('t1_mid')['body'], 'mid')
+        self.assertIsNone(self.backend.find_comment('t1_dne'))
+        self.assertEqual(sorted(c['name'] for c in self.backend.find_comments(['t1_old', 't1_new', 't1_dne'])),
+                         ['t1_new', 't1_old'])
+        self.assertEqual([c['name'] for c in self.backend.recent_comments(2)], ['t1_new', 't1_mid'])
+        self.assertEqual([c['name'] for c in self.backend.newest_comments(batch_size=2)],
+                         ['t1_new', 't1_mid', 't1_old'])
+
+    def testCurated(self):
+        self.assertIsNone(self.backend.set_curated('t1_old', {constants.CATEGORY: 'op'}))
+        before = self.backend.set_curated('t1_old', {constants.POSITIVITY: 'wavy'})
+        self.assertEqual(before[constants.CATEGORY], 'op')
+        self.backend.set_curated_many({'t1_new': {constants.POSITIVITY: 'not_wavy'}})
+
+        curated = {c['name']: c for c in self.backend.find_curated()}
+        self.assertEqual(curated['t1_old'][constants.CATEGORY], 'op')
+        self.assertEqual(curated['t1_old'][constants.POSITIVITY], 'wavy')
+        self.assertEqual([c['name'] for c in self.backend.find_curated(fields=[constants.CATEGORY])], ['t1_old'])
+        self.assertEqual([c['name'] for c in self.backend.find_curated(['t1_new', 't1_mid'])], ['t1_new'])
+        self.assertEqual([c['name'] for c in self.backend.find_curated(query={constants.CATEGORY: 'op'})], ['t1_old'])
+        self.assertEqual(self.backend.find_curated(query={constants.CATEGORY: 'link'}), [])
+        self.assertEqual(self.backend.count_curated({constants.POSITIVITY: 'wavy'}), 1)
+        self.assertEqual(self.backend.count_curated({constants.CATEGORY: 'link'}), 0)
+        self.assertEqual(self.backend.count_curated(), 2)
+
+    def testVotes(self):
+        zeroes = {'is_wavy.not_wavy': 0}
+        totals = self.backend.add_votes('t1_old', {constants.N_VOTES: 1, 'is_wavy.wavy': 1}, zeroes)
+        self.assertEqual(totals[constants.POSITIVITY], {'wavy': 1, 'not_wavy': 0})
+
+        totals, = self.backend.add_votes_many({'t1_old': ({constants.N_VOTES: 1, 'is_wavy.not_wavy': 1}, {})})
+        self.assertEqual(totals[constants.POSITIVITY], {'wavy': 1, 'not_wavy': 1})
+        self.assertEqual(totals[constants.N_VOTES], 2)
+
+        self.assertFalse(self.backend.set_vote_fields('t1_old', 1, {constants.MAJORITY_POSITIVITY: 'wavy'}))
+        self.assertTrue(self.backend.set_vote_fields('t1_old', 2, {constants.MAJORITY_POSITIVITY: 'wavy'}))
+        self.assertEqual(list(self.backend.find_majorities(['t1_old'])),
+                         [{'name': 't1_old', constants.MAJORITY_POSITIVITY: 'wavy'}])
+        self.assertEqual(list(self.backend.find_votes(without_n_votes=True)), [])
+
+    def testStatistics(self):
+        self.backend.inc_statistics({'category.op': 1})
+        self.assertIsNone(self.backend.get_statistics())
+
+        self.backend.replace_statistics({constants.CATEGORY: {'op': 1}})
+        self.backend.inc_statistics({'category.op': 1, 'category.kanye': 1})
+        statistics = self.backend.get_statistics()
+        self.assertEqual(statistics[constants.CATEGORY], {'op': 2, 'kanye': 1})
+
+class MemoryStorageTest(StorageContract, unittest.TestCase):
+
+    def create_backend(self):
+        return storage.MemoryStorage()
+
+    def testCopies(self):
+        comment = self.backend.find_comment('t1_old')
+        comment['body'] = 'changed'
+        self.assertEqual(self.backend.find_comment('t1_old')['body'], 'old')
+
+class MongoStorageTest(StorageContract, unittest.TestCase):
+
+    def setUp(self):
+        # MongoStorage uses constants.DB_KANYE, so keep the test documents out of the live database.
+        self.db = constants.DB_KANYE
+        constants.DB_KANYE = constants.DB_TEST
+        super().setUp()
+
+    def create_backend(self):
+        return storage.MongoStorage(MongoClient())
+
+    def tearDown(self):
+        for collection in [constants.COMMENTS, constants.TRAIN_CATEGORIES,
+                           constants.USER_CLASSIFIED, constants.STATISTICS]:
+            MongoClient().test[collection].delete_many({})
+        constants.DB_KANYE = self.db
+
+class IncompleteStorageTest(unittest.TestCase):
+
+    def testFailsWhenCreated(self):
+        class Incomplete(storage.Storage):
+            def insert_comments(self, comments):
+                pass
+
+        with self.assertRaises(TypeError):
+            Incomplete()
+
+class MemoryHandlerTest(unittest.TestCase):
+    """mongo_handler's label logic, without a database."""
+
+    def setUp(self):
+        self.backend = mongo_handler.backend
+        mongo_handler.use_backend(storage.MemoryStorage())
+        mongo_handler.backend.insert_comments(comments)
+
+    def tearDown(self):
+        mongo_handler.use_backend(self.backend)
+
+    def testLabels(self):
+        mongo_handler.update_comment_category('t1_old', category='op', is_wavy='wavy')
+        for _ in range(2):
+            mongo_handler.update_user_classification('t1_new', {constants.CATEGORY: 'kanye'})
+        changes = mongo_handler.update_user_classification('t1_old', {constants.CATEGORY: 'link'})
+        # The curated label wins over the users' majority.
+        self.assertEqual(changes, [])
+
+        labeled = {comment['name']: labels for comment, labels in mongo_handler.classified_comments_with_labels()}
+        self.assertEqual(labeled, {
+            't1_old': {constants.CATEGORY: 'op', constants.POSITIVITY: 'wavy'},
+            't1_new': {constants.CATEGORY: 'kanye'},
+        })
+        self.assertEqual([c['name'] for c in mongo_handler.get_noncategorized_comments()], ['t1_new', 't1_mid'])
+        self.assertEqual(mongo_handler.get_statistics()[constants.CATEGORY], {'op': 1, 'kanye': 1})
+        self.assertEqual(mongo_handler.reconcile_statistics(), {})
+
+    def testVoteWithoutMajorityForMissingComment(self):
+        mongo_handler.update_comment_category('t1_old', category='op')
+        # Votes with no majority yet, on a comment that was never stored.
+        mongo_handler.backend.add_votes('t1_dne', {constants.N_VOTES: 1}, {})
+        labeled = mongo_handler.classified_comments_with_labels()
+        self.assertEqual([(comment['name'], labels) for comment, labels in labeled],
+                         [('t1_old', {constants.CATEGORY: 'op'})])
+
+if __name__ == '__main__':
+    unittest.main()
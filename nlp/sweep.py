@@ -0,0 +1,181 @@
+"""Hyperparameter sweep for the n-gram MLP, vectorizing the corpus only once.
+
+The labeled comments are vectorized once (see mlp.streamed_ngram_vectorize),
+and the sparse train & validation matrices are written to .npy files. Each
+configuration is then trained in a process pool, where every worker memory
+maps the same files read-only rather than getting its own copy. Results are
+ranked by validation accuracy, then loss.
+
+Usage (from the nlp directory):
+    python sweep.py --mode is_wavy --learning-rates 1e-4 1e-3 --units 32 64 --output sweep.json
+"""
+
+import argparse
+import concurrent.futures
+import itertools
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import time
+
+import numpy
+import scipy.sparse
+
+import constants
+
+# The hyperparameters swept over, with their defaults (see mlp.train_ngram_model).
+DEFAULTS = {
+    'learning_rate': [5e-5],
+    'layers': [2],
+    'units': [64],
+    'dropout_rate': [0.2],
+    'batch_size': [128],
+}
+
+FEATURES_FILE = 'features.json'
+
+def grid(**params):
+    """Every combination of the given hyperparameter values, eg. grid(units=[32, 64], layers=[1, 2]).
+
+    Hyperparameters that are not given keep their default.
+    """
+    params = dict(DEFAULTS, **params)
+    names = sorted(params)
+    return [dict(zip(names, values)) for values in itertools.product(*(params[name] for name in names))]
+
+def write_features(directory, name, x, labels):
+    """Writes a sparse matrix & its labels as .npy files, so they can be memory mapped."""
+    x = x.tocsr()
+    for part, array in [('data', x.data), ('indices', x.indices), ('indptr', x.indptr),
+                        ('labels', numpy.asarray(labels))]:
+        numpy.save(os.path.join(directory, '{}_{}.npy'.format(name, part)), array)
+    return list(x.shape)
+
+def map_features(directory, name, shape):
+    """Memory maps, read-only, a matrix & labels written by write_features."""
+    def load(part):
+        return numpy.load(os.path.join(directory, '{}_{}.npy'.format(name, part)), mmap_mode='r')
+    x = scipy.sparse.csr_matrix((load('data'), load('indices'), load('indptr')), shape=tuple(shape), copy=False)
+    return x, load('labels')
+
+def vectorize(directory, mode):
+    """Vectorizes the labeled comments for mode once, and writes them to directory."""
+    import mlp
+
+    _, _, (x_train, train_labels), (x_val, val_labels) = mlp.streamed_ngram_vectorize(mode)
+    features = {
+        'mode': mode,
+        'train': write_features(directory, 'train', x_train, train_labels),
+        'val': write_features(directory, 'val', x_val, val_labels),
+    }
+    with open(os.path.join(directory, FEATURES_FILE), 'w') as f:
+        json.dump(features, f)
+    return features
+
+# Set in each worker process by _init_worker.
+_train = None
+_val = None
+
+def _init_worker(directory):
+    global _train
+    global _val
+
+    with open(os.path.join(directory, FEATURES_FILE)) as f:
+        features = json.load(f)
+    _train = map_features(directory, 'train', features['train'])
+    _val = map_features(directory, 'val', features['val'])
+
+def _run_config(config, epochs):
+    import mlp
+
+    start = time.perf_counter()
+    _, history = mlp.fit_model(_train, _val, epochs=epochs, verbose=0, **config)
+    best = int(numpy.argmin(history['val_loss']))
+    return {
+        'config': config,
+        'val_acc': float(history['val_acc'][-1]),
+        'val_loss': float(history['val_loss'][-1]),
+        'best_epoch': best + 1,
+        'best_val_loss': float(history['val_loss'][best]),
+        'epochs': len(history['val_loss']),
+        'seconds': time.perf_counter() - start,
+    }
+
+def rank(results):
+    """Best first: by validation accuracy, then by validation loss."""
+    return sorted(results, key=lambda result: (-result['val_acc'], result['val_loss']))
+
+def sweep(configs, mode=constants.POSITIVITY, epochs=1000, processes=None, directory=None):
+    """Trains a model for each configuration, in parallel, on features vectorized once.
+
+    # Arguments
+        configs: list of dicts, hyperparameters for mlp.fit_model (see grid).
+        mode: string, the classification to train for.
+        epochs: int, most epochs per configuration, as training stops early.
+        processes: int, number of configurations trained at once. Defaults to
+            the cpu count.
+        directory: string, where the features are written. Defaults to a
+            temporary directory, removed afterwards.
+
+    # Returns
+        list of dicts, the results for each configuration, best first.
+    """
+    keep = directory is not None
+    if keep:
+        os.makedirs(directory, exist_ok=True)
+    else:
+        directory = tempfile.mkdtemp(prefix='kanye-sweep-')
+    try:
+        start = time.perf_counter()
+        features = vectorize(directory, mode)
+        print('Vectorized', features['train'][0], 'train and', features['val'][0],
+              'validation comments in', round(time.perf_counter() - start, 2), 's')
+
+        # Tensorflow does not survive a fork, so workers are started fresh.
+        context = multiprocessing.get_context('spawn')
+        results = []
+        with concurrent.futures.ProcessPoolExecutor(processes, mp_context=context,
+                initializer=_init_worker, initargs=(directory,)) as executor:
+            futures = {executor.submit(_run_config, config, epochs): config for config in configs}
+            for future in concurrent.futures.as_completed(futures):
+                result = future.result()
+                print('Trained', result['config'], 'val_acc:', result['val_acc'],
+                      'in', round(result['seconds'], 2), 's')
+                results.append(result)
+        return rank(results)
+    finally:
+        if not keep:
+            shutil.rmtree(directory, ignore_errors=True)
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Hyperparameter sweep for the n-gram MLP.')
+    parser.add_argument('--mode', choices=[constants.POSITIVITY, constants.CATEGORY], default=constants.POSITIVITY)
+    parser.add_argument('--learning-rates', type=float, nargs='+', default=DEFAULTS['learning_rate'])
+    parser.add_argument('--layers', type=int, nargs='+', default=DEFAULTS['layers'])
+    parser.add_argument('--units', type=int, nargs='+', default=DEFAULTS['units'])
+    parser.add_argument('--dropout-rates', type=float, nargs='+', default=DEFAULTS['dropout_rate'])
+    parser.add_argument('--batch-sizes', type=int, nargs='+', default=DEFAULTS['batch_size'])
+    parser.add_argument('--epochs', type=int, default=1000)
+    parser.add_argument('--processes', type=int)
+    parser.add_argument('--features-dir', help='keep the vectorized features here')
+    parser.add_argument('--output', default='sweep.json')
+    args = parser.parse_args(argv)
+
+    configs = grid(learning_rate=args.learning_rates, layers=args.layers, units=args.units,
+                   dropout_rate=args.dropout_rates, batch_size=args.batch_sizes)
+    start = time.perf_counter()
+    results = sweep(configs, args.mode, args.epochs, args.processes, args.features_dir)
+    report = {
+        'mode': args.mode,
+        'max_epochs': args.epochs,
+        'seconds': time.perf_counter() - start,
+        'results': results,
+    }
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print('Best of', len(results), 'configurations:', results[0] if results else None)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy
+import scipy.sparse
+
+import sweep
+
+class SweepTest(unittest.TestCase):
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testGrid(self):
+        configs = sweep.grid(units=[32, 64], layers=[1, 2])
+        self.assertEqual(len(configs), 4)
+        self.assertEqual(configs[0], {'batch_size': 128, 'dropout_rate': 0.2, 'layers': 1,
+                                      'learning_rate': 5e-5, 'units': 32})
+        self.assertEqual(sweep.grid(), [{name: values[0] for name, values in sweep.DEFAULTS.items()}])
+
+    def testMappedFeatures(self):
+        x = scipy.sparse.random(50, 20, density=0.1, format='csr', dtype=numpy.float32, random_state=1738)
+        labels = list(range(50))
+        shape = sweep.write_features(self.directory, 'train', x, labels)
+
+        mapped, mapped_labels = sweep.map_features(self.directory, 'train', shape)
+        # Copies would be writeable: these are views of the read-only mapped files.
+        for array in [mapped.data, mapped.indices, mapped.indptr, mapped_labels]:
+            self.assertFalse(array.flags.writeable)
+        self.assertEqual((mapped != x).nnz, 0)
+        numpy.testing.assert_array_equal(mapped[[3, 1]].toarray(), x[[3, 1]].toarray())
+        numpy.testing.assert_array_equal(mapped_labels, labels)
+
+    def testRank(self):
+        results = [{'val_acc': 0.5, 'val_loss': 0.2}, {'val_acc': 0.7, 'val_loss': 0.9},
+                   {'val_acc': 0.5, 'val_loss': 0.1}]
+        self.assertEqual(sweep.rank(results), [results[1], results[2], results[0]])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+"""Trains the positivity and category classifiers, and saves them as a new model version.
+
+Run as a scheduled job (see ecosystem.config.js), separately from the server.
+The server loads the newest version at startup, and checks for newer versions
+every hour.
+
+Usage (from the nlp directory):
+    python train.py
+"""
+
+import constants
+import evaluation
+import feature_matrix
+import metrics
+import model_store
+import nlp
+
+def train_classifiers(dataset=None):
+    return train_classifiers_with_held_out(dataset)[0]
+
+@metrics.timed('train_classifiers')
+def train_classifiers_with_held_out(dataset=None):
+    '''Returns the classifiers, and the names of the comments each was not trained on.'''
+    # Both classifiers train off the same fetched & featurized comments.
+    if dataset is None:
+        dataset = nlp.get_labeled_dataset()
+    classifiers, held_out = {}, {}
+    for field in [constants.POSITIVITY, constants.CATEGORY]:
+        test, train = nlp.test_train_sets(dataset, field)
+        classifiers[field] = nlp.train_online_classifier(train, field)
+        held_out[field] = [test.names[i] for i in test.rows_with(field)]
+    return classifiers, held_out
+
+def train_and_save():
+    dataset = nlp.get_labeled_dataset()
+    classifiers, held_out = train_classifiers_with_held_out(dataset)
+    manifest = {
+        'model_type': 'OnlineNaiveBayesClassifier',
+        'training_set_size': {name: c.size() for name, c in classifiers.items()},
+        'feature_schema': feature_matrix.FEATURE_NAMES,
+        # The comments to evaluate this version on, see evaluation.py
+        'held_out': held_out,
+    }
+    version = model_store.save(classifiers, manifest)
+    # Evaluate while the features are at hand, so comparing versions is only a lookup.
+    print(evaluation.format_evaluation(evaluation.evaluate(version, dataset)))
+    model_store.prune()
+    return version
+
+if __name__ == '__main__':
+    train_and_save()
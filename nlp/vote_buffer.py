@@ -0,0 +1,92 @@
+"""Coalesces user votes in memory, and writes them to mongo in bulk.
+
+Each vote on its own is an upsert round trip to mongo. The buffer adds up
+the votes for each comment, and writes all of them with one bulk_write once
+enough votes have come in, or the oldest vote has waited long enough.
+
+Usage:
+    votes = vote_buffer.VoteBuffer(on_flush=absorb_label_changes)
+    votes.add(comment_name, {'is_wavy': 'wavy'})
+    votes.flush_if_due() # periodically, eg. from a scheduled task
+"""
+
+import threading
+import time
+
+from collections import Counter
+
+import constants
+import metrics
+import mongo_handler
+
+class VoteBuffer:
+
+    def __init__(self, max_votes=constants.VOTE_BUFFER_MAX_VOTES,
+                 max_delay=constants.VOTE_BUFFER_MAX_DELAY, on_flush=None):
+        """
+        # Arguments
+            max_votes: int, flush once this many votes are buffered.
+            max_delay: number, seconds a vote may wait before flush_if_due flushes it.
+            on_flush: function, called with the dict of training label changes
+                (see mongo_handler.add_user_votes) after each flush.
+        """
+        self.max_votes = max_votes
+        self.max_delay = max_delay
+        self.on_flush = on_flush
+        self._pending = {}
+        self._n_votes = 0
+        self._oldest = None
+        self._lock = threading.Lock()
+        # Flushes are written one at a time, in the order they were taken.
+        self._flush_lock = threading.Lock()
+
+    def __len__(self):
+        return self._n_votes
+
+    def add(self, comment_name, classification):
+        with self._lock:
+            increments = self._pending.setdefault(comment_name, Counter())
+            increments.update(mongo_handler.user_vote_increments(classification))
+            self._n_votes += 1
+            if self._oldest is None:
+                self._oldest = time.time()
+            full = self._n_votes >= self.max_votes
+        if full:
+            self.flush()
+
+    def flush_if_due(self):
+        with self._lock:
+            due = self._oldest is not None and time.time() - self._oldest >= self.max_delay
+        if due:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered vote. Returns the resulting training label changes."""
+        with self._flush_lock:
+            with self._lock:
+                pending, n_votes, oldest = self._pending, self._n_votes, self._oldest
+                self._pending, self._n_votes, self._oldest = {}, 0, None
+            if not pending:
+                return {}
+
+            try:
+                with metrics.timer('flush_votes'):
+                    changes = mongo_handler.add_user_votes(
+                            {name: dict(increments) for name, increments in pending.items()})
+            except Exception:
+                # Keep the votes for the next flush, along with any that came in meanwhile.
+                self._restore(pending, n_votes, oldest)
+                metrics.count('failed_vote_flushes')
+                raise
+            metrics.count('flushed_votes', sum(increments[constants.N_VOTES] for increments in pending.values()))
+            if self.on_flush:
+                self.on_flush(changes)
+            return changes
+
+    def _restore(self, pending, n_votes, oldest):
+        with self._lock:
+            for name, increments in pending.items():
+                self._pending.setdefault(name, Counter()).update(increments)
+            self._n_votes += n_votes
+            if self._oldest is None or oldest < self._oldest:
+                self._oldest = oldest
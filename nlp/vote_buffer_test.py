@@ -0,0 +1,83 @@
+import unittest
+from unittest import mock
+
+from pymongo import MongoClient
+
+import constants
+import mongo_handler
+import vote_buffer
+
+class VoteBufferTest(unittest.TestCase):
+
+    def setUp(self):
+        # Votes are written through mongo_handler, so keep them out of the live database.
+        self.db = constants.DB_KANYE
+        constants.DB_KANYE = constants.DB_TEST
+        self.flushed = []
+        self.votes = vote_buffer.VoteBuffer(max_votes=4, max_delay=0, on_flush=self.flushed.append)
+
+    def tearDown(self):
+        client = MongoClient()
+        client.test[constants.USER_CLASSIFIED].delete_many({})
+        client.test[constants.STATISTICS].delete_many({})
+        constants.DB_KANYE = self.db
+
+    def testCoalescedFlush(self):
+        self.votes.add('t1_a', {constants.POSITIVITY: 'wavy', constants.CATEGORY: 'kanye'})
+        self.votes.add('t1_a', {constants.POSITIVITY: 'wavy'})
+        self.votes.add('t1_b', {constants.CATEGORY: 'op'})
+        self.assertEqual(len(self.votes), 3)
+        self.assertEqual(self.flushed, [])
+
+        # The fourth vote fills the buffer.
+        self.votes.add('t1_a', {constants.POSITIVITY: 'not_wavy'})
+        self.assertEqual(len(self.votes), 0)
+        self.assertEqual(len(self.flushed), 1)
+        self.assertEqual(sorted(self.flushed[0]['t1_a']), [
+            (constants.CATEGORY, None, 'kanye'), (constants.POSITIVITY, None, 'wavy')])
+        self.assertEqual(self.flushed[0]['t1_b'], [(constants.CATEGORY, None, 'op')])
+
+        totals = mongo_handler.get_single_comment_classification_totals('t1_a')
+        self.assertEqual(totals[constants.N_VOTES], 3)
+        self.assertEqual(totals[constants.POSITIVITY], {'wavy': 2, 'not_wavy': 1, 'ambiguous': 0})
+        self.assertEqual(totals[constants.CATEGORY]['kanye'], 1)
+        self.assertEqual(totals[constants.MAJORITY_POSITIVITY], 'wavy')
+
+    def testSameAsSingleVotes(self):
+        self.votes.add('t1_a', {constants.CATEGORY: 'op'})
+        self.votes.flush_if_due()
+        mongo_handler.update_user_classification('t1_b', {constants.CATEGORY: 'op'})
+
+        buffered = mongo_handler.get_single_comment_classification_totals('t1_a')
+        single = mongo_handler.get_single_comment_classification_totals('t1_b')
+        for totals in [buffered, single]:
+            del totals['_id'], totals['name']
+        self.assertDictEqual(buffered, single)
+
+    def testFailedFlushKeepsVotes(self):
+        self.votes.add('t1_a', {constants.POSITIVITY: 'wavy'})
+        self.votes.add('t1_b', {constants.CATEGORY: 'op'})
+        with mock.patch('mongo_handler.add_user_votes', side_effect=ConnectionError):
+            with self.assertRaises(ConnectionError):
+                self.votes.flush()
+        self.assertEqual(len(self.votes), 2)
+        with self.assertRaises(ValueError):
+            mongo_handler.get_single_comment_classification_totals('t1_a')
+
+        # A vote that comes in before the next flush is added to the kept ones.
+        self.votes.add('t1_a', {constants.POSITIVITY: 'wavy'})
+        self.votes.flush()
+        self.assertEqual(len(self.votes), 0)
+        totals = mongo_handler.get_single_comment_classification_totals('t1_a')
+        self.assertEqual(totals[constants.N_VOTES], 2)
+        self.assertEqual(totals[constants.POSITIVITY]['wavy'], 2)
+        totals = mongo_handler.get_single_comment_classification_totals('t1_b')
+        self.assertEqual(totals[constants.N_VOTES], 1)
+        self.assertEqual(totals[constants.CATEGORY]['op'], 1)
+
+    def testFlushEmpty(self):
+        self.assertEqual(self.votes.flush(), {})
+        self.assertEqual(self.flushed, [])
+
+if __name__ == '__main__':
+    unittest.main()